@@ -1,20 +1,146 @@
-from dataclasses import dataclass, field, asdict
 from typing import Optional
 from uuid import UUID
 
 
-@dataclass
-class Node:
+_MISSING = object()
+
+
+class _Field:
+    """模型字段描述符
+
+    实例上读写槽位中的值，并记录被修改过的字段；类上访问返回查询用的列对象（如 Node.uuid == value）。
+    """
+    __slots__ = ('name', 'slot', 'column', 'tracked')
+
+    def __init__(self, name, slot):
+        self.name = name
+        self.slot = slot
+        self.column = None
+        # id 由数据库生成，不参与变更跟踪
+        self.tracked = name != 'id'
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self.column if self.column is not None else self
+        return self.slot.__get__(obj, owner)
+
+    def __set__(self, obj, value):
+        if self.tracked:
+            old = self.__get__(obj) if self.is_set(obj) else _MISSING
+            if old is _MISSING or old != value:
+                obj._mark_changed(self.name)
+        self.slot.__set__(obj, value)
+
+    def is_set(self, obj):
+        try:
+            self.slot.__get__(obj, type(obj))
+        except AttributeError:
+            return False
+        return True
+
+
+class _UuidField(_Field):
+    """UUID 字段：槽位中保存数据库原始值（TEXT 或 16 字节 BLOB），首次读取时才解析为 UUID"""
+    __slots__ = ()
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self.column if self.column is not None else self
+        value = self.slot.__get__(obj, owner)
+        if value is None or isinstance(value, UUID):
+            return value
+        value = UUID(bytes=value) if isinstance(value, bytes) else UUID(value)
+        self.slot.__set__(obj, value)
+        return value
+
+
+class _Model:
+    """模型基类：按 _fields 生成构造函数与 repr，字段存放在 __slots__ 中"""
+    __slots__ = ('_changed',)
+    _fields = ()
+    _uuid_fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 用描述符替换槽位成员，槽位本身仍由描述符持有
+        for name, _ in cls._fields:
+            field_class = _UuidField if name in cls._uuid_fields else _Field
+            setattr(cls, name, field_class(name, cls.__dict__[name]))
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self._fields):
+            raise TypeError(f'{type(self).__name__}() 最多接受 {len(self._fields)} 个位置参数')
+        values = dict(zip((name for name, _ in self._fields), args))
+        for name, value in kwargs.items():
+            if name in values or not isinstance(type(self).__dict__.get(name), _Field):
+                raise TypeError(f'{type(self).__name__}() 参数错误: {name}')
+            values[name] = value
+        for name, default in self._fields:
+            setattr(self, name, values.get(name, default))
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name, _ in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+    @classmethod
+    def set_column(cls, name, column):
+        """设置类属性 name 对应的查询列对象"""
+        cls.__dict__[name].column = column
+
+    @classmethod
+    def raw_setters(cls, names):
+        """返回直接写入槽位的函数列表（加载数据库行时使用，不记录修改、不解析 UUID）"""
+        return [cls.__dict__[name].slot.__set__ for name in names]
+
+    def raw(self, name):
+        """读取字段的原始值，UUID 字段不触发解析"""
+        return type(self).__dict__[name].slot.__get__(self, type(self))
+
+    def set_raw(self, name, value):
+        """直接写入字段值，不记录为修改（用于同步已由其他途径写入数据库的值）"""
+        type(self).__dict__[name].slot.__set__(self, value)
+
+    def _mark_changed(self, name):
+        # 未修改过的对象不分配集合（加载时槽位为空，提交后为空元组）
+        try:
+            self._changed.add(name)
+        except AttributeError:
+            self._changed = {name}
+
+    def changed_fields(self):
+        """返回自加载（或上次提交）以来被修改过的字段名集合"""
+        return frozenset(getattr(self, '_changed', ()))
+
+    def reset_changes(self):
+        """标记当前状态为已与数据库同步"""
+        self._changed = ()
+
+
+class Node(_Model):
     """数据库节点表模型"""
-    node: str = ""
-    desc: str = ""
-    group: str = ""
-    type: str = ""  # 'F' for folder, 'L' for link
-    position: int = 0
-    uuid: Optional[UUID] = None
-    puuid: Optional[UUID] = None
-    expanded: bool = False
-    id: Optional[int] = None
+    _fields = (
+        ('node', ''),
+        ('desc', ''),
+        ('group', ''),
+        ('type', ''),  # 'F' for folder, 'L' for link
+        ('position', 0),
+        ('uuid', None),
+        ('puuid', None),
+        ('expanded', False),
+        ('id', None),
+    )
+    _uuid_fields = ('uuid', 'puuid')
+    __slots__ = tuple(name for name, _ in _fields)
+
+    node: str
+    desc: str
+    group: str
+    type: str
+    position: int
+    uuid: Optional[UUID]
+    puuid: Optional[UUID]
+    expanded: bool
+    id: Optional[int]
 
     def __hash__(self):
         return hash(self.id) if self.id else hash(self.uuid)
@@ -25,17 +151,29 @@ class Node:
         return self.id == other.id if self.id and other.id else self.uuid == other.uuid
 
 
-@dataclass
-class Link:
+class Link(_Model):
     """数据库连接表模型"""
-    uuid: Optional[UUID] = None
-    node: str = ""
-    system: str = ""
-    client: str = ""
-    user: str = ""
-    password: str = ""
-    language: str = ""
-    id: Optional[int] = None
+    _fields = (
+        ('uuid', None),
+        ('node', ''),
+        ('system', ''),
+        ('client', ''),
+        ('user', ''),
+        ('password', ''),
+        ('language', ''),
+        ('id', None),
+    )
+    _uuid_fields = ('uuid',)
+    __slots__ = tuple(name for name, _ in _fields)
+
+    uuid: Optional[UUID]
+    node: str
+    system: str
+    client: str
+    user: str
+    password: str
+    language: str
+    id: Optional[int]
 
     def __hash__(self):
         return hash(self.id) if self.id else hash(self.uuid)
@@ -46,12 +184,18 @@ class Link:
         return self.id == other.id if self.id and other.id else self.uuid == other.uuid
 
 
-@dataclass
-class Config:
+class Config(_Model):
     """数据库配置表模型"""
-    key: str = ""
-    value: str = ""
-    id: Optional[int] = None
+    _fields = (
+        ('key', ''),
+        ('value', ''),
+        ('id', None),
+    )
+    __slots__ = tuple(name for name, _ in _fields)
+
+    key: str
+    value: str
+    id: Optional[int]
 
     def __hash__(self):
         return hash(self.id) if self.id else hash(self.key)
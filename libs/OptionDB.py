@@ -1,31 +1,29 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Optional, Any
-from uuid import UUID
 from libs.Model import Node, Link, Config, Base
 from libs.guiCfg import GuiCfg
-
-
-def escape_column(name: str) -> str:
-    """转义 SQL 保留字列名"""
-    reserved_words = {
-        'group', 'order', 'select', 'from', 'where', 'and', 'or', 'not', 'in', 
-        'join', 'left', 'right', 'inner', 'outer', 'on', 'as', 'by', 'limit',
-        'offset', 'distinct', 'all', 'any', 'exists', 'between', 'like', 'is',
-        'null', 'values', 'insert', 'update', 'delete', 'create', 'drop', 'alter'
-    }
-    if name.lower() in reserved_words:
-        return f'"{name}"'
-    return name
+from libs.migrations import migrate, purge_orphans, create_fts, has_fts, CHANGE_COUNT_SQL, FTS_TABLE
+from libs.config_store import ConfigStore
+from libs.query_cache import QueryCache
+from libs.mapper import MAPPERS, UUID_FORMATS, mapper_for, encode, encode_uuid, decode_uuid, \
+    get_uuid_format, set_uuid_format
 
 
 class QueryBuilder:
     """SQL查询构建器，用于兼容SQLAlchemy的query接口"""
+
+    # 删除时单条语句中 IN 列表的最大长度
+    _IN_CHUNK = 500
     
-    def __init__(self, db_instance, model_class):
+    def __init__(self, db_instance, model_class, session=None):
         self.db = db_instance
         self.model_class = model_class
+        self.session = session
+        self.mapper = mapper_for(model_class)
         self.filters = []
         self.order_column = None
         self.order_desc = False
@@ -39,8 +37,8 @@ class QueryBuilder:
     
     def order_by(self, column):
         """添加排序"""
-        if hasattr(column, '__call__'):
-            # column是一个属性引用，如Node.node
+        # column是一个列引用，如Node.node
+        if hasattr(column, 'name') or hasattr(column, '__call__'):
             self.order_column = column
         return self
     
@@ -51,271 +49,73 @@ class QueryBuilder:
     def first(self) -> Optional[Any]:
         """执行查询，返回第一个结果"""
         results = self._execute_query(fetch_all=False)
-        # _execute_query 在 fetch_all=False 时可能直接返回单个对象（而不是列表），
-        # 因此需要兼容两种返回类型。
-        if isinstance(results, list):
-            return results[0] if results else None
-        return results
+        return results[0] if results else None
     
     def _execute_query(self, fetch_all=True):
-        """执行查询"""
-        if self.model_class.__name__ == 'Node':
-            return self._query_node(fetch_all)
-        elif self.model_class.__name__ == 'Link':
-            return self._query_link(fetch_all)
-        elif self.model_class.__name__ == 'Config':
-            return self._query_config(fetch_all)
-        return []
-    
-    def _query_node(self, fetch_all):
-        """查询Node表"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = 'SELECT id, node, desc, "group", type, position, uuid, puuid, expanded FROM node'
-        params = []
-        where_added = False
-        
-        # 应用过滤条件
-        for condition in self.filters:
-            condition_sql, condition_params = self._build_condition(condition, 'node', where_added)
-            if condition_sql:
-                sql += " " + condition_sql
-                params.extend(condition_params)
-                where_added = True
-        
-        # 应用排序
-        if self.order_column:
-            order_field = self._get_field_name(self.order_column)
-            sql += f" ORDER BY {escape_column(order_field)}"
-        
-        cursor.execute(sql, params)
-        rows = cursor.fetchall() if fetch_all else cursor.fetchone()
-        
-        if not rows:
-            return [] if fetch_all else None
-        
-        if not fetch_all:
-            rows = [rows]
-        
-        results = []
-        for row in rows:
-            node = Node(
-                id=row[0],
-                node=row[1],
-                desc=row[2],
-                group=row[3],
-                type=row[4],
-                position=row[5],
-                uuid=UUID(row[6]) if row[6] else None,
-                puuid=UUID(row[7]) if row[7] else None,
-                expanded=bool(row[8])
-            )
-            results.append(node)
-        
-        conn.close()
-        return results if fetch_all else (results[0] if results else None)
-    
-    def _query_link(self, fetch_all):
-        """查询Link表"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = "SELECT id, uuid, node, system, client, user, password, language FROM link"
-        params = []
-        where_added = False
-        
-        # 应用过滤条件
-        for condition in self.filters:
-            condition_sql, condition_params = self._build_condition(condition, 'link', where_added)
-            if condition_sql:
-                sql += " " + condition_sql
-                params.extend(condition_params)
-                where_added = True
-        
-        # 应用排序
-        if self.order_column:
-            order_field = self._get_field_name(self.order_column)
-            sql += f" ORDER BY {escape_column(order_field)}"
-        
-        cursor.execute(sql, params)
-        rows = cursor.fetchall() if fetch_all else cursor.fetchone()
-        
-        if not rows:
-            return [] if fetch_all else None
-        
-        if not fetch_all:
-            rows = [rows]
-        
-        results = []
-        for row in rows:
-            link = Link(
-                id=row[0],
-                uuid=UUID(row[1]) if row[1] else None,
-                node=row[2],
-                system=row[3],
-                client=row[4],
-                user=row[5],
-                password=row[6],
-                language=row[7]
-            )
-            results.append(link)
-        
-        conn.close()
-        return results if fetch_all else (results[0] if results else None)
-    
-    def _query_config(self, fetch_all):
-        """查询Config表"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = "SELECT id, key, value FROM config"
-        params = []
-        where_added = False
-        
-        # 应用过滤条件
-        for condition in self.filters:
-            condition_sql, condition_params = self._build_condition(condition, 'config', where_added)
-            if condition_sql:
-                sql += " " + condition_sql
-                params.extend(condition_params)
-                where_added = True
-        
-        # 应用排序
-        if self.order_column:
-            order_field = self._get_field_name(self.order_column)
-            sql += f" ORDER BY {escape_column(order_field)}"
-        
-        cursor.execute(sql, params)
-        rows = cursor.fetchall() if fetch_all else cursor.fetchone()
-        
-        if not rows:
-            return [] if fetch_all else None
-        
-        if not fetch_all:
-            rows = [rows]
-        
-        results = []
-        for row in rows:
-            config = Config(
-                id=row[0],
-                key=row[1],
-                value=row[2]
-            )
-            results.append(config)
-        
-        conn.close()
-        return results if fetch_all else (results[0] if results else None)
-    
-    def _build_condition(self, condition, table_name, where_added=False):
-        """构建过滤条件SQL和参数"""
-        # condition 是形如 (Column == value) 的对象
-        if hasattr(condition, '__class__'):
-            # 检查是否是比较操作对象
-            if hasattr(condition, 'left') and hasattr(condition, 'right') and hasattr(condition, 'operator'):
-                # 这是一个自定义的比较对象
-                field_name = escape_column(self._get_field_name(condition.left))
-                operator = condition.operator
-                value = condition.right
-                prefix = "AND" if where_added else "WHERE"
-                
-                if operator == '==':
-                    # 处理 NULL 比较
-                    if value is None:
-                        return f"{prefix} {field_name} IS NULL", []
-                    elif isinstance(value, UUID):
-                        return f"{prefix} {field_name} = ?", [str(value)]
-                    else:
-                        return f"{prefix} {field_name} = ?", [value]
-                elif operator == '!=':
-                    # 处理 NULL 比较
-                    if value is None:
-                        return f"{prefix} {field_name} IS NOT NULL", []
-                    elif isinstance(value, UUID):
-                        return f"{prefix} {field_name} != ?", [str(value)]
-                    else:
-                        return f"{prefix} {field_name} != ?", [value]
-        return "", []
-    
+        """执行查询，返回对象列表（fetch_all=False 时最多一个）"""
+        if self.mapper is None:
+            return []
+        # 标识映射命中时不访问数据库，先确认数据库没有被其他进程修改
+        self.db.check_changes()
+        cached = self._identity_lookup()
+        if cached is not None:
+            return [cached]
+
+        shape, params = self.mapper.compile_where(self.filters)
+        order = self._get_field_name(self.order_column) if self.order_column else None
+        sql = self.mapper.select_sql(shape, order, None if fetch_all else 1)
+
+        # 以元组读取（相同 SQL 与参数命中结果缓存），由映射直接构造对象
+        rows = self.db.fetch(sql, params)
+        return [self._load(row) for row in rows]
+
+    def _load(self, row):
+        """将一行结果转换为对象，已加载过的对象直接复用"""
+        if self.session is None:
+            return self.mapper.hydrate(row)
+        return self.session.load(self.mapper, row)
+    
+    def _identity_lookup(self):
+        """仅按标识列（uuid/key）等值查询时，直接从会话的标识映射中取对象"""
+        if self.session is None or len(self.filters) != 1:
+            return None
+        condition = self.filters[0]
+        if getattr(condition, 'operator', None) != '==' or condition.right is None:
+            return None
+        if self._get_field_name(condition.left) != self.mapper.identity:
+            return None
+        return self.session.get_identity(self.model_class, condition.right)
+
     def delete(self):
         """执行删除"""
-        if self.model_class.__name__ == 'Node':
-            self._delete_node()
-        elif self.model_class.__name__ == 'Link':
-            self._delete_link()
-        elif self.model_class.__name__ == 'Config':
-            self._delete_config()
-    
-    def _delete_node(self):
-        """删除Node"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = "DELETE FROM node"
-        params = []
-        where_added = False
-        
-        for condition in self.filters:
-            field_name = escape_column(self._get_field_name(condition.left))
-            value = condition.right
-            prefix = "AND" if where_added else "WHERE"
-            if isinstance(value, UUID):
-                sql += f" {prefix} {field_name} = ?"
-                params.append(str(value))
-            else:
-                sql += f" {prefix} {field_name} = ?"
-                params.append(value)
-            where_added = True
-        
-        cursor.execute(sql, params)
-        conn.commit()
-        conn.close()
-    
-    def _delete_link(self):
-        """删除Link"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = "DELETE FROM link"
-        params = []
-        where_added = False
-        
-        for condition in self.filters:
-            field_name = escape_column(self._get_field_name(condition.left))
-            value = condition.right
-            prefix = "AND" if where_added else "WHERE"
-            if isinstance(value, UUID):
-                sql += f" {prefix} {field_name} = ?"
-                params.append(str(value))
-            else:
-                sql += f" {prefix} {field_name} = ?"
-                params.append(value)
-            where_added = True
-        
-        cursor.execute(sql, params)
-        conn.commit()
-        conn.close()
-    
-    def _delete_config(self):
-        """删除Config"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        sql = "DELETE FROM config"
-        params = []
-        where_added = False
-        
-        for condition in self.filters:
-            field_name = escape_column(self._get_field_name(condition.left))
-            value = condition.right
-            prefix = "AND" if where_added else "WHERE"
-            sql += f" {prefix} {field_name} = ?"
-            params.append(value)
-            where_added = True
-        
-        cursor.execute(sql, params)
-        conn.commit()
-        conn.close()
+        if self.mapper is None:
+            return
+        self._identity_evict()
+        # 单个超大 IN 条件按批拆分，避免超出 SQLite 参数个数上限，仍在同一事务内
+        if len(self.filters) == 1 and getattr(self.filters[0], 'operator', None) == 'in':
+            condition = self.filters[0]
+            batches = [FilterCondition(condition.left, 'in', condition.right[i:i + self._IN_CHUNK])
+                       for i in range(0, len(condition.right), self._IN_CHUNK)]
+        else:
+            batches = [None]
+        with self.db.transaction() as conn:
+            for batch in batches:
+                shape, params = self.mapper.compile_where([batch] if batch else self.filters)
+                conn.execute(self.mapper.delete_sql(shape), params)
+        if self.model_class is Config:
+            self.db.config.reload()
+    
+    def _identity_evict(self):
+        """删除前使标识映射中受影响的对象失效"""
+        if self.session is None:
+            return
+        condition = self.filters[0] if len(self.filters) == 1 else None
+        operator = getattr(condition, 'operator', None)
+        if operator in ('==', 'in') and self._get_field_name(condition.left) == self.mapper.identity:
+            for value in (condition.right if operator == 'in' else [condition.right]):
+                self.session.evict(self.model_class, value)
+        else:
+            self.session.evict(self.model_class)
 
     def _get_field_name(self, column):
         """从列对象获取字段名"""
@@ -335,6 +135,12 @@ class FilterCondition:
         self.left = column
         self.right = value
 
+    def __and__(self, other):
+        return and_(self, other)
+
+    def __or__(self, other):
+        return or_(self, other)
+
 
 class Column:
     """列对象，模拟SQLAlchemy的Column"""
@@ -348,17 +154,121 @@ class Column:
     def __ne__(self, other):
         return FilterCondition(self, '!=', other)
 
+    def __lt__(self, other):
+        return FilterCondition(self, '<', other)
+
+    def __le__(self, other):
+        return FilterCondition(self, '<=', other)
+
+    def __gt__(self, other):
+        return FilterCondition(self, '>', other)
+
+    def __ge__(self, other):
+        return FilterCondition(self, '>=', other)
+
+    def in_(self, values):
+        """列值在给定集合中"""
+        return FilterCondition(self, 'in', list(values))
+
+    def like(self, pattern):
+        """LIKE 模糊匹配（ASCII 字符不区分大小写）"""
+        return FilterCondition(self, 'like', pattern)
+
+
+class BooleanClause:
+    """由 and_/or_ 组合的条件"""
+    def __init__(self, operator, clauses):
+        self.operator = operator
+        self.clauses = list(clauses)
+
+    def __and__(self, other):
+        return and_(self, other)
+
+    def __or__(self, other):
+        return or_(self, other)
+
+
+def and_(*conditions):
+    """所有条件同时成立"""
+    return BooleanClause('and', conditions)
+
+
+def or_(*conditions):
+    """任一条件成立"""
+    return BooleanClause('or', conditions)
+
 
 class SessionMock:
     """模拟SQLAlchemy的Session对象"""
     
     def __init__(self, db_instance):
         self.db = db_instance
-        self._dirty_objects = []
+        # 以 id(obj) 为键的有序集合，保持添加顺序且去重为 O(1)
+        self._dirty_objects = {}
+        self._identity_map = {}
     
     def query(self, model_class):
         """创建查询对象"""
-        return QueryBuilder(self.db, model_class)
+        return QueryBuilder(self.db, model_class, self)
+
+    @staticmethod
+    def identity_field(model_class):
+        """返回模型的标识列名"""
+        mapper = mapper_for(model_class)
+        return mapper.identity if mapper else None
+
+    def _identity_key(self, model_class, value):
+        # 标识映射以 (模型, 规范化的标识值) 为键，UUID 的 TEXT/BLOB/对象形式得到同一个键，命中时无需解析
+        return model_class, mapper_for(model_class).identity_key(value)
+
+    def _identity_value(self, obj):
+        # 读取原始值，不触发 UUID 解析
+        mapper = mapper_for(type(obj))
+        return obj.raw(mapper.identity) if mapper else None
+
+    def get_identity(self, model_class, value):
+        """按标识值取已加载的对象，未加载时返回 None"""
+        key = self._identity_key(model_class, value)
+        obj = self._identity_map.get(key)
+        if obj is None:
+            return None
+        # 对象的标识列被修改过时，旧键失效
+        current = self._identity_value(obj)
+        if current is None or self._identity_key(model_class, current) != key:
+            del self._identity_map[key]
+            return None
+        return obj
+
+    def load(self, mapper, row):
+        """将查询结果行转换为对象：同一标识只构造一次，之后复用标识映射中的对象"""
+        raw = row[mapper.identity_index]
+        if raw is None:
+            return mapper.hydrate(row)
+        key = (mapper.model_class, mapper.identity_key(raw))
+        obj = self._identity_map.get(key)
+        if obj is not None and mapper.identity_key(obj.raw(mapper.identity)) == key[1]:
+            return obj
+        obj = self._identity_map[key] = mapper.hydrate(row)
+        return obj
+
+    def register(self, obj):
+        """登记对象到标识映射，同一标识已有对象时保留已有对象"""
+        value = self._identity_value(obj)
+        if value is None:
+            return obj
+        return self._identity_map.setdefault(self._identity_key(type(obj), value), obj)
+
+    def evict(self, model_class, value=None):
+        """使标识映射失效；不指定 value 时清除该模型的全部对象"""
+        if value is not None:
+            self._identity_map.pop(self._identity_key(model_class, value), None)
+            return
+        for key in [k for k in self._identity_map if k[0] is model_class]:
+            del self._identity_map[key]
+
+    def expunge_all(self):
+        """清空标识映射"""
+        self._identity_map.clear()
     
     def add(self, obj):
         """添加对象(延迟执行)"""
@@ -376,106 +286,104 @@ class SessionMock:
     def _mark_dirty(self, obj):
         """标记对象为脏数据"""
         # 使用对象id作为key，避免重复添加
-        obj_id = id(obj)
-        if obj_id not in [id(o) for o in self._dirty_objects]:
-            self._dirty_objects.append(obj)
+        self._dirty_objects.setdefault(id(obj), obj)
     
+    # 插入后按标识列回查 id 时每条语句的参数个数
+    _ID_CHUNK = 500
+
     def commit(self):
-        """提交更改"""
-        for obj in self._dirty_objects:
-            if isinstance(obj, Node):
-                self._commit_node(obj)
-            elif isinstance(obj, Link):
-                self._commit_link(obj)
-            elif isinstance(obj, Config):
-                self._commit_config(obj)
-        self._dirty_objects.clear()
-        
+        """提交更改：按模型分组，在一个事务内批量写入，失败时整体回滚"""
+        pending = list(self._dirty_objects.values())
         # 同时处理修改过的对象（直接修改了属性的对象）
-        self.db._flush_dirty_objects()
-    
-    def _commit_node(self, node: Node):
-        """提交Node对象"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        if node.id is None:
-            # 插入新记录
-            cursor.execute("""
-                INSERT INTO node (node, desc, "group", type, position, uuid, puuid, expanded)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                node.node, node.desc, node.group, node.type, node.position,
-                str(node.uuid) if node.uuid else None,
-                str(node.puuid) if node.puuid else None,
-                1 if node.expanded else 0
-            ))
-            node.id = cursor.lastrowid
-        else:
-            # 更新现有记录
-            cursor.execute("""
-                UPDATE node SET node=?, desc=?, "group"=?, type=?, position=?, puuid=?, expanded=?
-                WHERE id=?
-            """, (
-                node.node, node.desc, node.group, node.type, node.position,
-                str(node.puuid) if node.puuid else None,
-                1 if node.expanded else 0,
-                node.id
-            ))
-        
-        conn.commit()
-        conn.close()
-    
-    def _commit_link(self, link: Link):
-        """提交Link对象"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        if link.id is None:
-            # 插入新记录
-            cursor.execute("""
-                INSERT INTO link (uuid, node, system, client, user, password, language)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(link.uuid) if link.uuid else None,
-                link.node, link.system, link.client, link.user, link.password, link.language
-            ))
-            link.id = cursor.lastrowid
-        else:
-            # 更新现有记录
-            cursor.execute("""
-                UPDATE link SET uuid=?, node=?, system=?, client=?, user=?, password=?, language=?
-                WHERE id=?
-            """, (
-                str(link.uuid) if link.uuid else None,
-                link.node, link.system, link.client, link.user, link.password, link.language,
-                link.id
-            ))
-        
-        conn.commit()
-        conn.close()
-    
-    def _commit_config(self, config: Config):
-        """提交Config对象"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        if config.id is None:
-            # 插入新记录
-            cursor.execute("INSERT INTO config (key, value) VALUES (?, ?)", (config.key, config.value))
-            config.id = cursor.lastrowid
-        else:
-            # 更新现有记录
-            cursor.execute("UPDATE config SET value=? WHERE id=?", (config.value, config.id))
-        
-        conn.commit()
-        conn.close()
+        pending.extend(obj for obj in self.db._dirty_objects.values() if obj.id is not None)
+        if not pending:
+            return
+
+        # 新对象写入全部列；已有对象只更新被修改过的列，没有实际变化的跳过
+        inserts, updates = {}, {}
+        for obj in pending:
+            model_class = type(obj)
+            mapper = mapper_for(model_class)
+            if mapper is None:
+                continue
+            if obj.id is None:
+                inserts.setdefault(model_class, []).append(obj)
+                continue
+            changed = obj.changed_fields()
+            columns = tuple(c for c in mapper.writable if c in changed)
+            if columns:
+                updates.setdefault((model_class, columns), []).append(obj)
+
+        if not inserts and not updates:
+            self._dirty_objects.clear()
+            self.db._dirty_objects.clear()
+            return
+
+        # 新对象的 id 在事务成功提交后才回写，回滚时对象保持未插入状态
+        new_ids = []
+        with self.db.transaction() as conn:
+            for model_class, objs in inserts.items():
+                new_ids.extend(self._flush_inserts(conn, model_class, objs))
+            for (model_class, columns), objs in updates.items():
+                conn.executemany(mapper_for(model_class).update_sql(columns),
+                                 [[encode(getattr(o, c)) for c in columns] + [o.id] for o in objs])
+
+        for obj, new_id in new_ids:
+            obj.id = new_id
+        for obj in pending:
+            obj.reset_changes()
+            # 提交后以当前标识登记，标识列被修改的对象随之更新映射
+            value = self._identity_value(obj)
+            if value is not None:
+                self._identity_map[self._identity_key(type(obj), value)] = obj
+        self._dirty_objects.clear()
+        self.db._dirty_objects.clear()
+        # 绕过 ConfigStore 直接写入的配置，使其缓存失效
+        if Config in inserts or any(model_class is Config for model_class, _ in updates):
+            self.db.config.reload()
+
+    def _flush_inserts(self, conn, model_class, objs):
+        """批量插入同一模型的新对象，返回 [(对象, 新 id)]"""
+        mapper = mapper_for(model_class)
+        field_name = mapper.identity
+        keyed = [o for o in objs if getattr(o, field_name) is not None]
+        result = []
+        # 没有标识值的对象无法回查 id，逐条插入
+        for obj in objs:
+            if getattr(obj, field_name) is None:
+                cursor = conn.execute(mapper.insert_sql(), mapper.row_params(obj))
+                result.append((obj, cursor.lastrowid))
+        if not keyed:
+            return result
+
+        conn.executemany(mapper.insert_sql(), [mapper.row_params(o) for o in keyed])
+        ids = {}
+        for i in range(0, len(keyed), self._ID_CHUNK):
+            chunk = [encode(getattr(o, field_name)) for o in keyed[i:i + self._ID_CHUNK]]
+            ids.update(conn.execute(mapper.id_sql(len(chunk)), chunk).fetchall())
+        result.extend((o, ids.get(encode(getattr(o, field_name)))) for o in keyed)
+        return result
 
 
 class sqliteDB:
     """SQLite数据库管理类，模拟SQLAlchemy接口"""
     _instance = None
 
+    # 每个连接打开后执行的 PRAGMA（WAL 模式下 synchronous=NORMAL 只在检查点时 fsync）
+    _PRAGMAS = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -8192),        # 负数表示 KiB，即 8MB 页缓存
+        ('mmap_size', 64 * 1024 * 1024),
+        ('temp_store', 'MEMORY'),
+    )
+    # sqlite3 模块内部的预编译语句缓存大小
+    _STATEMENT_CACHE_SIZE = 256
+    # 查询结果缓存的条目数
+    _QUERY_CACHE_SIZE = 128
+    # config 表中记录 UUID 存储格式的键；设置环境变量 ZLOGON_UUID_FORMAT=blob 可在启动时转换
+    UUID_FORMAT_KEY = 'uuid_format'
+
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(sqliteDB, cls).__new__(cls)
@@ -490,77 +398,118 @@ class sqliteDB:
         self.base = Base
         self.session = SessionMock(self)
         self._dirty_objects = {}  # 存储直接修改的对象
+        # 每个线程持有一个长连接，后台线程不与 Tk 主线程共用连接
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # 只读查询的结果缓存，其他进程修改数据库后同时丢弃已加载的对象和配置
+        self.query_cache = QueryCache(CHANGE_COUNT_SQL, self._QUERY_CACHE_SIZE)
+        self.query_cache.on_external_change = self._on_external_change
+        # config 表的内存缓存，logon 等高频读取不访问数据库
+        self.config = ConfigStore(self)
         self.checkDB()
+        self._init_uuid_format()
         self._initialized = True
     
     def _get_connection(self):
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.dbpath)
+        """获取当前线程的长连接（首次调用时创建）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self):
+        """创建并配置一个新连接"""
+        # check_same_thread=False 仅为了 close() 能在主线程统一关闭，连接本身按线程隔离使用
+        conn = sqlite3.connect(self.dbpath, cached_statements=self._STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for name, value in self._PRAGMAS:
+            conn.execute(f'PRAGMA {name}={value}').fetchall()
         return conn
-    
-    def _flush_dirty_objects(self):
-        """刷新脏数据到数据库"""
-        for obj in self._dirty_objects.values():
-            if isinstance(obj, Node):
-                self._update_node(obj)
-            elif isinstance(obj, Link):
-                self._update_link(obj)
-            elif isinstance(obj, Config):
-                self._update_config(obj)
-        self._dirty_objects.clear()
-    
-    def _update_node(self, node: Node):
-        """更新Node对象"""
-        if node.id is None:
+
+    def close(self):
+        """关闭所有线程打开的连接"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            self.query_cache.forget(conn)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+        self.query_cache.clear()
+
+    def release(self):
+        """关闭当前线程的连接（后台线程结束前调用）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
             return
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE node SET node=?, desc=?, "group"=?, type=?, position=?, puuid=?, expanded=?
-            WHERE id=?
-        """, (
-            node.node, node.desc, node.group, node.type, node.position,
-            str(node.puuid) if node.puuid else None,
-            1 if node.expanded else 0,
-            node.id
-        ))
-        conn.commit()
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        self.query_cache.forget(conn)
         conn.close()
-    
-    def _update_link(self, link: Link):
-        """更新Link对象"""
-        if link.id is None:
-            return
+
+    def fetch(self, sql, params=(), transform=None):
+        """执行只读查询，返回结果元组列表或 transform 的结果（经过查询结果缓存）"""
+        return self.query_cache.fetch(self._get_connection(), sql, params, transform)
+
+    def check_changes(self):
+        """检查数据库是否被其他进程修改过（节流），是则丢弃各级缓存；返回累计检测到的外部修改次数"""
+        self.query_cache.check(self._get_connection())
+        return self.query_cache.external_changes
+
+    def _on_external_change(self):
+        """数据库被其他连接修改：已加载的对象与配置缓存都可能过期"""
+        self.session.expunge_all()
+        self.config.reload()
+
+    @contextmanager
+    def transaction(self):
+        """在当前线程的连接上开启写事务，正常结束时提交，异常时回滚
+
+        已处于事务中时直接并入外层事务，由外层负责提交。事务结束后查询结果缓存失效。
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE link SET node=?, system=?, client=?, user=?, password=?, language=?
-            WHERE id=?
-        """, (
-            link.node, link.system, link.client, link.user, link.password, link.language,
-            link.id
-        ))
-        conn.commit()
-        conn.close()
-    
-    def _update_config(self, config: Config):
-        """更新Config对象"""
-        if config.id is None:
+        if conn.in_transaction:
+            yield conn
             return
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE config SET value=? WHERE key=?", (config.value, config.key))
-        conn.commit()
-        conn.close()
-    
+        conn.execute('BEGIN IMMEDIATE')
+        span = None
+        try:
+            start = self.query_cache.change_count(conn)
+            yield conn
+            # 提交前登记本事务写入的修改计数，其他线程在提交后立即检查时不会当作外部修改
+            span = self.query_cache.add_local(start, self.query_cache.change_count(conn))
+            conn.commit()
+        except BaseException:
+            if span is not None:
+                self.query_cache.remove_local(span)
+            conn.rollback()
+            self.query_cache.clear()
+            raise
+        self.query_cache.committed()
+
     def checkDB(self):
-        """检查并创建数据库"""
+        """检查并创建数据库，并将已有数据库升级到最新结构"""
         if not os.path.exists(self.dbpath):
             Path(self.dbpath).parent.mkdir(parents=True, exist_ok=True)
             with open(self.dbpath, 'w', encoding='utf-8'):
                 pass
             self.createDBTable()
+        conn = self._get_connection()
+        migrate(conn)
+        if not has_fts(conn):
+            # 升级到版本 4 时 SQLite 未编译 FTS5 会跳过全文索引，换用支持 FTS5 的 SQLite 后在启动时补建
+            with self.transaction():
+                create_fts(conn)
+        self.fts_enabled = has_fts(conn)
     
     def createDBTable(self):
         """创建数据库表"""
@@ -609,51 +558,256 @@ class sqliteDB:
                 value TEXT
             )
         """)
+
+        # 表已重建，索引等后续结构由 migrate() 重新补齐
+        cursor.execute("PRAGMA user_version=0")
         
         conn.commit()
-        conn.close()
-    
+        cursor.close()
+    
+    # 以给定节点为根的整棵子树（UNION 去重，数据中存在环时也能终止）
+    _SUBTREE_CTE = """
+        WITH RECURSIVE subtree(uuid) AS (
+            SELECT ?
+            UNION
+            SELECT node.uuid FROM node JOIN subtree ON node.puuid = subtree.uuid
+        )
+    """
+
+    def deleteSubtree(self, uuid):
+        """在同一事务中删除节点及其全部下级节点和连接，返回删除的节点数"""
+        with self.transaction() as conn:
+            conn.execute(self._SUBTREE_CTE + 'DELETE FROM link WHERE uuid IN (SELECT uuid FROM subtree)',
+                         (encode(uuid),))
+            conn.execute(self._SUBTREE_CTE + 'DELETE FROM node WHERE uuid IN (SELECT uuid FROM subtree)',
+                         (encode(uuid),))
+            # 以 WITH 开头的语句不会更新 cursor.rowcount；changes() 不含全文索引触发器修改的行
+            count = conn.execute('SELECT changes()').fetchone()[0]
+        self.session.evict(Node)
+        self.session.evict(Link)
+        return count
+
+    def findNodeByPath(self, names):
+        """按各级名称（如 ('分组', '子分组', '连接')）从根节点逐级查找节点，找不到返回 None"""
+        mapper = mapper_for(Node)
+        node = None
+        for name in names:
+            rows = self.fetch(f"""
+                SELECT {mapper.select_list} FROM node
+                WHERE puuid IS ? AND node = ?
+                ORDER BY type
+                LIMIT 1
+            """, (encode(node.uuid) if node else None, name))
+            if not rows:
+                return None
+            node = self.session.load(mapper, rows[0])
+        return node
+
+    def loadSubtreeLinks(self, uuid):
+        """分组及其全部下级分组中的连接，按名称排序"""
+        mapper = mapper_for(Link)
+        rows = self.fetch(self._SUBTREE_CTE + f"""
+            SELECT {mapper.select_list} FROM link
+            WHERE uuid IN (SELECT uuid FROM subtree)
+            ORDER BY node COLLATE NOCASE
+        """, (encode(uuid),))
+        return [self.session.load(mapper, row) for row in rows]
+
+    def purgeOrphans(self):
+        """清理已有数据库中无法从根节点到达的节点和连接，返回 (节点数, 连接数)"""
+        with self.transaction() as conn:
+            result = purge_orphans(conn)
+        self.session.evict(Node)
+        self.session.evict(Link)
+        return result
+
+    def _init_uuid_format(self):
+        """按数据库记录的格式编码 UUID 参数，环境变量要求其他格式时先转换（转换失败时保持原格式）"""
+        fmt = self.config.get(self.UUID_FORMAT_KEY)
+        set_uuid_format(fmt if fmt in UUID_FORMATS else 'text')
+        wanted = os.environ.get('ZLOGON_UUID_FORMAT', '').strip().lower()
+        if wanted in UUID_FORMATS and wanted != get_uuid_format():
+            try:
+                self.convertUuidStorage(wanted)
+            except ValueError as e:
+                print(f"Error converting uuid storage: {e}")
+
+    def convertUuidStorage(self, fmt):
+        """将已有数据的 uuid/puuid 转换为 'text'（36 位字符串）或 'blob'（16 字节），在同一事务中完成
+
+        存在无法解析的 uuid 时不做任何修改，抛出 ValueError 并列出这些行。
+        """
+        if fmt not in UUID_FORMATS:
+            raise ValueError(f'不支持的 UUID 存储格式: {fmt}')
+        with self.transaction() as conn:
+            bad = []
+            for table, columns in (('node', ('uuid', 'puuid')), ('link', ('uuid',))):
+                params = []
+                for row in conn.execute(f'SELECT id, {", ".join(columns)} FROM {table}').fetchall():
+                    try:
+                        params.append([encode_uuid(decode_uuid(v), fmt) if v else v for v in tuple(row)[1:]]
+                                      + [row[0]])
+                    except (ValueError, TypeError, AttributeError):
+                        bad.append(f'{table}.id={row[0]}')
+                if not bad:
+                    conn.executemany(f'UPDATE {table} SET {", ".join(f"{c}=?" for c in columns)} WHERE id=?',
+                                     params)
+            if bad:
+                more = f' 等 {len(bad)} 行' if len(bad) > 10 else ''
+                raise ValueError(f'以下行的 uuid 无法解析，未转换为 {fmt}: {", ".join(bad[:10])}{more}')
+            self.config.set(self.UUID_FORMAT_KEY, fmt)
+        set_uuid_format(fmt)
+        self.session.expunge_all()
+
+    def loadTree(self):
+        """一次查询读取整棵树，返回 {puuid: [子节点...]} 邻接表
+
+        子节点列表已按 文件夹优先、名称忽略大小写 排序，根节点的 key 为 None。
+        """
+        mapper = mapper_for(Node)
+        rows = self.fetch(f"""
+            SELECT {mapper.select_list} FROM node
+            WHERE type IN ('F', 'L')
+            ORDER BY type, node COLLATE NOCASE
+        """)
+
+        tree = {}
+        for row in rows:
+            node = self.session.load(mapper, row)
+            tree.setdefault(node.puuid, []).append(node)
+        return tree
+
+    def countNodes(self):
+        """节点总数"""
+        return self.fetch('SELECT COUNT(*) FROM node')[0][0]
+
+    def loadOpenTree(self, puuid=None, loaded=()):
+        """读取分组下的直接子节点，以及其中保存为展开状态的分组（逐级）的子节点
+
+        puuid 为 None 时从根开始；loaded 为界面中已加载的分组，同样读取其子节点。
+        返回 (邻接表, 有子节点的分组 uuid 集合, 已读取子节点的分组 uuid 集合)，邻接表格式同 loadTree()；
+        未展开的分组不读取其子节点，由调用方在展开时再调用本方法。
+        """
+        mapper = mapper_for(Node)
+        columns = f'{mapper.select_list}, EXISTS (SELECT 1 FROM node c WHERE c.puuid = node.uuid)'
+        loaded = list(loaded)
+        params = [encode(u) for u in loaded]
+        seeds = ['SELECT ?'] * len(loaded)
+        if puuid is None:
+            seeds.append("SELECT uuid FROM node WHERE puuid IS NULL AND type = 'F' AND expanded = 1")
+            roots = f"SELECT {columns} FROM node WHERE puuid IS NULL AND type IN ('F', 'L') UNION ALL "
+        else:
+            seeds.append('SELECT ?')
+            params.append(encode(puuid))
+            roots = ''
+        seed = ' UNION '.join(seeds)
+        rows = self.fetch(f"""
+            WITH RECURSIVE open(u) AS (
+                {seed}
+                UNION
+                SELECT node.uuid FROM node JOIN open ON node.puuid = open.u
+                WHERE node.type = 'F' AND node.expanded = 1
+            )
+            {roots}
+            SELECT {columns} FROM open CROSS JOIN node ON node.puuid = open.u
+            WHERE type IN ('F', 'L')
+            ORDER BY type, node COLLATE NOCASE
+        """, tuple(params))
+
+        tree, has_children = {}, set()
+        for row in rows:
+            node = self.session.load(mapper, row)
+            tree.setdefault(node.puuid, []).append(node)
+            if row[-1]:
+                has_children.add(node.uuid)
+
+        # 与 SQL 中的递归相同：起点分组下保存为展开状态的分组逐级视为已读取
+        opened = set(loaded)
+        pending = [puuid] + loaded
+        if puuid is not None:
+            opened.add(puuid)
+        while pending:
+            for child in tree.get(pending.pop(), ()):
+                if child.type == 'F' and child.expanded and child.uuid not in opened:
+                    opened.add(child.uuid)
+                    pending.append(child.uuid)
+        return tree, has_children, opened
+
+    # 搜索结果最多返回的命中节点数（不含为显示层级补上的上级分组）
+    SEARCH_LIMIT = 500
+
+    def searchTree(self, text, limit=None):
+        """按名称、描述、系统、Client、用户搜索节点，输入的每个词都须匹配（英文词按前缀，中文等按子串）
+
+        返回 (邻接表, 命中节点 uuid 集合)：邻接表与 loadTree() 相同，只包含命中节点及其全部上级分组。
+        """
+        mapper = mapper_for(Node)
+        limit = int(limit or self.SEARCH_LIMIT)
+        words = text.split()
+        if not words:
+            return {}, set()
+        # unicode61 分词把连续的中文当作一个词，只能匹配开头；含非 ASCII 字符的词改用 LIKE 做子串匹配
+        fts_words = [w for w in words if w.isascii()] if self.fts_enabled else []
+        like_words = [w for w in words if not (self.fts_enabled and w.isascii())]
+        clauses, params = [], []
+        if fts_words:
+            clauses.append(f'n.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)')
+            params.append(_fts_query(fts_words))
+        for word in like_words:
+            clauses.append('(n.node LIKE ? OR n.desc LIKE ? OR l.system LIKE ? OR l.client LIKE ? '
+                           'OR l.user LIKE ?)')
+            params.extend([f'%{word}%'] * 5)
+        hits_sql = f'SELECT n.uuid FROM node n LEFT JOIN link l ON l.uuid = n.uuid ' \
+                   f'WHERE {" AND ".join(clauses)} LIMIT {limit}'
+        # CROSS JOIN 固定由结果集驱动按 uuid 查节点，避免为了排序按 type 索引扫描整张表
+        rows = self.fetch(f"""
+            WITH RECURSIVE hit(u) AS ({hits_sql}),
+            shown(u) AS (
+                SELECT u FROM hit
+                UNION
+                SELECT node.puuid FROM node JOIN shown ON node.uuid = shown.u
+                WHERE node.puuid IS NOT NULL
+            )
+            SELECT {mapper.select_list}, u IN (SELECT u FROM hit)
+            FROM shown CROSS JOIN node ON node.uuid = shown.u
+            WHERE type IN ('F', 'L')
+            ORDER BY type, node COLLATE NOCASE
+        """, params)
+
+        tree, hits = {}, set()
+        for row in rows:
+            node = self.session.load(mapper, row)
+            tree.setdefault(node.puuid, []).append(node)
+            if row[-1]:
+                hits.add(node.uuid)
+        return tree, hits
+
     def getGroup(self):
-        """获取所有分组"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+        """获取所有分组（结果缓存在查询缓存中，调用方只读使用）"""
+        return self.fetch("""
             SELECT node, uuid FROM node 
             WHERE type = 'F'
             ORDER BY node
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        groups = []
-        for row in rows:
-            groups.append({
-                'group': row[0],
-                'uuid': row[1]
-            })
-        return groups
-
-
-# 为了兼容现有代码，添加列定义
-Node.node = Column('node')
-Node.desc = Column('desc')
-Node.group = Column('group')
-Node.type = Column('type')
-Node.position = Column('position')
-Node.uuid = Column('uuid')
-Node.puuid = Column('puuid')
-Node.expanded = Column('expanded')
-Node.id = Column('id')
-
-Link.uuid = Column('uuid')
-Link.node = Column('node')
-Link.system = Column('system')
-Link.client = Column('client')
-Link.user = Column('user')
-Link.password = Column('password')
-Link.language = Column('language')
-Link.id = Column('id')
-
-Config.key = Column('key')
-Config.value = Column('value')
-Config.id = Column('id')
+        """, transform=_group_rows)
+
+
+def _fts_query(words):
+    """将输入的词转换为 FTS5 查询：每个词作为短语做前缀匹配，多个词同时满足"""
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def _group_rows(rows):
+    """getGroup 的结果行转换为 [{'group': 名称, 'uuid': 字符串}]"""
+    groups = []
+    for row in rows:
+        groups.append({
+            'group': row[0],
+            'uuid': str(decode_uuid(row[1])) if row[1] else row[1]
+        })
+    return groups
+
+
+# 为了兼容现有代码，添加列定义（如 Node.uuid == value）
+for _mapper in MAPPERS.values():
+    for _name in _mapper.columns:
+        _mapper.model_class.set_column(_name, Column(_name))
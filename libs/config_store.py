@@ -0,0 +1,72 @@
+"""配置服务 - config 表整表缓存在内存中，读取不访问数据库，写入直接 UPSERT"""
+from libs.guiCfg import GuiCfg
+from libs.Model import Config
+
+
+class ConfigStore:
+    """config 表的内存缓存
+
+    首次读取时一次性加载整张表；写入通过单条 UPSERT 同步到数据库并更新缓存。
+    由配置派生的结论（如 sapshcut.exe 是否存在于配置的路径下）同样缓存，配置变化时失效。
+    """
+
+    PATH_KEY = 'path'
+
+    def __init__(self, db):
+        self.db = db
+        self._values = None
+        # 已确认存在 sapshcut.exe 的路径
+        self._shcut_checked = None
+
+    def _ensure_loaded(self):
+        if self._values is None:
+            rows = self.db._get_connection().execute('SELECT key, value FROM config').fetchall()
+            self._values = {row[0]: row[1] for row in rows}
+        return self._values
+
+    def get(self, key, default=None):
+        """读取配置值"""
+        self.db.check_changes()
+        return self._ensure_loaded().get(key, default)
+
+    def set(self, key, value):
+        """写入配置值（不存在时插入，存在时更新）"""
+        values = self._ensure_loaded()
+        if key in values and values[key] == value:
+            return
+        with self.db.transaction() as conn:
+            conn.execute('INSERT INTO config (key, value) VALUES (?, ?) '
+                         'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+        values[key] = value
+        self._invalidate(key)
+
+    def delete(self, key):
+        """删除配置项"""
+        values = self._ensure_loaded()
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM config WHERE key = ?', (key,))
+        values.pop(key, None)
+        self._invalidate(key)
+
+    def reload(self):
+        """丢弃缓存，下次读取时重新加载（数据库被其他途径修改后调用）"""
+        self._values = None
+        self._shcut_checked = None
+
+    def _invalidate(self, key):
+        # 会话中已加载的 Config 对象随之失效
+        self.db.session.evict(Config, key)
+        if key == self.PATH_KEY:
+            self._shcut_checked = None
+
+    def sapshcut_exists(self):
+        """配置的 GUI 路径下是否存在 sapshcut.exe；确认存在后缓存结果，直到路径变化"""
+        path = self.get(self.PATH_KEY)
+        if not path:
+            return False
+        if self._shcut_checked == path:
+            return True
+        if GuiCfg().checkSapGuiDir(path):
+            self._shcut_checked = path
+            return True
+        return False
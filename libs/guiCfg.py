@@ -1,5 +1,3 @@
-import json
-import xml.etree.ElementTree as ET
 import os
 
 
@@ -9,31 +7,35 @@ class GuiCfg:
         self.sapGuiCommDir = os.path.expanduser('~') + r'\AppData\Roaming\SAP\Common'
         self.appName = 'sapshcut.exe'
 
+    def landscapeCachePath(self):
+        """Landscape 解析结果的磁盘缓存文件"""
+        return self.sapGuiCommDir + '/zlogon_landscape.json'
+
+    def loadLandscape(self, filePath=None):
+        """读取 Landscape（内存/磁盘缓存命中时不解析 XML）"""
+        if filePath is None:
+            filePath = self.sapGuiCommDir + r'/SAPUILandscape.xml'
+        # XML 解析相关模块较重，首次读取 Landscape 时才导入，不拖慢启动
+        from libs.landscape import get_service
+        return get_service(self.landscapeCachePath()).load(filePath)
+
     def getSapGuiLogonConfig(self):
-        pathStr = self.sapGuiCommDir + r'/SAPUILandscape.xml'
-        systems = self.parseSapGuiLogonXml(pathStr)
-        return sorted(systems, key=lambda x: x["system"], reverse=False)
+        # 名称索引已排序
+        return self.loadLandscape().systems()
 
     def parseSapGuiLogonXml(self, filePath):
-        """使用xml.etree替代xmltodict，减少依赖体积"""
-        try:
-            tree = ET.parse(filePath)
-            root = tree.getroot()
-            systems = []
-            
-            # 查找Services下的所有Service元素
-            services = root.find('.//Services')
-            if services is not None:
-                for service in services.findall('Service'):
-                    if service.get('type') == 'SAPGUI':
-                        systems.append({
-                            'system': service.get('name')
-                        })
-            
-            return systems
-        except Exception as e:
-            print(f"Error parsing XML: {e}")
-            return []
+        return self.loadLandscape(filePath).systems()
+
+    def getSapGuiLandscape(self):
+        return self.loadLandscape().entries()
+
+    def parseSapGuiLandscape(self, filePath):
+        """读取 Landscape 中的 SAPGUI 服务及其所在的 Workspaces/Nodes 文件夹
+
+        返回 [{'system': 服务名, 'sid': 系统 ID, 'desc': 描述, 'path': (工作区, 文件夹...)}]，
+        被多个文件夹引用的服务每处各返回一条，未被引用的服务 path 为空。
+        """
+        return self.loadLandscape(filePath).entries()
 
     def checkSapGuiDir(self, path=None):
         # def isExist(self, name, path=None):
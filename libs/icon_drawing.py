@@ -1,124 +1,251 @@
-"""Icon drawing module - 图标绘制模块"""
+"""Icon drawing module - 图标绘制模块
+
+图标先在 Python 中栅格化为像素矩阵，再编码为 PNG 一次性交给 Tk，不再逐像素调用 img.put。
+get_icon() 返回进程内共享的图标（按 Tk 缩放比例选择 16/24/32px），主窗口与各对话框复用同一组图片。
+"""
+import base64
+import struct
+import weakref
+import zlib
 import tkinter as tk
 
+# 树形图标的基准尺寸与预生成的高分屏尺寸
+BASE_SIZE = 16
+ICON_SIZES = (16, 24, 32)
+# 眼睛图标（密码框）的基准尺寸
+EYE_SIZE = 20
 
-def create_folder_closed_icon(size=16):
-    """创建关闭的文件夹图标，返回PhotoImage对象"""
-    img = tk.PhotoImage(width=size, height=size)
-    
-    # 绘制文件夹身体
+_FOLDER_BODY = '#FFB84D'  # 橙黄色
+_FOLDER_EDGE = '#E69500'
+_FOLDER_TAB = '#FFD966'
+_LINK_BODY = '#81C784'  # 浅绿色
+_LINK_EDGE = '#4CAF50'
+
+
+# ---- 像素矩阵：grid[y][x] 为 '#RRGGBB' 或 (r, g, b, a)，None 为透明 ----
+
+def _grid(size):
+    return [[None] * size for _ in range(size)]
+
+
+def _folder_closed_pixels(size=BASE_SIZE):
+    grid = _grid(size)
+    # 文件夹身体
     for x in range(2, size-2):
         for y in range(4, size-2):
-            img.put("#FFB84D", (x, y))  # 橙黄色
-    
-    # 绘制边框
+            grid[y][x] = _FOLDER_BODY
+    # 边框
     for x in range(2, size-2):
-        img.put("#E69500", (x, 4))  # 上边框
-        img.put("#E69500", (x, size-3))  # 下边框
+        grid[4][x] = grid[size-3][x] = _FOLDER_EDGE
     for y in range(4, size-2):
-        img.put("#E69500", (2, y))  # 左边框
-        img.put("#E69500", (size-3, y))  # 右边框
-    
-    # 绘制顶部标签
+        grid[y][2] = grid[y][size-3] = _FOLDER_EDGE
+    # 顶部标签
     for x in range(2, size-2):
-        for y in range(1, 4):
-            if y == 1:  # 顶部线
-                img.put("#E69500", (x, y))
-            elif y == 2:  # 中间填充
-                img.put("#FFD966", (x, y))
-            elif y == 3 and (x <= 5 or x >= size-5):  # 两边竖线
-                img.put("#E69500", (x, y))
-    
-    return img
-
-
-def create_folder_open_icon(size=16):
-    """创建打开的文件夹图标，返回PhotoImage对象"""
-    img = tk.PhotoImage(width=size, height=size)
-    
-    # 绘制文件夹身体
+        grid[1][x] = _FOLDER_EDGE
+        grid[2][x] = _FOLDER_TAB
+        if x <= 5 or x >= size-5:
+            grid[3][x] = _FOLDER_EDGE
+    return grid
+
+
+def _folder_open_pixels(size=BASE_SIZE):
+    grid = _grid(size)
+    # 文件夹身体
     for x in range(2, size-2):
         for y in range(5, size-2):
-            img.put("#FFB84D", (x, y))
-    
-    # 绘制边框
+            grid[y][x] = _FOLDER_BODY
+    # 边框
     for x in range(2, size-2):
-        img.put("#E69500", (x, 5))  # 上边框
-        img.put("#E69500", (x, size-3))  # 下边框
+        grid[5][x] = grid[size-3][x] = _FOLDER_EDGE
     for y in range(5, size-2):
-        img.put("#E69500", (2, y))  # 左边框
-        img.put("#E69500", (size-3, y))  # 右边框
-    
-    # 绘制打开的标签部分
-    # 左侧标签
-    for x in range(2, 8):
-        for y in range(2, 5):
-            if y == 2:  # 顶部线
-                img.put("#E69500", (x, y))
-            elif y == 3:  # 中间填充
-                img.put("#FFD966", (x, y))
-            elif y == 4 and (x == 2 or x == 7):  # 两边竖线
-                img.put("#E69500", (x, y))
-    
-    # 右侧标签
-    for x in range(size-8, size-2):
-        for y in range(2, 5):
-            if y == 2:  # 顶部线
-                img.put("#E69500", (x, y))
-            elif y == 3:  # 中间填充
-                img.put("#FFD966", (x, y))
-            elif y == 4 and (x == size-8 or x == size-3):  # 两边竖线
-                img.put("#E69500", (x, y))
-    
-    return img
-
-
-def create_link_icon(size=16):
-    """创建连接图标：插头造型，返回PhotoImage对象"""
-    img = tk.PhotoImage(width=size, height=size)
-    
-    # 绘制插头主体（矩形）
+        grid[y][2] = grid[y][size-3] = _FOLDER_EDGE
+    # 打开的标签：左右两部分
+    for left, right in ((2, 7), (size-8, size-3)):
+        for x in range(left, right + 1):
+            grid[2][x] = _FOLDER_EDGE
+            grid[3][x] = _FOLDER_TAB
+        grid[4][left] = grid[4][right] = _FOLDER_EDGE
+    return grid
+
+
+def _link_pixels(size=BASE_SIZE):
+    """插头造型"""
+    grid = _grid(size)
+    # 插头主体（矩形）
     for x in range(3, size-3):
         for y in range(2, size-6):
-            img.put("#81C784", (x, y))  # 浅绿色
-    
-    # 绘制插头边框
+            grid[y][x] = _LINK_BODY
+    # 插头边框
     for x in range(3, size-3):
-        img.put("#4CAF50", (x, 2))  # 上边框
-        img.put("#4CAF50", (x, size-7))  # 下边框
+        grid[2][x] = grid[size-7][x] = _LINK_EDGE
     for y in range(2, size-6):
-        img.put("#4CAF50", (3, y))  # 左边框
-        img.put("#4CAF50", (size-4, y))  # 右边框
-    
-    # 绘制两个插脚
-    for x in range(5, 7):
-        for y in range(size-6, size-2):
-            img.put("#4CAF50", (x, y))  # 左插脚
-    for x in range(size-7, size-5):
-        for y in range(size-6, size-2):
-            img.put("#4CAF50", (x, y))  # 右插脚
-    
-    return img
+        grid[y][3] = grid[y][size-4] = _LINK_EDGE
+    # 两个插脚
+    for y in range(size-6, size-2):
+        for x in (5, 6, size-7, size-6):
+            grid[y][x] = _LINK_EDGE
+    return grid
 
 
-def draw_eye_icon(canvas, closed=False):
-    """绘制眼睛图标到Canvas上"""
-    # 清除画布
-    canvas.delete("all")
-    
+def _eye_pixels(size=EYE_SIZE, closed=False):
+    """眼睛图标：按 EYE_SIZE 坐标系描述的椭圆/线段，4x4 超采样得到抗锯齿的透明度"""
+    scale = size / EYE_SIZE
+
+    def ring(cx, cy, rx, ry, width):
+        def inside(x, y):
+            d = ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2
+            # 椭圆边线：归一化距离换算为近似的像素距离
+            return abs(d ** 0.5 - 1) * min(rx, ry) <= width / 2
+        return inside
+
+    def disc(cx, cy, rx, ry):
+        return lambda x, y: ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 <= 1
+
+    def line(x0, y0, x1, y1, width):
+        dx, dy = x1 - x0, y1 - y0
+        length2 = dx * dx + dy * dy
+
+        def inside(x, y):
+            t = max(0.0, min(1.0, ((x - x0) * dx + (y - y0) * dy) / length2))
+            px, py = x0 + t * dx - x, y0 + t * dy - y
+            return px * px + py * py <= (width / 2) ** 2
+        return inside
+
+    # 后面的形状覆盖前面的
+    shapes = [(ring(10, 10, 7, 5, 1.5), (0x4A, 0x90, 0xE2))]
     if closed:
-        # 密码隐藏状态 - 画一个闭合的眼睛
-        # 眼睛外轮廓
-        canvas.create_oval(3, 5, 17, 15, outline='#4A90E2', width=1.5)
-        # 内部弧形
-        canvas.create_oval(6, 7, 14, 13, outline='#7FBCEB', width=1)
-        # 斜杠，使用深灰色更接近黑色
-        canvas.create_line(16, 6, 4, 14, fill='#666666', width=1.8, capstyle=tk.ROUND)
+        # 密码隐藏状态：内部弧形 + 斜杠
+        shapes.append((ring(10, 10, 4, 3, 1), (0x7F, 0xBC, 0xEB)))
+        shapes.append((line(16, 6, 4, 14, 1.8), (0x66, 0x66, 0x66)))
+    else:
+        # 密码可见状态：眼珠 + 反光点
+        shapes.append((disc(10, 10, 2, 3), (0x2C, 0x6F, 0xC8)))
+        shapes.append((disc(9.5, 8.5, 0.8, 0.8), (0xFF, 0xFF, 0xFF)))
+
+    samples = [(i + 0.5) / 4 for i in range(4)]
+    grid = _grid(size)
+    for py in range(size):
+        for px in range(size):
+            coverage = {}
+            for sy in samples:
+                for sx in samples:
+                    x, y = (px + sx) / scale, (py + sy) / scale
+                    for index in range(len(shapes) - 1, -1, -1):
+                        if shapes[index][0](x, y):
+                            coverage[index] = coverage.get(index, 0) + 1
+                            break
+            if coverage:
+                total = sum(coverage.values())
+                r, g, b = (sum(shapes[i][1][c] * n for i, n in coverage.items()) // total for c in range(3))
+                grid[py][px] = (r, g, b, round(255 * total / 16))
+    return grid
+
+
+def _scale_pixels(grid, size):
+    """最近邻缩放到 size，用于由 16px 基准图生成高分屏图标"""
+    source = len(grid)
+    if source == size:
+        return grid
+    index = [min(source - 1, i * source // size) for i in range(size)]
+    return [[grid[sy][sx] for sx in index] for sy in index]
+
+
+def _rgba(pixel):
+    if pixel is None:
+        return b'\x00\x00\x00\x00'
+    if isinstance(pixel, tuple):
+        return bytes(pixel)
+    return bytes.fromhex(pixel[1:]) + b'\xff'
+
+
+def encode_png(grid):
+    """像素矩阵编码为 RGBA PNG（base64 字符串，可直接作为 PhotoImage 的 data）"""
+    height, width = len(grid), len(grid[0])
+    raw = b''.join(b'\x00' + b''.join(_rgba(p) for p in row) for row in grid)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    png = (b'\x89PNG\r\n\x1a\n'
+           + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+           + chunk(b'IDAT', zlib.compress(raw, 9))
+           + chunk(b'IEND', b''))
+    return base64.b64encode(png).decode('ascii')
+
+
+# 图标名称 -> (像素矩阵生成函数, 基准尺寸)
+_ICONS = {
+    'folder-closed': (_folder_closed_pixels, BASE_SIZE),
+    'folder-open': (_folder_open_pixels, BASE_SIZE),
+    'link': (_link_pixels, BASE_SIZE),
+    'eye-open': (lambda size: _eye_pixels(size, closed=False), EYE_SIZE),
+    'eye-closed': (lambda size: _eye_pixels(size, closed=True), EYE_SIZE),
+}
+
+# Tk 根窗口 -> {(图标名称, 尺寸): PhotoImage}；图片属于创建它的 Tk 解释器，按根窗口区分，
+# 根窗口被回收后其图标随之释放
+_cache = weakref.WeakKeyDictionary()
+
+
+def icon_size(widget, base=BASE_SIZE):
+    """按 Tk 缩放比例（tk scaling，96 DPI 时约为 1.33）选择 1x/1.5x/2x 尺寸"""
+    try:
+        factor = float(widget.tk.call('tk', 'scaling')) * 72 / 96
+    except (tk.TclError, ValueError):
+        factor = 1.0
+    ratio = 1 if factor < 1.25 else 1.5 if factor < 1.75 else 2
+    return int(base * ratio)
+
+
+def render_icon(name, size=None, master=None):
+    """栅格化一个图标并创建新的 PhotoImage（一次 Tk 调用）"""
+    build, base = _ICONS[name]
+    size = size or base
+    if base == BASE_SIZE:
+        # 树形图标按 16px 的像素造型放大，保持像素风格一致
+        grid = _scale_pixels(build(base), size)
+    else:
+        grid = build(size)
+    return tk.PhotoImage(master=master, data=encode_png(grid), format='png')
+
+
+def get_icon(name, master=None, size=None):
+    """取共享的图标；size 为空时按 master 所在屏幕的缩放比例选择"""
+    root = master._root() if master is not None else tk._default_root
+    if size is None:
+        size = icon_size(root, _ICONS[name][1]) if root is not None else _ICONS[name][1]
+    if root is None:
+        return render_icon(name, size)
+    icons = _cache.get(root)
+    if icons is None:
+        icons = _cache[root] = {}
+    image = icons.get((name, size))
+    if image is None:
+        image = icons[name, size] = render_icon(name, size, root)
+    return image
+
+
+def create_folder_closed_icon(size=BASE_SIZE):
+    """创建关闭的文件夹图标，返回PhotoImage对象"""
+    return render_icon('folder-closed', size)
+
+
+def create_folder_open_icon(size=BASE_SIZE):
+    """创建打开的文件夹图标，返回PhotoImage对象"""
+    return render_icon('folder-open', size)
+
+
+def create_link_icon(size=BASE_SIZE):
+    """创建连接图标：插头造型，返回PhotoImage对象"""
+    return render_icon('link', size)
+
+
+def draw_eye_icon(canvas, closed=False):
+    """在Canvas上显示眼睛图标；图片共享，切换时只替换图片"""
+    image = get_icon('eye-closed' if closed else 'eye-open', canvas)
+    items = canvas.find_withtag('eye')
+    if items:
+        canvas.itemconfigure(items[0], image=image)
     else:
-        # 密码可见状态 - 画一个睁开的眼睛
-        # 眼睛外轮廓
-        canvas.create_oval(3, 5, 17, 15, outline='#4A90E2', width=1.5)
-        # 眼珠 - 使用深蓝色
-        canvas.create_oval(8, 7, 12, 13, fill='#2C6FC8', outline='#2C6FC8')
-        # 反光点
-        canvas.create_oval(9, 8, 10, 9, fill='white', outline='white')
+        canvas.delete('all')
+        canvas.create_image(int(canvas['width']) // 2, int(canvas['height']) // 2, image=image, tags='eye')
@@ -0,0 +1,264 @@
+"""单实例与命令转发 - 运行中的实例在本地 IPC 通道上监听，再次启动时把命令交给它后立即退出
+
+Windows 使用命名管道，其他平台使用 Unix 域套接字（multiprocessing.connection）。第一个创建监听的进程即为运行中的实例
+（Windows 命名管道以 FILE_FLAG_FIRST_PIPE_INSTANCE 创建，套接字文件只能绑定一次）。
+套接字与连接密钥放在当前用户私有的目录（0700）中，连接时用密钥做 HMAC 握手，其他用户的进程无法发送命令。
+命令为 JSON：{"cmd": "show"} 显示窗口，{"cmd": "logon", "target": "分组/子分组/连接"} 登录连接或分组内全部连接。
+本模块不导入 Tk 与数据库，转发命令的进程不创建窗口、不打开数据库。
+"""
+import json
+import os
+import queue
+import socket
+import stat
+import sys
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+COMMANDS = ('show', 'logon')
+USAGE = 'usage: run.py [logon <分组/连接>]'
+# 等待运行中的实例确认收到命令的秒数
+REPLY_TIMEOUT = 2.0
+# 接受连接后完成密钥握手并收到命令的时限（秒），超时的连接被断开
+HANDSHAKE_TIMEOUT = 5.0
+# 单条命令的最大字节数
+MAX_MESSAGE = 64 * 1024
+# 连接密钥的字节数
+KEY_SIZE = 32
+
+
+def private_dir():
+    """当前用户私有的目录，不存在时以 0700 创建；目录不属于当前用户时抛出 OSError"""
+    if sys.platform == 'win32':
+        # 用户配置目录本身只有当前用户可访问
+        path = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'zlogon')
+        os.makedirs(path, exist_ok=True)
+        return path
+    # 优先使用只有当前用户可访问的运行时目录
+    base = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    path = os.path.join(base, f'zlogon-{os.getuid()}')
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        # 公共临时目录中被他人抢先创建的同名目录或链接
+        raise OSError(f'{path} 不是当前用户的目录')
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+def address():
+    """当前用户的 IPC 地址"""
+    if sys.platform == 'win32':
+        user = os.environ.get('USERNAME', '')
+        return r'\\.\pipe\zlogon-' + ''.join(c for c in user if c.isalnum()) if user else r'\\.\pipe\zlogon'
+    return os.path.join(private_dir(), 'instance.sock')
+
+
+def authkey():
+    """当前用户的连接密钥：保存在私有目录中（0600），首次使用时随机生成"""
+    path = os.path.join(private_dir(), 'instance.key')
+    try:
+        with open(path, 'rb') as f:
+            key = f.read()
+        if len(key) == KEY_SIZE:
+            return key
+        # 长度不对（如写入中断）时重新生成
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    # 先写入临时文件再以硬链接发布：同时启动的进程只有一个能创建成功，其余读取它的密钥
+    tmp = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(KEY_SIZE))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _family():
+    return 'AF_PIPE' if sys.platform == 'win32' else 'AF_UNIX'
+
+
+def parse_command(argv):
+    """命令行转换为命令，不支持的命令返回 None；以 -- 开头的选项（如 --startup-report）忽略"""
+    args = [a for a in argv[1:] if not a.startswith('--')]
+    if not args:
+        return {'cmd': 'show'}
+    if args[0] == 'logon' and len(args) == 2 and args[1].strip():
+        return {'cmd': 'logon', 'target': args[1]}
+    return None
+
+
+def forward(command, timeout=REPLY_TIMEOUT):
+    """把命令交给运行中的实例，对方确认收到返回 True；没有运行中的实例返回 False"""
+    try:
+        conn = Client(address(), _family(), authkey=authkey())
+    except (OSError, EOFError, AuthenticationError):
+        return False
+    if sys.platform == 'win32':
+        _allow_foreground()
+    try:
+        conn.send_bytes(json.dumps(command).encode('utf-8'))
+        if not conn.poll(timeout):
+            return False
+        reply = json.loads(conn.recv_bytes(MAX_MESSAGE).decode('utf-8'))
+        return bool(reply.get('ok'))
+    except (OSError, EOFError, ValueError):
+        return False
+    finally:
+        conn.close()
+
+
+def _allow_foreground():
+    """允许运行中的实例把窗口切换到前台（Windows 只允许前台进程授权）"""
+    try:
+        import ctypes
+        ASFW_ANY = -1
+        ctypes.windll.user32.AllowSetForegroundWindow(ASFW_ANY)
+    except Exception:
+        pass
+
+
+def listen():
+    """开始监听并返回 InstanceServer；已有实例在监听时返回 None，无法创建私有目录或密钥时抛出 OSError"""
+    addr, key = address(), authkey()
+    if sys.platform != 'win32' and os.path.exists(addr):
+        # 套接字文件存在但无法连接：上次异常退出留下的，删除后重新绑定
+        try:
+            Client(addr, _family(), authkey=key).close()
+            return None
+        except (EOFError, AuthenticationError):
+            return None
+        except OSError:
+            try:
+                os.unlink(addr)
+            except OSError:
+                pass
+    try:
+        # 密钥握手不在 accept() 中进行，由 InstanceServer 在每个连接各自的线程中完成
+        listener = Listener(addr, _family())
+    except OSError:
+        return None
+    server = InstanceServer(listener, key)
+    server.start()
+    return server
+
+
+class InstanceServer(threading.Thread):
+    """后台线程接受连接，收到的命令放入队列，由界面线程用 poll() 取出执行
+
+    每个连接在单独的线程中完成密钥握手并读取命令，连接后不发送数据的客户端不会阻塞其他连接；
+    HANDSHAKE_TIMEOUT 秒内未完成的连接被断开（Unix 域套接字）。
+    """
+
+    def __init__(self, listener, authkey=None):
+        super().__init__(name='zlogon-instance', daemon=True)
+        self.listener = listener
+        self._authkey = authkey
+        self._commands = queue.Queue()
+        self._closed = False
+
+    def run(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            if self._closed:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), name='zlogon-instance-conn', daemon=True).start()
+
+    def _serve(self, conn):
+        # 超时断开与关闭连接互斥，避免断开已关闭后被重新分配的文件描述符
+        lock, done = threading.Lock(), []
+
+        def abort():
+            with lock:
+                if not done:
+                    _abort(conn)
+        timer = threading.Timer(HANDSHAKE_TIMEOUT, abort)
+        timer.daemon = True
+        timer.start()
+        try:
+            if self._authkey is not None:
+                # 与 Listener(authkey=...) 的 accept() 相同的双向 HMAC 握手
+                deliver_challenge(conn, self._authkey)
+                answer_challenge(conn, self._authkey)
+            self._handle(conn)
+        except (OSError, EOFError, AuthenticationError):
+            # 包括密钥不符与超时被断开的连接
+            pass
+        finally:
+            timer.cancel()
+            with lock:
+                done.append(True)
+                conn.close()
+
+    def _handle(self, conn):
+        try:
+            if not conn.poll(REPLY_TIMEOUT):
+                return
+            command = json.loads(conn.recv_bytes(MAX_MESSAGE).decode('utf-8'))
+        except (OSError, EOFError, ValueError):
+            return
+        ok = isinstance(command, dict) and command.get('cmd') in COMMANDS
+        if ok:
+            self._commands.put(command)
+        try:
+            conn.send_bytes(json.dumps({'ok': ok}).encode('utf-8'))
+        except OSError:
+            pass
+
+    def poll(self):
+        """取出全部待执行的命令（界面线程调用，不阻塞）"""
+        commands = []
+        while True:
+            try:
+                commands.append(self._commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    def close(self):
+        """停止监听；accept() 阻塞中时连接一次将其唤醒"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.is_alive():
+            try:
+                Client(self.listener.address, _family()).close()
+            except OSError:
+                pass
+            self.join(1.0)
+        self.listener.close()
+
+
+def _abort(conn):
+    """断开超时的连接：关闭套接字的读写，阻塞在读取中的握手立即以 EOFError 结束
+
+    Windows 命名管道无法这样中断，超时的连接只占用自己的线程。
+    """
+    try:
+        sock = socket.socket(fileno=os.dup(conn.fileno()))
+    except (OSError, ValueError):
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    finally:
+        sock.close()
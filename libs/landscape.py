@@ -0,0 +1,322 @@
+"""SAP Logon Landscape 读取 - iterparse 流式解析，结果按 路径/修改时间/大小 缓存在内存与磁盘
+
+SAPUILandscape.xml 结构：
+    <Workspaces><Workspace name><Node name>...<Item serviceid/></Node></Workspace></Workspaces>
+    <Services><Service type uuid name systemid msid server routerid .../></Services>
+    <Routers><Router uuid router/></Routers>
+    <Includes><Include url index/></Includes>   引用其他 Landscape 文件（如全局配置）
+"""
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote
+from urllib.request import url2pathname
+
+# 磁盘缓存格式版本，解析结果结构变化时加一使旧缓存失效
+CACHE_VERSION = 2
+# 并发解析 Include 文件的线程数上限
+MAX_WORKERS = 4
+
+
+class Landscape:
+    """一个 Landscape 文件的解析结果
+
+    services: {服务 uuid: 全部属性（router 已由 routerid 解析为路由字符串）}
+    items:    [(服务 uuid, (工作区, 文件夹...))]，按文件中出现的顺序
+    names:    SAPGUI 服务名称的有序索引
+    includes: 引用的其他 Landscape 文件 url，按 index 排序
+    """
+
+    def __init__(self, services=None, items=None, names=None, includes=None):
+        self.services = services or {}
+        self.items = items or []
+        self.names = names if names is not None else self._build_names(self.services)
+        self.includes = includes or []
+        self._systems = None
+
+    @staticmethod
+    def _build_names(services):
+        return sorted({s['name'] for s in services.values() if s.get('type') == 'SAPGUI' and s.get('name')})
+
+    def systems(self):
+        """[{'system': 名称}]，格式同 GuiCfg.getSapGuiLogonConfig；结果复用，调用方只读使用"""
+        if self._systems is None:
+            self._systems = [{'system': name} for name in self.names]
+        return self._systems
+
+    def entries(self):
+        """SAPGUI 服务及其所在文件夹，格式同 GuiCfg.parseSapGuiLandscape"""
+        def entry(service, path):
+            return {'system': service.get('name'), 'sid': service.get('systemid', ''),
+                    'desc': service.get('description', ''), 'path': path}
+
+        result, referenced = [], set()
+        for service_id, path in self.items:
+            service = self.services.get(service_id)
+            if service is not None and service.get('type') == 'SAPGUI' and service.get('name'):
+                referenced.add(service_id)
+                result.append(entry(service, path))
+        for service_id, service in self.services.items():
+            if service_id not in referenced and service.get('type') == 'SAPGUI' and service.get('name'):
+                result.append(entry(service, ()))
+        return result
+
+    def to_dict(self):
+        return {'services': self.services, 'items': [[sid, list(path)] for sid, path in self.items],
+                'names': self.names, 'includes': self.includes}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['services'], [(sid, tuple(path)) for sid, path in data['items']], data['names'],
+                   data['includes'])
+
+    @classmethod
+    def merge(cls, parts):
+        """按顺序合并多个文件的解析结果：服务按 uuid 去重，同名服务只保留先出现的一个"""
+        services, names, items, seen_items = {}, set(), [], set()
+        for part in parts:
+            for service_id, service in part.services.items():
+                name = service.get('name')
+                if service_id in services or (service.get('type') == 'SAPGUI' and name in names):
+                    continue
+                services[service_id] = service
+                if service.get('type') == 'SAPGUI' and name:
+                    names.add(name)
+            for item in part.items:
+                if item not in seen_items:
+                    seen_items.add(item)
+                    items.append(item)
+        return cls(services, items, sorted(names))
+
+
+def parse(path):
+    """流式解析 Landscape 文件，处理完的元素立即从树中移除"""
+    services, items, routers, includes = {}, [], {}, []
+    folders = []  # 当前所在的 工作区/文件夹 名称
+    stack = []
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            stack.append(elem)
+            if tag in ('Workspace', 'Node'):
+                folders.append(elem.get('name', ''))
+            continue
+        stack.pop()
+        if tag == 'Service':
+            if elem.get('uuid'):
+                services[elem.get('uuid')] = dict(elem.attrib)
+        elif tag == 'Item':
+            if elem.get('serviceid'):
+                items.append((elem.get('serviceid'), tuple(folders)))
+        elif tag == 'Router':
+            if elem.get('uuid'):
+                routers[elem.get('uuid')] = elem.get('router', '')
+        elif tag == 'Include':
+            if elem.get('url'):
+                includes.append((int(elem.get('index') or 0) if (elem.get('index') or '0').isdigit() else 0,
+                                 elem.get('url')))
+        elif tag in ('Workspace', 'Node'):
+            folders.pop()
+        # 每个元素结束时从父元素中移除，父元素中最多只保留当前子元素，内存占用与文件大小无关
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+    for service in services.values():
+        if service.get('routerid'):
+            service['router'] = routers.get(service['routerid'], '')
+    return Landscape(services, items, includes=[url for _, url in sorted(includes, key=lambda i: i[0])])
+
+
+def resolve_include(url, base_path):
+    """Include 的 url 转换为本地文件路径；非本地文件（http 等）返回 None"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        path = url2pathname(unquote(parsed.path))
+        if parsed.netloc not in ('', 'localhost'):
+            # file://server/share/x.xml 形式的网络共享路径
+            path = os.sep * 2 + parsed.netloc + path
+    elif parsed.scheme and len(parsed.scheme) > 1:
+        return None
+    else:
+        # 无协议（或 Windows 盘符被识别为单字母协议）时按文件路径处理，相对路径相对于引用它的文件
+        path = url
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(base_path), path)
+    return _normalize(path)
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _file_key(path):
+    """(修改时间, 大小)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class LandscapeService:
+    """Landscape 解析结果缓存
+
+    主文件及其 Include 引用的本地文件各自独立缓存，只重新解析有变化的文件；新的 Include 文件在线程池中并发解析。
+    内存缓存命中只需对每个文件各 stat 一次；文件未变化时重启程序后从磁盘缓存读取，不再解析 XML。
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._memory = {}  # 规范化路径 -> (文件键, 单个文件的 Landscape)
+        # 主文件路径 -> (((路径, 文件键), ...), 合并后的 Landscape)；不存在或解析失败的 Include 也记录在内
+        # （文件不存在时文件键为 None），文件出现或修改后重新合并
+        self._merged = {}
+        self._disk = None  # 磁盘缓存内容，首次使用时读取
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """读取 Landscape 并合并其 Include 的文件，主文件不存在时返回空结果"""
+        path = _normalize(path)
+        with self._lock:
+            merged = self._merged.get(path)
+        if merged is not None and all(_file_key(p) == key for p, key in merged[0]):
+            return merged[1]
+
+        parts, failed = self._load_tree(path)
+        if not parts:
+            return Landscape()
+        landscape = Landscape.merge(part for _, _, part in parts)
+        with self._lock:
+            self._merged[path] = (tuple((p, key) for p, key, _ in parts) + tuple(failed.items()), landscape)
+        return landscape
+
+    def _load_tree(self, root):
+        """按层读取主文件及其引用的文件
+
+        返回 ([(路径, 文件键, Landscape)], {读取失败的路径: 文件键})，前者顺序为主文件在前的深度优先顺序。
+        """
+        loaded = {}  # 路径 -> (文件键, Landscape)
+        failed = {}  # 不存在或解析失败的文件 -> 文件键
+        children = {}  # 路径 -> 引用的文件路径
+        visited = {root}
+        level = [root]
+        updates = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            while level:
+                for p, result in zip(level, pool.map(self._load_part, level)):
+                    if result is None:
+                        failed[p] = _file_key(p)
+                        continue
+                    loaded[p] = result[:2]
+                    if result[2]:
+                        updates[p] = result[:2]
+                next_level = []
+                for p in level:
+                    if p not in loaded:
+                        continue
+                    refs = [resolve_include(url, p) for url in loaded[p][1].includes]
+                    children[p] = [r for r in refs if r is not None]
+                    for ref in children[p]:
+                        # 已读取过的文件（包括循环引用）不再读取
+                        if ref not in visited:
+                            visited.add(ref)
+                            next_level.append(ref)
+                level = next_level
+        if updates:
+            self._save_disk(updates)
+
+        ordered, seen = [], set()
+
+        def visit(p):
+            if p in seen or p not in loaded:
+                return
+            seen.add(p)
+            ordered.append((p, loaded[p][0], loaded[p][1]))
+            for ref in children.get(p, ()):
+                visit(ref)
+        visit(root)
+        return ordered, failed
+
+    def _load_part(self, path):
+        """读取单个文件：返回 (文件键, Landscape, 是否新解析)，文件不存在或解析失败时返回 None"""
+        key = _file_key(path)
+        if key is None:
+            return None
+        with self._lock:
+            cached = self._memory.get(path)
+        if cached is not None and cached[0] == key:
+            return key, cached[1], False
+        landscape = self._load_disk(path, key)
+        parsed = landscape is None
+        if parsed:
+            try:
+                landscape = parse(path)
+            except (ET.ParseError, OSError) as e:
+                print(f"Error parsing XML {path}: {e}")
+                return None
+        with self._lock:
+            self._memory[path] = (key, landscape)
+        return key, landscape, parsed
+
+    def clear(self):
+        """清空内存缓存（磁盘缓存按文件键自动失效）"""
+        with self._lock:
+            self._memory.clear()
+            self._merged.clear()
+
+    # ---- 磁盘缓存 ----
+
+    def _disk_entries(self):
+        if self._disk is None:
+            self._disk = {}
+            if self.cache_path:
+                try:
+                    with open(self.cache_path, encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get('version') == CACHE_VERSION:
+                        self._disk = data.get('files', {})
+                except (OSError, ValueError):
+                    pass
+        return self._disk
+
+    def _load_disk(self, path, key):
+        with self._lock:
+            entry = self._disk_entries().get(path)
+        if entry is None or tuple(entry.get('key', ())) != key:
+            return None
+        try:
+            return Landscape.from_dict(entry['data'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _save_disk(self, updates):
+        """写入 {路径: (文件键, Landscape)}"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            files = self._disk_entries()
+            for path, (key, landscape) in updates.items():
+                files[path] = {'key': list(key), 'data': landscape.to_dict()}
+            # 先写临时文件再替换，避免写入中断留下损坏的缓存
+            tmp = self.cache_path + '.tmp'
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump({'version': CACHE_VERSION, 'files': files}, f, ensure_ascii=False)
+                os.replace(tmp, self.cache_path)
+            except OSError as e:
+                print(f"Error saving landscape cache: {e}")
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(cache_path=None):
+    """按磁盘缓存路径取共享的 LandscapeService（进程内只解析一次）"""
+    with _services_lock:
+        service = _services.get(cache_path)
+        if service is None:
+            service = _services[cache_path] = LandscapeService(cache_path)
+        return service
@@ -0,0 +1,220 @@
+"""登录启动器 - 不阻塞 Tk 主循环地启动 sapshcut，后台线程回收子进程并把结果交给界面
+
+启动命令可通过环境变量 ZLOGON_LAUNCH_CMD 替换（如 "python tests/stub.py"），参数照常追加在后面，
+便于在没有 SAP GUI 的环境中测试。
+"""
+import collections
+import itertools
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+LAUNCH_CMD_ENV = 'ZLOGON_LAUNCH_CMD'
+
+
+def sapshcut_args(link):
+    """连接对应的 sapshcut 参数（不含程序路径）"""
+    return ['-user=' + link.user, '-pw=' + link.password, '-language=' + link.language, '-SYSTEM=',
+            '-CLIENT=' + link.client, '-sysname=' + link.system, '-max']
+
+
+def command_override():
+    """环境变量指定的启动命令（拆分后的列表），未指定返回 None"""
+    value = os.environ.get(LAUNCH_CMD_ENV, '').strip()
+    if not value:
+        return None
+    return shlex.split(value, posix=os.name != 'nt')
+
+
+class Session:
+    """一次登录启动：running 运行中，exited 已结束（returncode 为退出码），failed 启动失败（error）"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, system='', client=''):
+        self.id = next(self._ids)
+        self.name = name
+        self.system = system
+        self.client = client
+        self.pid = None
+        self.started = time.time()
+        self.finished = None
+        self.returncode = None
+        self.error = None
+        self._process = None
+
+    @property
+    def status(self):
+        if self.error is not None:
+            return 'failed'
+        if self.returncode is not None:
+            return 'exited'
+        return 'running'
+
+    @property
+    def ok(self):
+        return self.status == 'exited' and self.returncode == 0
+
+
+class Launcher:
+    """启动并跟踪子进程
+
+    launch() 只创建进程即返回；一个后台线程轮询回收已退出的子进程，结果（退出或启动失败）放入事件队列，
+    界面线程用 poll_events() 取出处理。sessions() 为本实例启动过的全部会话。
+    """
+
+    def __init__(self, command=None, poll_interval=0.2, keep=50):
+        # command 为启动程序及其固定参数的列表，None 时使用环境变量或调用方传入的程序
+        self.command = command if command is not None else command_override()
+        self.poll_interval = poll_interval
+        self.keep = keep  # 已结束的会话最多保留多少个
+        self._sessions = []
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._reaper = None
+        self._closed = False
+
+    def launch(self, program, args, name='', system='', client=''):
+        """启动 program（被 command 替换时忽略）并立即返回会话；启动失败也通过事件队列报告"""
+        session = Session(name, system, client)
+        argv = (list(self.command) if self.command else [program]) + list(args)
+        try:
+            session._process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL)
+            session.pid = session._process.pid
+        except (OSError, ValueError) as e:
+            session.error = str(e)
+            session.finished = time.time()
+        with self._lock:
+            self._sessions.append(session)
+            self._trim()
+            if session.error is None:
+                self._ensure_reaper()
+        if session.error is not None:
+            self._events.put(session)
+        return session
+
+    def sessions(self, running_only=False):
+        with self._lock:
+            return [s for s in self._sessions if not running_only or s.status == 'running']
+
+    def poll_events(self):
+        """取出全部已结束/启动失败的会话（界面线程调用，不阻塞）"""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self, timeout=1.0):
+        """停止回收线程；已启动的登录进程不受影响"""
+        self._closed = True
+        self._wakeup.set()
+        reaper = self._reaper
+        if reaper is not None and reaper.is_alive():
+            reaper.join(timeout)
+
+    def _ensure_reaper(self):
+        # 调用方持有 self._lock
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap, name='zlogon-launcher-reaper', daemon=True)
+            self._reaper.start()
+        self._wakeup.set()
+
+    def _reap(self):
+        while not self._closed:
+            with self._lock:
+                running = [s for s in self._sessions if s._process is not None and s.returncode is None]
+                if not running:
+                    # 没有子进程时退出，下次启动时重新创建
+                    self._reaper = None
+                    return
+            for session in running:
+                returncode = session._process.poll()
+                if returncode is not None:
+                    session.finished = time.time()
+                    session.returncode = returncode
+                    session._process = None
+                    self._events.put(session)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _trim(self):
+        # 调用方持有 self._lock：只丢弃较早的已结束会话
+        finished = [s for s in self._sessions if s.status != 'running']
+        for session in finished[:max(0, len(finished) - self.keep)]:
+            self._sessions.remove(session)
+
+
+class LaunchQueue:
+    """限流的批量登录队列
+
+    同时运行的登录进程不超过 concurrency 个，相邻两次启动至少间隔 delay 秒，避免一次性拉起大量 SAP GUI。
+    由界面线程定时调用 pump()：按限制启动排队中的登录，并返回各项目的状态变化 [(key, 状态, 会话)]，
+    状态为 queued/running/ok/failed。
+    """
+
+    def __init__(self, launcher, concurrency=3, delay=1.0):
+        self.launcher = launcher
+        self.concurrency = max(1, int(concurrency))
+        self.delay = max(0.0, float(delay))
+        self._pending = collections.deque()  # (key, program, args, name, system, client)
+        self._running = {}  # 会话 id -> key
+        self._keys = set()  # 排队中或运行中的 key
+        self._last_launch = 0.0
+        self._changes = []
+
+    def submit(self, key, program, args, name='', system='', client=''):
+        """加入队列；同一 key 已在排队或运行时忽略，返回是否加入"""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._pending.append((key, program, args, name, system, client))
+        self._changes.append((key, 'queued', None))
+        return True
+
+    def cancel(self):
+        """取消尚未启动的登录，返回取消的 key"""
+        keys = [item[0] for item in self._pending]
+        self._pending.clear()
+        self._keys.difference_update(keys)
+        return keys
+
+    def pending(self):
+        """排队中（尚未启动）的登录数"""
+        return len(self._pending)
+
+    def busy(self):
+        return bool(self._pending or self._running)
+
+    def next_launch_in(self):
+        """距离下一次可以启动的秒数（没有排队项目时为 None）"""
+        if not self._pending:
+            return None
+        return max(0.0, self._last_launch + self.delay - time.monotonic())
+
+    def pump(self):
+        changes, self._changes = self._changes, []
+        for session in self.launcher.poll_events():
+            key = self._running.pop(session.id, None)
+            if key is None:
+                continue
+            self._keys.discard(key)
+            changes.append((key, 'ok' if session.ok else 'failed', session))
+        while self._pending and len(self._running) < self.concurrency and self.next_launch_in() == 0:
+            key, program, args, name, system, client = self._pending.popleft()
+            session = self.launcher.launch(program, args, name, system, client)
+            self._last_launch = time.monotonic()
+            if session.status == 'failed':
+                # 启动失败的事件已放入队列，这里直接报告，poll_events 取到时忽略
+                self._keys.discard(key)
+                changes.append((key, 'failed', session))
+            else:
+                self._running[session.id] = key
+                changes.append((key, 'running', session))
+        return changes
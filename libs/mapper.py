@@ -0,0 +1,206 @@
+"""模型与数据表的映射 - 列定义、SQL 编译缓存与行转换"""
+from uuid import UUID
+
+from libs.Model import Node, Link, Config
+
+
+def escape_column(name: str) -> str:
+    """转义 SQL 保留字列名"""
+    reserved_words = {
+        'group', 'order', 'select', 'from', 'where', 'and', 'or', 'not', 'in',
+        'join', 'left', 'right', 'inner', 'outer', 'on', 'as', 'by', 'limit',
+        'offset', 'distinct', 'all', 'any', 'exists', 'between', 'like', 'is',
+        'null', 'values', 'insert', 'update', 'delete', 'create', 'drop', 'alter'
+    }
+    if name.lower() in reserved_words:
+        return f'"{name}"'
+    return name
+
+
+# UUID 的存储格式：'text' 为 36 位字符串，'blob' 为 16 字节
+UUID_FORMATS = ('text', 'blob')
+_uuid_format = 'text'
+
+
+def set_uuid_format(fmt):
+    """切换 UUID 参数的编码方式，需与数据库中实际的存储格式一致"""
+    global _uuid_format
+    if fmt not in UUID_FORMATS:
+        raise ValueError(f'不支持的 UUID 存储格式: {fmt}')
+    _uuid_format = fmt
+
+
+def get_uuid_format():
+    return _uuid_format
+
+
+def encode_uuid(value, fmt=None):
+    """UUID 转换为存储值"""
+    return value.bytes if (fmt or _uuid_format) == 'blob' else str(value)
+
+
+def decode_uuid(raw):
+    """存储值（TEXT 或 BLOB）转换为 UUID"""
+    if raw is None or isinstance(raw, UUID):
+        return raw
+    return UUID(bytes=raw) if isinstance(raw, bytes) else UUID(raw)
+
+
+def uuid_key(value):
+    """UUID 的规范化键（32 位十六进制），不论是 UUID 对象、TEXT 还是 BLOB 形式都得到同一个值"""
+    if isinstance(value, UUID):
+        return value.hex
+    if isinstance(value, bytes):
+        return value.hex()
+    # TEXT 形式均由 str(UUID) 写入，已是小写
+    return str(value).replace('-', '')
+
+
+def encode(value):
+    """将模型属性转换为数据库存储值"""
+    if isinstance(value, UUID):
+        return encode_uuid(value)
+    if isinstance(value, bool):
+        return 1 if value else 0
+    return value
+
+
+class TableMapper:
+    """单个模型的映射信息
+
+    每种 过滤条件/排序/LIMIT 组合只拼接一次 SQL，之后从缓存中取；
+    查询结果以元组形式读取，按列直接写入对象槽位，不经过 __init__，UUID 列留给模型按需解析。
+    """
+
+    def __init__(self, model_class, table, columns, identity, decoders=None):
+        self.model_class = model_class
+        self.table = table
+        # 查询列顺序：id 在前，其余为可写列
+        self.columns = ('id',) + tuple(columns)
+        self.writable = tuple(columns)
+        self.identity = identity
+        self.identity_index = self.columns.index(identity)
+        # 标识映射的键：UUID 列统一为十六进制，其余列取字符串
+        self.identity_key = uuid_key if identity in model_class._uuid_fields else str
+        self._decoders = tuple((i, decoders[c]) for i, c in enumerate(self.columns) if c in (decoders or {}))
+        self._setters = model_class.raw_setters(self.columns)
+        self.select_list = ', '.join(escape_column(c) for c in self.columns)
+        self._sql_cache = {}
+
+    # ---- SQL 编译 ----
+
+    def _cached(self, key, build):
+        sql = self._sql_cache.get(key)
+        if sql is None:
+            sql = self._sql_cache[key] = build()
+        return sql
+
+    # FilterCondition.operator -> SQL 运算符
+    _OPERATORS = {'==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>=', 'like': 'LIKE'}
+
+    def compile_where(self, conditions):
+        """将过滤条件拆分为 结构签名 与 参数，签名相同的条件共用同一段 SQL"""
+        params = []
+        shape = tuple(self._compile_condition(condition, params) for condition in conditions)
+        return shape, params
+
+    def _compile_condition(self, condition, params):
+        # and_/or_ 组合条件：(运算符, 子条件签名...)
+        clauses = getattr(condition, 'clauses', None)
+        if clauses is not None:
+            return condition.operator, tuple(self._compile_condition(c, params) for c in clauses)
+
+        field_name = getattr(condition.left, 'name', str(condition.left))
+        operator = condition.operator
+        value = condition.right
+        if operator == 'in':
+            values = [encode(v) for v in value]
+            params.extend(values)
+            return field_name, 'in', len(values)
+        if operator not in self._OPERATORS:
+            raise ValueError(f'不支持的过滤条件: {field_name} {operator}')
+        if value is None:
+            if operator not in ('==', '!='):
+                raise ValueError(f'{field_name} {operator} 不能与 None 比较')
+            return field_name, operator, None
+        params.append(encode(value))
+        return field_name, operator, '?'
+
+    @classmethod
+    def _clause_sql(cls, shape):
+        if len(shape) == 2:
+            operator, clauses = shape
+            if not clauses:
+                return '1' if operator == 'and' else '0'
+            joiner = ' AND ' if operator == 'and' else ' OR '
+            return '(' + joiner.join(cls._clause_sql(c) for c in clauses) + ')'
+        field_name, operator, arg = shape
+        column = escape_column(field_name)
+        if operator == 'in':
+            return f'{column} IN ({", ".join("?" * arg)})'
+        if arg is None:
+            return f'{column} IS NULL' if operator == '==' else f'{column} IS NOT NULL'
+        return f'{column} {cls._OPERATORS[operator]} ?'
+
+    @classmethod
+    def _where_sql(cls, shape):
+        if not shape:
+            return ''
+        return ' WHERE ' + ' AND '.join(cls._clause_sql(c) for c in shape)
+
+    def select_sql(self, shape, order=None, limit=None):
+        def build():
+            sql = f'SELECT {self.select_list} FROM {self.table}' + self._where_sql(shape)
+            if order:
+                sql += f' ORDER BY {escape_column(order)}'
+            if limit:
+                sql += f' LIMIT {int(limit)}'
+            return sql
+        return self._cached(('select', shape, order, limit), build)
+
+    def delete_sql(self, shape):
+        return self._cached(('delete', shape), lambda: f'DELETE FROM {self.table}' + self._where_sql(shape))
+
+    def insert_sql(self):
+        return self._cached('insert', lambda: 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.table, ', '.join(escape_column(c) for c in self.writable), ', '.join('?' * len(self.writable))))
+
+    def update_sql(self, columns):
+        return self._cached(('update', columns), lambda: 'UPDATE {} SET {} WHERE id=?'.format(
+            self.table, ', '.join(f'{escape_column(c)}=?' for c in columns)))
+
+    def id_sql(self, count):
+        """插入后按标识列回查自增 id"""
+        return self._cached(('id', count), lambda: 'SELECT {0}, id FROM {1} WHERE {0} IN ({2})'.format(
+            escape_column(self.identity), self.table, ', '.join('?' * count)))
+
+    # ---- 行与对象转换 ----
+
+    def hydrate(self, row):
+        """由查询结果元组构造对象（已是同步状态，不记录修改）"""
+        obj = self.model_class.__new__(self.model_class)
+        for setter, value in zip(self._setters, row):
+            setter(obj, value)
+        for i, decode in self._decoders:
+            self._setters[i](obj, decode(row[i]))
+        return obj
+
+    def row_params(self, obj):
+        """插入用参数"""
+        return [encode(getattr(obj, c)) for c in self.writable]
+
+
+MAPPERS = {
+    Node: TableMapper(Node, 'node',
+                      ('node', 'desc', 'group', 'type', 'position', 'uuid', 'puuid', 'expanded'),
+                      identity='uuid', decoders={'expanded': bool}),
+    Link: TableMapper(Link, 'link',
+                      ('uuid', 'node', 'system', 'client', 'user', 'password', 'language'),
+                      identity='uuid'),
+    Config: TableMapper(Config, 'config', ('key', 'value'), identity='key'),
+}
+
+
+def mapper_for(model_class):
+    """取模型对应的映射，未映射的模型返回 None"""
+    return MAPPERS.get(model_class)
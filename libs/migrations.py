@@ -0,0 +1,204 @@
+"""数据库结构迁移 - 以 PRAGMA user_version 记录当前版本，启动时按顺序升级"""
+import sqlite3
+
+
+def _ensure_uuid_index(table):
+    """uuid 列已有索引（如 UNIQUE 约束自带的索引）时跳过，否则补建普通索引"""
+    def step(conn):
+        for index in conn.execute(f'PRAGMA index_list({table})').fetchall():
+            columns = [info[2] for info in conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall()]
+            if columns[:1] == ['uuid']:
+                return
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_uuid ON {table}(uuid)')
+    return step
+
+
+def purge_orphans(conn):
+    """删除无法从根节点到达的节点以及没有对应节点的连接，返回 (节点数, 连接数)"""
+    conn.execute("""
+        WITH RECURSIVE reachable(uuid) AS (
+            SELECT uuid FROM node WHERE puuid IS NULL AND uuid IS NOT NULL
+            UNION
+            SELECT node.uuid FROM node JOIN reachable ON node.puuid = reachable.uuid
+        )
+        DELETE FROM node WHERE uuid NOT IN (SELECT uuid FROM reachable)
+    """)
+    # 以 WITH 开头的语句不会更新 cursor.rowcount；changes() 不含全文索引触发器修改的行
+    nodes = conn.execute('SELECT changes()').fetchone()[0]
+    links = conn.execute("""
+        DELETE FROM link WHERE uuid NOT IN (SELECT uuid FROM node WHERE uuid IS NOT NULL)
+    """).rowcount
+    return nodes, links
+
+
+# 全文索引：rowid 为 node.id，连接的 系统/Client/用户 取自 uuid 相同的 link 行
+FTS_TABLE = 'node_fts'
+_FTS_COLUMNS = 'node, desc, system, client, user'
+_FTS_ROW = f"""
+    INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS})
+    SELECT n.id, n.node, n.desc, l.system, l.client, l.user
+    FROM node n LEFT JOIN link l ON l.uuid = n.uuid
+"""
+_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS node_fts_ai AFTER INSERT ON node BEGIN
+        {_FTS_ROW} WHERE n.id = new.id;
+    END
+    """,
+    # 展开状态等其他列的更新不涉及索引
+    f"""
+    CREATE TRIGGER IF NOT EXISTS node_fts_au AFTER UPDATE OF node, desc, uuid ON node BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        {_FTS_ROW} WHERE n.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS node_fts_ad AFTER DELETE ON node BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS link_fts_ai AFTER INSERT ON link BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM node WHERE uuid = new.uuid);
+        {_FTS_ROW} WHERE n.uuid = new.uuid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS link_fts_au AFTER UPDATE OF uuid, system, client, user ON link BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM node WHERE uuid IN (old.uuid, new.uuid));
+        {_FTS_ROW} WHERE n.uuid IN (old.uuid, new.uuid);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS link_fts_ad AFTER DELETE ON link BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM node WHERE uuid = old.uuid);
+        {_FTS_ROW} WHERE n.uuid = old.uuid;
+    END
+    """,
+]
+
+
+def has_fts(conn):
+    """全文索引表是否存在"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (FTS_TABLE,)).fetchone() is not None
+
+
+def create_fts(conn):
+    """建立节点全文索引及同步触发器，返回是否建立成功
+
+    SQLite 未编译 FTS5 时跳过，搜索退回 LIKE 查询；sqliteDB.checkDB 每次启动时会重新尝试。
+    """
+    try:
+        # prefix 为 1~3 字符的前缀额外建索引，输入过程中的短前缀查询不必扫描词表
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                     f"USING fts5({_FTS_COLUMNS}, prefix='1 2 3')")
+    except sqlite3.OperationalError as e:
+        if 'fts5' not in str(e):
+            raise
+        return False
+    for trigger in _FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute(f'DELETE FROM {FTS_TABLE}')
+    conn.execute(_FTS_ROW)
+    return True
+
+
+# 修改计数：node/link/config 每写入一行加一，本进程按事务登记自己写入的区间，其余的增量即为外部修改
+CHANGE_COUNT_SQL = 'SELECT n FROM change_count'
+_CHANGE_COUNT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_count_a{event[0].lower()} AFTER {event} ON {table} BEGIN
+        UPDATE change_count SET n = n + 1;
+    END
+    """
+    for table in ('node', 'link', 'config') for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+
+# (版本号, 说明, 步骤列表)；步骤为 SQL 字符串或接收连接的函数
+MIGRATIONS = [
+    (1, '基础表结构', [
+        """
+        CREATE TABLE IF NOT EXISTS node (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            node TEXT,
+            desc TEXT,
+            "group" TEXT,
+            type TEXT,
+            position INTEGER,
+            uuid TEXT UNIQUE,
+            puuid TEXT,
+            expanded INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS link (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            uuid TEXT UNIQUE,
+            node TEXT,
+            system TEXT,
+            client TEXT,
+            user TEXT,
+            password TEXT,
+            language TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS config (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE,
+            value TEXT
+        )
+        """,
+    ]),
+    (2, '树查询与系统查询索引', [
+        # Main.set_node: WHERE puuid = ? AND type = ?，按名称忽略大小写排序
+        'CREATE INDEX IF NOT EXISTS idx_node_tree ON node(puuid, type, node COLLATE NOCASE)',
+        # sqliteDB.getGroup: WHERE type = 'F' ORDER BY node
+        'CREATE INDEX IF NOT EXISTS idx_node_type ON node(type, node)',
+        'CREATE INDEX IF NOT EXISTS idx_link_system ON link(system)',
+        _ensure_uuid_index('node'),
+        _ensure_uuid_index('link'),
+    ]),
+    # 旧版删除分组时只删除直接子连接，下级节点会残留在表中
+    (3, '清理孤立节点与连接', [
+        purge_orphans,
+    ]),
+    (4, '节点全文索引', [
+        create_fts,
+    ]),
+    (5, '修改计数', [
+        'CREATE TABLE IF NOT EXISTS change_count (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO change_count (id, n) VALUES (1, 0)',
+    ] + _CHANGE_COUNT_TRIGGERS),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    """读取数据库当前结构版本"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """将数据库升级到最新版本，每个版本在独立事务中执行，失败时整体回滚"""
+    current = get_version(conn)
+    for version, desc, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN')
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f'PRAGMA user_version={version}')
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise sqlite3.DatabaseError(f'数据库升级到版本 {version}（{desc}）失败: {e}') from e
+        current = version
+    return current
@@ -0,0 +1,86 @@
+"""按 SAP Logon Landscape 批量添加连接 - 每个 SAPGUI 服务生成一条连接，一个事务内写入"""
+from libs.transfer import Importer, PATH_SEP, Progress
+
+# 模板中可用的占位符：{system} 服务名，{sid} 系统 ID
+TEMPLATE_KEYS = ('client', 'user', 'language')
+TEMPLATE_LABELS = {'client': 'Client', 'user': '用户', 'language': '语言'}
+CONFIG_PREFIX = 'provision_'
+DEFAULT_TEMPLATES = {'client': '', 'user': '', 'language': 'ZH'}
+
+
+class _Fields(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+class TemplateError(ValueError):
+    """模板格式错误（如不成对的花括号），key 为出错的模板"""
+
+    def __init__(self, key, template, reason):
+        super().__init__(f'{TEMPLATE_LABELS.get(key, key)}模板格式错误：{template}（{reason}）')
+        self.key = key
+
+
+def render(template, entry, key=''):
+    """按服务信息填充模板，未知占位符原样保留；模板格式错误时抛出 TemplateError"""
+    try:
+        return str(template or '').format_map(_Fields(system=entry.get('system', ''), sid=entry.get('sid', '')))
+    except (ValueError, KeyError, IndexError, AttributeError) as e:
+        raise TemplateError(key, template, e) from e
+
+
+def check_templates(templates):
+    """检查各模板的格式，返回 [TemplateError]（全部正确时为空）"""
+    errors = []
+    for key in TEMPLATE_KEYS:
+        try:
+            render(templates.get(key), {'system': 'SYS', 'sid': 'SID'}, key)
+        except TemplateError as e:
+            errors.append(e)
+    return errors
+
+
+def load_templates(config):
+    """读取上次使用的模板"""
+    return {key: config.get(CONFIG_PREFIX + key, DEFAULT_TEMPLATES[key]) for key in TEMPLATE_KEYS}
+
+
+def save_templates(config, templates):
+    for key in TEMPLATE_KEYS:
+        config.set(CONFIG_PREFIX + key, templates.get(key, ''))
+
+
+def build_records(entries, templates, grouped=True, root=''):
+    """Landscape 服务转换为导入记录；grouped 为 False 时全部放在 root 分组下"""
+    for entry in entries:
+        path = (root,) if root else ()
+        if grouped:
+            path += tuple(entry['path'])
+        client = render(templates.get('client'), entry, 'client')
+        yield {
+            'type': 'L',
+            'path': PATH_SEP.join(p.replace(PATH_SEP, ' ') for p in path),
+            # 与手工添加连接的默认名称一致
+            'node': f"{entry['system']}-{client}" if client else entry['system'],
+            'desc': entry.get('desc', ''),
+            'system': entry['system'],
+            'client': client,
+            'user': render(templates.get('user'), entry, 'user'),
+            'password': '',
+            'language': render(templates.get('language'), entry, 'language'),
+        }
+
+
+def provision(db, entries, templates, grouped=True, root='', progress=None):
+    """在一个事务中创建分组与连接，系统+Client 已存在的连接跳过；模板格式错误时不写入任何连接"""
+    errors = check_templates(templates)
+    if errors:
+        raise errors[0]
+    progress = progress or Progress()
+    entries = list(entries)
+    progress.total = len(entries)
+    importer = Importer(db, batch_size=max(len(entries), 1), skip_existing=True)
+    with db.transaction():
+        importer.import_records(build_records(entries, templates, grouped, root), progress)
+    progress.done = progress.total
+    return progress
@@ -0,0 +1,140 @@
+"""查询结果缓存 - 以 SQL 与参数为键缓存结果行，本地写入或其他进程修改数据库后失效"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """LRU 查询结果缓存
+
+    缓存的是结果元组列表，对象仍由会话的标识映射构造/复用。
+    本地写事务提交或回滚后整体清空；其他连接（包括其他进程）提交的修改通过
+    PRAGMA data_version 发现，每个连接最多每 check_interval 秒检查一次。
+    本进程其他线程的提交也会改变 data_version，因此 data_version 变化后再读取数据库中的修改计数
+    （count_sql）：本进程的写事务在提交前用 add_local() 登记自己写入的计数区间，两次检查之间的
+    增量超出本地区间的部分即为外部修改，同一检查间隔内本地与外部都有提交时也能发现。
+    写事务进行中的读取不经过缓存，避免缓存未提交的数据。
+    """
+
+    # 登记的本地区间上限：长时间不检查的连接会使旧区间无法清理，超出时丢弃最早的
+    # （该连接之后检查时最多多判一次外部修改）
+    _MAX_LOCAL = 1024
+
+    def __init__(self, count_sql, maxsize=128, check_interval=0.5):
+        self.count_sql = count_sql
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        # 检测到外部修改时的回调（如清空标识映射、重新加载配置）
+        self.on_external_change = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次清空加一，查询期间缓存被清空过的结果不再写入
+        self._generation = 0
+        # 连接 -> (data_version, 修改计数, 上次检查时间)
+        self._versions = {}
+        # 本进程写事务写入的修改计数区间 [(开始, 结束)]，开始不含、结束含
+        self._local = []
+        self.hits = 0
+        self.misses = 0
+        # 检测到外部修改的次数，调用方比较前后两次的值判断是否需要刷新界面
+        self.external_changes = 0
+
+    def fetch(self, conn, sql, params=(), transform=None):
+        """执行只读查询并返回结果元组列表（调用方不应修改返回的结果）
+
+        指定 transform 时缓存 transform(结果行) 的返回值，命中时连转换也省去。
+        """
+        if conn.in_transaction:
+            rows = self._query(conn, sql, params)
+            return transform(rows) if transform else rows
+        self.check(conn)
+        key = (sql, tuple(params), transform)
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rows
+            generation = self._generation
+            self.misses += 1
+        rows = self._query(conn, sql, params)
+        if transform:
+            rows = transform(rows)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = rows
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        """清空全部缓存结果"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def change_count(self, conn):
+        """读取数据库当前的修改计数"""
+        return conn.execute(self.count_sql).fetchone()[0]
+
+    def add_local(self, start, end):
+        """登记本进程一个写事务写入的修改计数区间（在提交前调用），返回登记的区间"""
+        span = (start, end)
+        if end != start:
+            with self._lock:
+                self._local.append(span)
+                del self._local[:-self._MAX_LOCAL]
+        return span
+
+    def remove_local(self, span):
+        """写事务提交失败：撤销 add_local() 的登记"""
+        with self._lock:
+            if span in self._local:
+                self._local.remove(span)
+
+    def committed(self):
+        """本进程的写事务已提交：清空缓存"""
+        self.clear()
+
+    def forget(self, conn):
+        """连接关闭时移除其版本记录"""
+        with self._lock:
+            self._versions.pop(conn, None)
+
+    @staticmethod
+    def _query(conn, sql, params):
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            return cursor.execute(sql, params).fetchall()
+        finally:
+            cursor.close()
+
+    def check(self, conn):
+        """检查数据库是否被其他连接修改过，是则清空缓存并通知（按 check_interval 节流）"""
+        now = time.monotonic()
+        seen = self._versions.get(conn)
+        if seen is not None and now - seen[2] < self.check_interval:
+            return
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if seen is not None and version == seen[0] and not self._local:
+            # 没有其他连接提交过，也没有需要对照的本地写入
+            self._versions[conn] = (version, seen[1], now)
+            return
+        count = self.change_count(conn)
+        with self._lock:
+            self._versions[conn] = (version, count, now)
+            external = seen is not None and count != seen[1] and (
+                count < seen[1] or self._local_between(seen[1], count) < count - seen[1])
+            # 所有连接都已检查过的区间不再需要
+            floor = min(v[1] for v in self._versions.values())
+            self._local = [span for span in self._local if span[1] > floor]
+        if external:
+            self.external_changes += 1
+            self.clear()
+            if self.on_external_change is not None:
+                self.on_external_change()
+
+    def _local_between(self, low, high):
+        """(low, high] 范围内本进程写入的计数个数"""
+        return sum(max(0, min(end, high) - max(start, low)) for start, end in self._local)
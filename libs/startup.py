@@ -0,0 +1,154 @@
+"""启动耗时报告 - 记录各模块导入耗时（格式同 python -X importtime）与启动各阶段的时间点
+
+PyInstaller 打包后无法使用 -X importtime，由程序自己记录：
+    run.py --startup-report[=文件路径]   或设置环境变量 ZLOGON_STARTUP_REPORT=文件路径（1 表示默认路径）
+默认写入 SAP Common 目录下的 zlogon_startup.txt。未开启时本模块不做任何事。
+"""
+import os
+import sys
+import time
+
+ENV_KEY = 'ZLOGON_STARTUP_REPORT'
+ARG = '--startup-report'
+REPORT_NAME = 'zlogon_startup.txt'
+
+_profiler = None
+
+
+class _TimedLoader:
+    """包装模块加载器，记录 exec_module 的耗时；其他属性转给原加载器
+
+    只在导入过程中替换 spec.loader，执行模块代码前模块的 __loader__ 与 __spec__.loader 已换回原加载器，
+    importlib.resources、get_data 等依赖加载器的用法不受影响。
+    """
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self._loader
+        if getattr(module, '__spec__', None) is not None:
+            module.__spec__.loader = self._loader
+        self._profiler.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(module.__name__)
+
+
+class ImportProfiler:
+    """sys.meta_path 首位的查找器：查找交给其余查找器，只负责计时"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.records = []  # (嵌套深度, 模块名, 自身耗时, 累计耗时)，按导入完成顺序
+        self.marks = []  # (阶段名称, 距启动的秒数)
+        self._stack = []  # [开始时间, 子模块耗时]
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                # 内置/冻结模块的加载器没有 exec_module 时不计时
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def leave(self, name):
+        started, children = self._stack.pop()
+        cumulative = time.perf_counter() - started
+        if self._stack:
+            self._stack[-1][1] += cumulative
+        self.records.append((len(self._stack), name, cumulative - children, cumulative))
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self):
+        lines = ['启动阶段（距启动的毫秒数）：']
+        lines += [f'{elapsed * 1000:10.1f}  {name}' for name, elapsed in self.marks]
+        total = sum(r[3] for r in self.records if r[0] == 0)
+        lines += ['', f'模块导入合计 {total * 1000:.1f} ms，共 {len(self.records)} 个模块', '',
+                  'import time: self [us] | cumulative | imported package']
+        lines += [f'import time: {self_time * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {"  " * depth}{name}'
+                  for depth, name, self_time, cumulative in self.records]
+        return '\n'.join(lines) + '\n'
+
+
+def _requested(argv):
+    """命令行/环境变量中指定的报告路径：未开启返回 None，使用默认路径返回空字符串"""
+    for arg in argv[1:]:
+        if arg == ARG:
+            return ''
+        if arg.startswith(ARG + '='):
+            return arg[len(ARG) + 1:]
+    value = os.environ.get(ENV_KEY, '').strip()
+    if not value or value == '0':
+        return None
+    return '' if value == '1' else value
+
+
+_report_path = None
+
+
+def install(argv=None):
+    """按命令行/环境变量开启导入计时，需在导入其他模块之前调用；返回是否开启"""
+    global _profiler, _report_path
+    path = _requested(sys.argv if argv is None else argv)
+    if path is None or _profiler is not None:
+        return _profiler is not None
+    _report_path = path
+    _profiler = ImportProfiler()
+    _profiler.install()
+    return True
+
+
+def enabled():
+    return _profiler is not None
+
+
+def mark(name):
+    """记录启动阶段的时间点（未开启时无操作）"""
+    if _profiler is not None:
+        _profiler.mark(name)
+
+
+def finish():
+    """停止计时并写出报告，返回报告文件路径（未开启时返回 None）"""
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    profiler.mark('报告')
+    profiler.uninstall()
+    path = _report_path
+    if not path:
+        from libs.guiCfg import GuiCfg
+        path = os.path.join(GuiCfg().sapGuiCommDir, REPORT_NAME)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.report())
+    except OSError as e:
+        print(f"Error writing startup report: {e}")
+        return None
+    return path
@@ -0,0 +1,103 @@
+"""后台写入线程 - 合并分组展开/折叠状态，防抖后批量提交，避免 Tk 主线程等待磁盘"""
+import sqlite3
+import threading
+import time
+
+from libs.Model import Node
+from libs.mapper import encode
+
+
+class StateWriter(threading.Thread):
+    """分组展开状态的后台写入线程
+
+    UI 线程调用 set_expanded() 后立即返回；同一分组在防抖时间内的多次切换只保留最后一次，
+    到期后在一个事务中用 executemany 写入。写入失败（如数据库被其他进程锁定）时批次放回队列，
+    retry_delay 秒后重试，错误由 UI 线程用 poll_errors() 取出提示。close() 会先写完队列中剩余的状态。
+    """
+
+    def __init__(self, db, delay=0.3, retry_delay=2.0, retries=3):
+        super().__init__(name='zlogon-state-writer', daemon=True)
+        self.db = db
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.retries = retries  # 退出时写入失败的重试次数
+        self._pending = {}  # uuid -> expanded
+        self._last_submit = 0.0
+        self._retry_at = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        # 最近一次写入失败的原因，写入成功后清空
+        self.last_error = None
+        self._errors = []
+
+    def set_expanded(self, uuid, expanded):
+        """提交分组展开状态（UI 线程调用，不等待写入）"""
+        # 会话中已加载的对象同步为新状态，但不作为待提交的修改
+        node = self.db.session.get_identity(Node, uuid)
+        if node is not None:
+            node.set_raw('expanded', bool(expanded))
+        with self._cond:
+            self._pending[uuid] = bool(expanded)
+            self._last_submit = time.monotonic()
+            self._cond.notify()
+
+    def poll_errors(self):
+        """取出尚未提示的写入错误（连续失败只报告第一次）"""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self, timeout=5.0):
+        """停止线程并写入剩余状态，返回是否全部写入（失败原因见 last_error）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self.is_alive():
+            self.join(timeout)
+        with self._cond:
+            return not self._pending and not self.is_alive()
+
+    def run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                # 防抖：最后一次提交后 delay 秒内没有新状态才写入，失败后等到 retry_delay 之后，退出时立即写入
+                while self._pending and not self._closed:
+                    remaining = max(self._last_submit + self.delay, self._retry_at) - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._pending or (self._closed and failures > self.retries):
+                    # 退出时多次重试仍失败的状态留在队列中，由 close() 的返回值报告
+                    return
+                batch, self._pending = self._pending, {}
+                closed = self._closed
+
+            error = self._flush(batch)
+            with self._cond:
+                if error is None:
+                    failures = 0
+                    self.last_error = None
+                    continue
+                # 放回队列，较新的状态优先
+                for uuid, expanded in batch.items():
+                    self._pending.setdefault(uuid, expanded)
+                if failures == 0:
+                    self._errors.append(error)
+                failures += 1
+                self.last_error = error
+                self._retry_at = time.monotonic() + self.retry_delay
+            if closed:
+                time.sleep(min(self.retry_delay, 0.5))
+
+    def _flush(self, batch):
+        """写入一个批次，返回错误信息（成功时为 None）"""
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany('UPDATE node SET expanded=? WHERE uuid=?',
+                                 [(1 if expanded else 0, encode(uuid)) for uuid, expanded in batch.items()])
+            return None
+        except sqlite3.Error as e:
+            return str(e)
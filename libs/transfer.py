@@ -0,0 +1,434 @@
+"""连接导入/导出 - CSV、JSON、YAML 流式读写，导入按批在事务中写入
+
+每条记录对应一个节点：
+    type      'L' 为连接（默认），'F' 为分组
+    path      所在分组路径，多级以 / 分隔，空表示根
+    node, desc, system, client, user, password, language
+
+导出时先输出全部分组（保留空分组），再逐行输出连接。
+"""
+import csv
+import io
+import json
+import os
+import threading
+import uuid as PUUID
+
+from libs.mapper import encode_uuid, uuid_key
+
+FIELDS = ('type', 'path', 'node', 'desc', 'system', 'client', 'user', 'password', 'language')
+LINK_FIELDS = ('system', 'client', 'user', 'password', 'language')
+PATH_SEP = '/'
+
+FORMATS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.jsonl': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+}
+
+
+def detect_format(path):
+    """按扩展名判断文件格式"""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f'不支持的文件格式: {path}')
+    return fmt
+
+
+def split_path(path):
+    """分组路径拆分为各级名称"""
+    return tuple(part.strip() for part in str(path or '').split(PATH_SEP) if part.strip())
+
+
+class Progress:
+    """导入/导出进度，由后台线程更新、UI 线程轮询读取"""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.done = 0
+        self.folders = 0
+        self.links = 0
+        self.skipped = 0
+        # 已存在而跳过的连接数（Importer.skip_existing）
+        self.existing = 0
+        self.finished = False
+        self.error = None
+        self.cancelled = False
+
+    @property
+    def fraction(self):
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+
+class _CountingReader(io.RawIOBase):
+    """记录已读取字节数的文件包装，用于按文件位置估算导入进度"""
+
+    def __init__(self, raw, progress):
+        self._raw = raw
+        self._progress = progress
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._raw.readinto(buffer)
+        if n:
+            self._progress.done += n
+        return n
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+# ---- 读取 ----
+
+def _read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def _read_json(stream, chunk_size=65536):
+    """增量解析 JSON：支持对象数组以及每行一个对象（JSON Lines），不一次性读入整个文件"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while True:
+        # 跳过数组括号、逗号与空白
+        pos = 0
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+            pos += 1
+        buffer = buffer[pos:]
+        if not buffer:
+            if eof:
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 对象跨越了读取块边界，继续读取
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        if isinstance(obj, list):
+            yield from obj
+        else:
+            yield obj
+
+
+def _read_yaml(stream):
+    """逐个文档解析 YAML：文档可以是单条记录或记录列表"""
+    import yaml
+    for document in yaml.safe_load_all(stream):
+        if document is None:
+            continue
+        if isinstance(document, list):
+            yield from document
+        else:
+            yield document
+
+
+_READERS = {'csv': _read_csv, 'json': _read_json, 'yaml': _read_yaml}
+
+
+def read_records(stream, fmt):
+    """按格式从文本流中逐条读取记录"""
+    for record in _READERS[fmt](stream):
+        if not isinstance(record, dict):
+            raise ValueError(f'记录格式错误: {record!r}')
+        yield record
+
+
+# ---- 写入 ----
+
+class _CsvWriter:
+    def __init__(self, stream):
+        self._writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def write(self, record):
+        self._writer.writerow(record)
+
+    def close(self):
+        pass
+
+
+class _JsonWriter:
+    def __init__(self, stream):
+        self._stream = stream
+        self._first = True
+        stream.write('[')
+
+    def write(self, record):
+        self._stream.write('\n' if self._first else ',\n')
+        self._stream.write(json.dumps(record, ensure_ascii=False))
+        self._first = False
+
+    def close(self):
+        self._stream.write('\n]\n')
+
+
+class _YamlWriter:
+    """每条记录写为一个文档，导入时可逐个文档解析"""
+
+    def __init__(self, stream):
+        import yaml
+        self._yaml = yaml
+        self._stream = stream
+
+    def write(self, record):
+        self._yaml.safe_dump(record, self._stream, explicit_start=True, allow_unicode=True, sort_keys=False)
+
+    def close(self):
+        pass
+
+
+_WRITERS = {'csv': _CsvWriter, 'json': _JsonWriter, 'yaml': _YamlWriter}
+
+
+class Exporter:
+    """从数据库游标逐行导出节点层级"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def export(self, path, fmt=None, progress=None):
+        fmt = fmt or detect_format(path)
+        progress = progress or Progress()
+        conn = self.db._get_connection()
+        # 读事务保证分组与连接来自同一个快照
+        conn.execute('BEGIN')
+        try:
+            folders = self._folders(conn)
+            progress.total = len(folders) + conn.execute(
+                "SELECT COUNT(*) FROM node WHERE type = 'L'").fetchone()[0]
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                writer = _WRITERS[fmt](stream)
+                for record in self._folder_records(folders):
+                    if progress.cancelled:
+                        break
+                    writer.write(record)
+                    progress.folders += 1
+                    progress.done += 1
+                for record in self._link_records(conn, folders):
+                    if progress.cancelled:
+                        break
+                    writer.write(record)
+                    progress.links += 1
+                    progress.done += 1
+                writer.close()
+        finally:
+            conn.rollback()
+        return progress
+
+    @staticmethod
+    def _folders(conn):
+        """{uuid 键: (名称, 描述, 上级 uuid 键)}"""
+        rows = conn.execute("SELECT uuid, node, desc, puuid FROM node WHERE type = 'F' ORDER BY node").fetchall()
+        return {uuid_key(row[0]): (row[1], row[2], uuid_key(row[3]) if row[3] else None)
+                for row in rows if row[0]}
+
+    @staticmethod
+    def _path_of(folders, key, cache):
+        """分组的完整路径（含自身），路径中出现环时截断"""
+        if key in cache:
+            return cache[key]
+        names, seen = [], set()
+        current = key
+        while current in folders and current not in seen:
+            seen.add(current)
+            names.append(folders[current][0] or '')
+            current = folders[current][2]
+        path = cache[key] = PATH_SEP.join(reversed(names))
+        return path
+
+    def _folder_records(self, folders):
+        cache = {}
+        records = [{'type': 'F', 'path': self._path_of(folders, parent, cache) if parent else '',
+                    'node': name or '', 'desc': desc or '',
+                    'system': '', 'client': '', 'user': '', 'password': '', 'language': ''}
+                   for name, desc, parent in folders.values()]
+        # 上级分组在前，导入时先创建上级分组并保留其描述
+        records.sort(key=lambda r: len(split_path(r['path'])))
+        return records
+
+    def _link_records(self, conn, folders):
+        cache = {}
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("""
+            SELECT n.node, n.desc, n.puuid, l.system, l.client, l.user, l.password, l.language
+            FROM node n LEFT JOIN link l ON l.uuid = n.uuid
+            WHERE n.type = 'L'
+            ORDER BY n.puuid, n.node
+        """)
+        for node, desc, puuid, *link in cursor:
+            parent = uuid_key(puuid) if puuid else None
+            record = {'type': 'L', 'path': self._path_of(folders, parent, cache) if parent else '',
+                      'node': node or '', 'desc': desc or ''}
+            record.update(zip(LINK_FIELDS, (value or '' for value in link)))
+            yield record
+        cursor.close()
+
+
+class Importer:
+    """批量导入节点层级
+
+    每 batch_size 条记录在一个事务中用 executemany 写入；分组路径按名称逐级查找，不存在时在当前事务中创建。
+    skip_existing 为 True 时跳过 系统+Client 已存在的连接（按 link.system 索引查询）。
+    只使用原始 SQL 与当前线程的连接，可在后台线程中运行。
+    """
+
+    # 查询已有连接时每条语句的参数个数
+    _EXISTING_CHUNK = 500
+
+    def __init__(self, db, batch_size=500, skip_existing=False):
+        self.db = db
+        self.batch_size = batch_size
+        self.skip_existing = skip_existing
+        # 已存在或本次已导入的 (系统, Client)，以及已查询过数据库的系统
+        self._existing = set()
+        self._checked_systems = set()
+        # 分组路径 -> (uuid, 名称)
+        self._folders = {}
+        # 当前批次中新建的分组数
+        self._created = 0
+
+    def import_file(self, path, fmt=None, progress=None):
+        fmt = fmt or detect_format(path)
+        progress = progress or Progress()
+        progress.total = os.path.getsize(path)
+        with open(path, 'rb') as raw:
+            stream = io.TextIOWrapper(io.BufferedReader(_CountingReader(raw, progress)),
+                                      encoding='utf-8-sig', newline='')
+            self.import_records(read_records(stream, fmt), progress)
+        return progress
+
+    def import_records(self, records, progress=None):
+        progress = progress or Progress()
+        self._load_folders()
+        batch = []
+        for record in records:
+            if progress.cancelled:
+                break
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch, progress)
+                batch = []
+        if batch and not progress.cancelled:
+            self._write_batch(batch, progress)
+        return progress
+
+    def _load_folders(self):
+        """读取已有分组，按名称路径建立索引（同一层级重名时取先创建的分组）"""
+        rows = self.db._get_connection().execute(
+            "SELECT uuid, node, puuid FROM node WHERE type = 'F' ORDER BY id").fetchall()
+        folders = {uuid_key(row[0]): (row[0], row[1] or '', uuid_key(row[2]) if row[2] else None)
+                   for row in rows if row[0]}
+        self._folders = {}
+        for key in folders:
+            names, seen, current = [], set(), key
+            while current in folders and current not in seen:
+                seen.add(current)
+                names.append(folders[current][1].strip())
+                current = folders[current][2]
+            path = tuple(reversed(names))
+            self._folders.setdefault(path, (folders[key][0], folders[key][1]))
+
+    def _folder(self, conn, path, desc=''):
+        """返回分组路径对应的 (uuid 存储值, 名称)，不存在的各级分组依次创建"""
+        if not path:
+            return None, ''
+        found = self._folders.get(path)
+        if found is not None:
+            return found
+        parent_uuid, _ = self._folder(conn, path[:-1])
+        value = encode_uuid(PUUID.uuid1())
+        conn.execute('INSERT INTO node (node, desc, "group", type, position, uuid, puuid, expanded) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (path[-1], desc, '', 'F', 0, value, parent_uuid, 0))
+        self._folders[path] = (value, path[-1])
+        self._created += 1
+        return self._folders[path]
+
+    def _write_batch(self, batch, progress):
+        nodes, links = [], []
+        folders_before = dict(self._folders)
+        existing_before = set(self._existing), set(self._checked_systems)
+        self._created = 0
+        try:
+            with self.db.transaction() as conn:
+                if self.skip_existing:
+                    self._load_existing(conn, batch)
+                for record in batch:
+                    kind = str(record.get('type') or 'L').strip().upper()
+                    path = split_path(record.get('path'))
+                    name = str(record.get('node') or record.get('system') or '').strip()
+                    if kind == 'F':
+                        if name:
+                            self._folder(conn, path + (name,), _text(record.get('desc')))
+                        else:
+                            progress.skipped += 1
+                        continue
+                    if kind != 'L' or not name:
+                        progress.skipped += 1
+                        continue
+                    if self.skip_existing:
+                        key = (_text(record.get('system')), _text(record.get('client')))
+                        if key in self._existing:
+                            progress.existing += 1
+                            continue
+                        self._existing.add(key)
+                    parent_uuid, group = self._folder(conn, path)
+                    value = encode_uuid(PUUID.uuid1())
+                    nodes.append((name, _text(record.get('desc')), group, 'L', 0, value, parent_uuid, 0))
+                    links.append((value, name) + tuple(_text(record.get(f)) for f in LINK_FIELDS))
+                conn.executemany('INSERT INTO node (node, desc, "group", type, position, uuid, puuid, expanded) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', nodes)
+                conn.executemany('INSERT INTO link (uuid, node, system, client, user, password, language) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?)', links)
+        except BaseException:
+            # 回滚后本批创建的分组与连接不存在，恢复索引
+            self._folders = folders_before
+            self._existing, self._checked_systems = existing_before
+            raise
+        progress.folders += self._created
+        progress.links += len(links)
+
+
+    def _load_existing(self, conn, batch):
+        """按本批记录涉及的系统查询已有连接"""
+        systems = sorted({_text(r.get('system')) for r in batch} - self._checked_systems)
+        self._checked_systems.update(systems)
+        for i in range(0, len(systems), self._EXISTING_CHUNK):
+            chunk = systems[i:i + self._EXISTING_CHUNK]
+            rows = conn.execute(f'SELECT system, client FROM link WHERE system IN ({", ".join("?" * len(chunk))})',
+                                chunk).fetchall()
+            self._existing.update((row[0] or '', row[1] or '') for row in rows)
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def run_in_background(db, task, progress):
+    """在后台线程中执行 task(progress)，结束后设置 progress.finished，异常记录在 progress.error"""
+    def target():
+        try:
+            task(progress)
+        except Exception as e:
+            progress.error = e
+        finally:
+            db.release()
+            progress.finished = True
+    thread = threading.Thread(target=target, name='zlogon-transfer', daemon=True)
+    thread.start()
+    return thread
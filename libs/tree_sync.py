@@ -0,0 +1,186 @@
+"""连接树同步 - 将数据库快照与 Treeview 中已有的项目比较，只执行必要的插入、删除、移动和更新"""
+from bisect import bisect_left
+
+
+class TreeReconciler:
+    """以 uuid 为 iid 同步 ttk.Treeview
+
+    记录每个项目上次写入的 上级/名称/列值，未变化的项目不产生 Tk 调用；已有项目不会被重建，
+    选中项、滚动位置和展开状态保持不变。懒加载模式下未加载的分组只有一个占位子项。
+    """
+
+    PLACEHOLDER = '__placeholder__'
+
+    # 分组展开状态的处理方式：keep 保持界面当前状态（新项目按保存的状态），
+    # saved 按数据库保存的状态，all 全部展开
+    OPEN_STATES = ('keep', 'saved', 'all')
+
+    def __init__(self, view):
+        self.view = view
+        self._items = {}  # iid -> (上级 iid, 名称, 列值)
+        self._placeholders = set()  # 只有占位子项的分组 iid
+        # 最近一次同步的操作数
+        self.stats = {}
+
+    def is_loaded(self, iid):
+        """分组的子节点是否已加载"""
+        return iid not in self._placeholders
+
+    def loaded_folders(self):
+        """已加载子节点的分组 iid"""
+        return [iid for iid, (_, _, values) in self._items.items()
+                if values[2] == 'F' and iid not in self._placeholders]
+
+    def sync(self, tree, parent_iid='', puuid=None, parents=None, has_children=None, open_state='keep'):
+        """将 parent_iid 下的项目同步为 tree 中 puuid 的子树
+
+        tree 为 {上级 uuid: [子节点...]}；parents 为子节点列表完整的分组 uuid 集合（None 表示全部分组），
+        不在其中的分组视为未加载，按 has_children 决定是否放置占位子项。
+        """
+        if open_state not in self.OPEN_STATES:
+            raise ValueError(f'不支持的展开状态处理方式: {open_state}')
+        self.stats = {'insert': 0, 'delete': 0, 'move': 0, 'update': 0}
+        stale, seen = [], set()
+        if parent_iid:
+            # 同步分组的子树即加载该分组
+            self._placeholders.discard(parent_iid)
+        self._sync_children(parent_iid, puuid, tree, parents, has_children or set(), open_state, stale, seen)
+        removed = [iid for iid in stale if iid not in seen]
+        if removed:
+            self.view.delete(*removed)
+            self.stats['delete'] += len(removed)
+            self._forget(removed)
+        return self.stats
+
+    def clear(self):
+        """删除全部项目"""
+        children = self.view.get_children()
+        if children:
+            self.view.delete(*children)
+        self._items.clear()
+        self._placeholders.clear()
+
+    def _sync_children(self, parent_iid, puuid, tree, parents, has_children, open_state, stale, seen):
+        view = self.view
+        desired = tree.get(puuid, ())
+        ids = [str(node.uuid) for node in desired]
+        wanted = set(ids)
+        current = list(view.get_children(parent_iid))
+        # 不在期望子项中的都是多余项目（可能稍后被移动到其他分组下，删除前再确认）
+        stale.extend(iid for iid in current if iid not in wanted)
+        keep = self._stable(current, ids)
+        position = -1  # 上一个期望子项在 current 中的位置
+        # 本级排好后再同步下级：下级同步时可能把本级的项目移走，current 会失效
+        folders = []
+        for node, iid in zip(desired, ids):
+            values = (node.desc, iid, node.type)
+            is_folder = node.type == 'F'
+            loaded = is_folder and (parents is None or node.uuid in parents)
+            seen.add(iid)
+            entry = self._items.get(iid)
+            if entry is None and view.exists(iid):
+                # 由其他途径插入的项目：按已有项目处理，强制更新
+                entry = (None, None, None)
+            if entry is None:
+                opened = loaded and (open_state == 'all' or node.expanded)
+                tags = (('folder-open' if opened else 'folder-closed'),) if is_folder else ('link',)
+                position += 1
+                view.insert(parent_iid, position, iid=iid, text=node.node, values=values, tags=tags, open=opened)
+                current.insert(position, iid)
+                self.stats['insert'] += 1
+            else:
+                if iid in keep:
+                    position = current.index(iid, position + 1)
+                else:
+                    # 移动到上一个期望子项之后；Treeview.move 的位置按去掉被移动项目后的子项列表计算
+                    previous = current[position] if position >= 0 else None
+                    if iid in current:
+                        current.remove(iid)
+                    position = current.index(previous) + 1 if previous is not None else 0
+                    current.insert(position, iid)
+                    view.move(iid, parent_iid, position)
+                    self.stats['move'] += 1
+                if entry[1] != node.node or entry[2] != values:
+                    view.item(iid, text=node.node, values=values)
+                    self.stats['update'] += 1
+                if is_folder:
+                    self._sync_open(iid, node, loaded, open_state)
+            self._items[iid] = (parent_iid, node.node, values)
+
+            if loaded:
+                self._placeholders.discard(iid)
+                folders.append((iid, node))
+            elif is_folder:
+                self._sync_placeholder(iid, node.uuid in has_children)
+        for iid, node in folders:
+            self._sync_children(iid, node.uuid, tree, parents, has_children, open_state, stale, seen)
+
+    @staticmethod
+    def _stable(current, desired):
+        """current 中不需要移动的项目：与期望顺序一致的最长子序列"""
+        order = {iid: i for i, iid in enumerate(desired)}
+        items = [iid for iid in current if iid in order]
+        if all(order[a] < order[b] for a, b in zip(items, items[1:])):
+            # 常见情况：顺序未变
+            return set(items)
+        # 最长递增子序列（耐心排序），O(n log n)
+        tails, tail_items, previous = [], [], {}
+        for iid in items:
+            rank = order[iid]
+            i = bisect_left(tails, rank)
+            previous[iid] = tail_items[i - 1] if i else None
+            if i == len(tails):
+                tails.append(rank)
+                tail_items.append(iid)
+            else:
+                tails[i] = rank
+                tail_items[i] = iid
+        keep = set()
+        iid = tail_items[-1] if tail_items else None
+        while iid is not None:
+            keep.add(iid)
+            iid = previous[iid]
+        return keep
+
+    def _sync_open(self, iid, node, loaded, open_state):
+        if open_state == 'keep':
+            # 未加载的分组不能处于展开状态
+            if not loaded and self.view.item(iid, 'open'):
+                self.view.item(iid, open=False, tags=('folder-closed',))
+            return
+        opened = loaded and (open_state == 'all' or bool(node.expanded))
+        if bool(self.view.item(iid, 'open')) != opened:
+            self.view.item(iid, open=opened, tags=(('folder-open' if opened else 'folder-closed'),))
+            self.stats['update'] += 1
+
+    def _sync_placeholder(self, iid, needed):
+        """未加载的分组：有子节点时放置占位子项，没有时移除"""
+        placeholder = self.PLACEHOLDER + iid
+        children = self.view.get_children(iid)
+        if needed and not children:
+            self.view.insert(iid, 'end', iid=placeholder, text='', values=('', '', ''))
+            self._placeholders.add(iid)
+        elif not needed and placeholder in children:
+            self.view.delete(placeholder)
+            self._placeholders.discard(iid)
+        elif placeholder in children:
+            self._placeholders.add(iid)
+
+    def _forget(self, removed):
+        """删除的项目及其全部下级从记录中移除"""
+        removed = {iid for iid in removed if not iid.startswith(self.PLACEHOLDER)}
+        if not removed:
+            return
+        gone = set(removed)
+        for iid, entry in list(self._items.items()):
+            parent = entry[0]
+            chain = []
+            while parent and parent not in gone and parent in self._items:
+                chain.append(parent)
+                parent = self._items[parent][0]
+            if parent in gone:
+                gone.add(iid)
+                gone.update(chain)
+        for iid in gone:
+            self._items.pop(iid, None)
+            self._placeholders.discard(iid)
@@ -0,0 +1,47 @@
+import os
+import sys
+import uuid as _uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """临时 HOME 下的全新数据库（sqliteDB 为单例，每个测试重新创建）"""
+    from libs.guiCfg import GuiCfg
+    from libs.OptionDB import sqliteDB
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    os.makedirs(GuiCfg().sapGuiCommDir, exist_ok=True)
+    sqliteDB._instance = None
+    database = sqliteDB()
+    yield database
+    database.close()
+    sqliteDB._instance = None
+
+
+@pytest.fixture
+def add(db):
+    """add(名称, 类型, 上级 uuid, **连接字段) 新建一个节点（连接同时新建 link 行）
+
+    默认提交并返回 uuid；commit=False 时只加入会话，返回 (节点, 连接)。
+    """
+    from libs.Model import Link, Node
+
+    def add_node(name, type='L', puuid=None, expanded=False, desc='', uuid=None, commit=True, **link):
+        uuid = uuid or _uuid.uuid1()
+        node = Node(node=name, desc=desc, group='', type=type, position=0, uuid=uuid, puuid=puuid,
+                    expanded=expanded)
+        objs = [node]
+        if type == 'L':
+            fields = dict(system='SYS', client='100', user='USER', password='', language='ZH')
+            fields.update(link)
+            objs.append(Link(uuid=uuid, node=name, **fields))
+        db.session.add_all(objs)
+        if not commit:
+            return tuple(objs) if type == 'L' else (node, None)
+        db.session.commit()
+        return uuid
+    return add_node
@@ -0,0 +1,59 @@
+import sqlite3
+
+from libs.guiCfg import GuiCfg
+
+
+def _rows(db, key):
+    return [tuple(r) for r in db._get_connection().execute('SELECT key, value FROM config WHERE key = ?', (key,))]
+
+
+def _write_elsewhere(db, sql):
+    """模拟其他进程修改数据库"""
+    other = sqlite3.connect(db.dbpath)
+    with other:
+        other.execute(sql)
+    other.close()
+
+
+def test_set_inserts_then_updates(db):
+    db.config.set('language', 'ZH')
+    db.config.set('language', 'EN')
+    assert _rows(db, 'language') == [('language', 'EN')]
+    assert db.config.get('language') == 'EN'
+    # 值与缓存相同时不写数据库
+    _write_elsewhere(db, "UPDATE config SET value = 'XX' WHERE key = 'language'")
+    db.config.set('language', 'EN')
+    assert _rows(db, 'language') == [('language', 'XX')]
+
+
+def test_delete(db):
+    db.config.set('language', 'ZH')
+    db.config.delete('language')
+    assert _rows(db, 'language') == []
+    assert db.config.get('language', 'default') == 'default'
+    db.config.delete('missing')
+
+
+def test_external_change_reloads_values(db):
+    db.query_cache.check_interval = 0
+    db.config.set('language', 'ZH')
+    assert db.config.get('language') == 'ZH'
+    _write_elsewhere(db, "UPDATE config SET value = 'EN' WHERE key = 'language'")
+    assert db.config.get('language') == 'EN'
+
+
+def test_sapshcut_exists_caches_only_found(db, tmp_path):
+    shcut = tmp_path / 'gui' / GuiCfg().appName
+    shcut.parent.mkdir()
+    db.config.set('path', str(shcut.parent))
+    assert not db.config.sapshcut_exists()
+    # 未找到的结果不缓存，文件出现后立即可用
+    shcut.write_bytes(b'')
+    assert db.config.sapshcut_exists()
+    # 找到后不再访问文件系统，直到路径变化
+    shcut.unlink()
+    assert db.config.sapshcut_exists()
+    db.config.set('path', str(tmp_path))
+    assert not db.config.sapshcut_exists()
+    db.config.delete('path')
+    assert not db.config.sapshcut_exists()
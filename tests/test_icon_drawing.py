@@ -0,0 +1,74 @@
+import base64
+import gc
+import struct
+import zlib
+
+import pytest
+
+from libs import icon_drawing
+from libs.icon_drawing import _ICONS, _scale_pixels, encode_png
+
+
+def _decode_png(data):
+    """解析 encode_png 的输出，返回 (宽, 高, 每行的 RGBA 字节)"""
+    png = base64.b64decode(data)
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks, pos = {}, 8
+    while pos < len(png):
+        length, kind = struct.unpack('>I4s', png[pos:pos + 8])
+        body = png[pos + 8:pos + 8 + length]
+        assert struct.unpack('>I', png[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(kind + body)
+        chunks[kind] = body
+        pos += 12 + length
+    width, height, depth, color = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+    assert (depth, color) == (8, 6)
+    raw = zlib.decompress(chunks[b'IDAT'])
+    stride = 1 + width * 4
+    assert len(raw) == stride * height
+    return width, height, [raw[y * stride + 1:(y + 1) * stride] for y in range(height)]
+
+
+def test_encode_png_pixels():
+    grid = [['#FF0000', None, (1, 2, 3, 128)], [None, None, '#00FF00']]
+    width, height, rows = _decode_png(encode_png(grid))
+    assert (width, height) == (3, 2)
+    assert rows[0] == b'\xff\x00\x00\xff' + b'\x00' * 4 + b'\x01\x02\x03\x80'
+    assert rows[1] == b'\x00' * 8 + b'\x00\xff\x00\xff'
+
+
+@pytest.mark.parametrize('name', sorted(_ICONS))
+@pytest.mark.parametrize('ratio', [1, 1.5, 2])
+def test_icon_sizes(name, ratio):
+    build, base = _ICONS[name]
+    size = int(base * ratio)
+    grid = _scale_pixels(build(base), size) if base == icon_drawing.BASE_SIZE else build(size)
+    width, height, rows = _decode_png(encode_png(grid))
+    assert (width, height) == (size, size)
+    # 不是全透明的图
+    assert any(row[i + 3] for row in rows for i in range(0, len(row), 4))
+
+
+def test_scale_pixels_nearest_neighbour():
+    grid = [['a', 'b'], ['c', 'd']]
+    assert _scale_pixels(grid, 2) is grid
+    assert _scale_pixels(grid, 4) == [['a', 'a', 'b', 'b']] * 2 + [['c', 'c', 'd', 'd']] * 2
+    assert _scale_pixels(grid, 3) == [['a', 'a', 'b'], ['a', 'a', 'b'], ['c', 'c', 'd']]
+
+
+class _Root:
+    def _root(self):
+        return self
+
+
+def test_cache_is_per_root_and_released(monkeypatch):
+    monkeypatch.setattr(icon_drawing, '_cache', icon_drawing.weakref.WeakKeyDictionary())
+    # PhotoImage 只引用 Tk 解释器，不引用根窗口对象
+    monkeypatch.setattr(icon_drawing, 'render_icon', lambda name, size, master=None: object())
+    first, second = _Root(), _Root()
+    image = icon_drawing.get_icon('link', first, 16)
+    assert icon_drawing.get_icon('link', first, 16) is image
+    assert icon_drawing.get_icon('link', second, 16) is not image
+    assert len(icon_drawing._cache) == 2
+    del first, second, image
+    gc.collect()
+    assert len(icon_drawing._cache) == 0
@@ -0,0 +1,98 @@
+import os
+import socket
+import stat
+import sys
+
+import pytest
+
+from libs import instance
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='Unix 域套接字')
+
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_private_dir_and_key(runtime):
+    path = instance.private_dir()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    key = instance.authkey()
+    assert len(key) == instance.KEY_SIZE
+    assert instance.authkey() == key
+    assert stat.S_IMODE(os.stat(os.path.join(path, 'instance.key')).st_mode) == 0o600
+
+
+def test_private_dir_mode_is_tightened(runtime):
+    path = runtime / f'zlogon-{os.getuid()}'
+    path.mkdir(mode=0o755)
+    os.chmod(path, 0o755)
+    instance.private_dir()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+def test_private_dir_rejects_symlink(runtime, tmp_path_factory):
+    os.symlink(tmp_path_factory.mktemp('other'), runtime / f'zlogon-{os.getuid()}')
+    with pytest.raises(OSError):
+        instance.private_dir()
+
+
+def test_forward_to_running_instance(runtime):
+    assert not instance.forward({'cmd': 'show'})
+    server = instance.listen()
+    try:
+        assert instance.listen() is None
+        assert instance.forward({'cmd': 'logon', 'target': 'A/B'})
+        assert not instance.forward({'cmd': 'unknown'})
+        assert server.poll() == [{'cmd': 'logon', 'target': 'A/B'}]
+    finally:
+        server.close()
+    assert not os.path.exists(instance.address())
+
+
+def test_wrong_key_is_rejected(runtime):
+    from multiprocessing.connection import Client
+    server = instance.listen()
+    try:
+        with pytest.raises((instance.AuthenticationError, EOFError, OSError)):
+            Client(instance.address(), 'AF_UNIX', authkey=b'x' * instance.KEY_SIZE)
+        assert instance.forward({'cmd': 'show'})
+        assert server.poll() == [{'cmd': 'show'}]
+    finally:
+        server.close()
+
+
+def test_stale_socket_is_replaced(runtime):
+    # 模拟异常退出：套接字文件留在目录中，但没有进程监听
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(instance.address())
+    sock.close()
+    assert not instance.forward({'cmd': 'show'})
+    server = instance.listen()
+    assert server is not None
+    server.close()
+
+
+def test_silent_client_does_not_block_others(runtime, monkeypatch):
+    monkeypatch.setattr(instance, 'HANDSHAKE_TIMEOUT', 0.5)
+    server = instance.listen()
+    silent = socket.socket(socket.AF_UNIX)
+    try:
+        # 连接后不回应握手
+        silent.connect(instance.address())
+        assert instance.forward({'cmd': 'show'})
+        assert server.poll() == [{'cmd': 'show'}]
+        # 超时后服务端断开连接：先收到握手挑战，然后是连接结束
+        silent.settimeout(5)
+        received = b''
+        while True:
+            data = silent.recv(1024)
+            if not data:
+                break
+            received += data
+        assert received
+    finally:
+        silent.close()
+        server.close()
@@ -0,0 +1,54 @@
+from libs.landscape import LandscapeService
+
+MAIN = """<?xml version="1.0" encoding="UTF-8"?>
+<Landscape>
+  <Workspaces><Workspace name="Local"><Node name="ERP"><Item serviceid="s1"/></Node></Workspace></Workspaces>
+  <Services><Service type="SAPGUI" uuid="s1" name="PRD" systemid="PRD"/></Services>
+  <Includes><Include url="global.xml" index="0"/></Includes>
+</Landscape>
+"""
+GLOBAL = """<?xml version="1.0" encoding="UTF-8"?>
+<Landscape>
+  <Services><Service type="SAPGUI" uuid="s2" name="QAS" systemid="QAS"/></Services>
+</Landscape>
+"""
+
+
+def test_cached_result_is_reused(tmp_path):
+    main = tmp_path / 'SAPUILandscape.xml'
+    main.write_text(MAIN, encoding='utf-8')
+    (tmp_path / 'global.xml').write_text(GLOBAL, encoding='utf-8')
+    service = LandscapeService()
+    landscape = service.load(str(main))
+    assert landscape.names == ['PRD', 'QAS']
+    assert service.load(str(main)) is landscape
+    assert [e['path'] for e in landscape.entries()] == [('Local', 'ERP'), ()]
+
+
+def test_missing_include_is_picked_up_later(tmp_path):
+    main = tmp_path / 'SAPUILandscape.xml'
+    main.write_text(MAIN, encoding='utf-8')
+    service = LandscapeService()
+    assert service.load(str(main)).names == ['PRD']
+    (tmp_path / 'global.xml').write_text(GLOBAL, encoding='utf-8')
+    assert service.load(str(main)).names == ['PRD', 'QAS']
+
+
+def test_broken_include_is_retried_after_change(tmp_path):
+    main = tmp_path / 'SAPUILandscape.xml'
+    main.write_text(MAIN, encoding='utf-8')
+    include = tmp_path / 'global.xml'
+    include.write_text('<Landscape><Services>', encoding='utf-8')
+    service = LandscapeService()
+    assert service.load(str(main)).names == ['PRD']
+    include.write_text(GLOBAL, encoding='utf-8')
+    assert service.load(str(main)).names == ['PRD', 'QAS']
+
+
+def test_disk_cache_round_trip(tmp_path):
+    main = tmp_path / 'SAPUILandscape.xml'
+    main.write_text(MAIN, encoding='utf-8')
+    cache = str(tmp_path / 'cache.json')
+    first = LandscapeService(cache).load(str(main))
+    second = LandscapeService(cache).load(str(main))
+    assert second.to_dict() == first.to_dict()
@@ -0,0 +1,48 @@
+import sys
+import time
+
+from libs.launcher import Launcher, LaunchQueue
+
+
+def _drain(queue, timeout=10.0):
+    changes = []
+    deadline = time.monotonic() + timeout
+    while queue.busy() and time.monotonic() < deadline:
+        changes += queue.pump()
+        time.sleep(0.02)
+    return changes
+
+
+def test_queue_limits_concurrency_and_reports_results():
+    launcher = Launcher([sys.executable, '-c', 'import sys; sys.exit(len(sys.argv) - 1)'], poll_interval=0.01)
+    queue = LaunchQueue(launcher, concurrency=1, delay=0)
+    assert queue.submit('a', 'ignored', [])
+    assert queue.submit('b', 'ignored', ['x'])
+    assert not queue.submit('a', 'ignored', [])
+    first = queue.pump()
+    assert [(key, state) for key, state, _ in first] == [('a', 'queued'), ('b', 'queued'), ('a', 'running')]
+    states = {key: state for key, state, _ in _drain(queue)}
+    assert states == {'a': 'ok', 'b': 'failed'}
+    launcher.close()
+
+
+def test_cancel_drops_queued_launches():
+    launcher = Launcher([sys.executable, '-c', 'pass'], poll_interval=0.01)
+    queue = LaunchQueue(launcher, concurrency=1, delay=60)
+    for key in 'abc':
+        queue.submit(key, 'ignored', [])
+    queue.pump()
+    assert queue.pending() == 2
+    assert queue.cancel() == ['b', 'c']
+    assert queue.pending() == 0
+    assert queue.submit('b', 'ignored', [])
+    launcher.close()
+
+
+def test_launch_failure_is_reported():
+    launcher = Launcher([], poll_interval=0.01)
+    queue = LaunchQueue(launcher, delay=0)
+    queue.submit('x', '/nonexistent/sapshcut.exe', [])
+    states = [(key, state) for key, state, _ in queue.pump()]
+    assert states == [('x', 'queued'), ('x', 'failed')]
+    assert not queue.busy()
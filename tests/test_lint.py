@@ -0,0 +1,22 @@
+import io
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _sources():
+    for top in ('libs', 'views', 'tests'):
+        for name in sorted(os.listdir(os.path.join(ROOT, top))):
+            if name.endswith('.py'):
+                yield os.path.join(ROOT, top, name)
+    yield os.path.join(ROOT, 'run.py')
+
+
+def test_pyflakes_clean():
+    api = pytest.importorskip('pyflakes.api')
+    reporter = pytest.importorskip('pyflakes.reporter')
+    out = io.StringIO()
+    warnings = sum(api.checkPath(path, reporter.Reporter(out, out)) for path in _sources())
+    assert warnings == 0, out.getvalue()
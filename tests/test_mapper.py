@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+
+from libs.Model import Link, Node
+from libs.mapper import decode_uuid, encode_uuid, escape_column, mapper_for, uuid_key
+from libs.OptionDB import Column, and_, or_
+
+
+def test_escape_reserved_column():
+    assert escape_column('group') == '"group"'
+    assert escape_column('node') == 'node'
+
+
+def test_models_expose_columns():
+    assert isinstance(Node.puuid, Column) and Node.puuid.name == 'puuid'
+    assert Link.client.name == 'client'
+
+
+def test_compiled_sql_is_cached_by_shape():
+    mapper = mapper_for(Node)
+    shape1, params1 = mapper.compile_where([Node.type == 'F', Node.puuid == None])  # noqa: E711
+    shape2, params2 = mapper.compile_where([Node.type == 'L', Node.puuid == None])  # noqa: E711
+    assert shape1 == shape2
+    assert (params1, params2) == (['F'], ['L'])
+    sql = mapper.select_sql(shape1, 'node', 1)
+    assert mapper.select_sql(shape2, 'node', 1) is sql
+    assert sql.endswith('WHERE type = ? AND puuid IS NULL ORDER BY node LIMIT 1')
+
+
+def test_compile_in_and_boolean_clauses():
+    mapper = mapper_for(Node)
+    shape, params = mapper.compile_where([or_(Node.node.like('a%'), and_(Node.position >= 1, Node.position < 5)),
+                                          Node.id.in_([1, 2, 3])])
+    assert params == ['a%', 1, 5, 1, 2, 3]
+    assert mapper.delete_sql(shape) == ('DELETE FROM node WHERE (node LIKE ? OR (position >= ? AND position < ?))'
+                                        ' AND id IN (?, ?, ?)')
+
+
+def test_unsupported_comparison():
+    mapper = mapper_for(Node)
+    with pytest.raises(ValueError):
+        mapper.compile_where([Node.position > None])
+
+
+def test_uuid_encoding():
+    value = uuid.uuid1()
+    assert encode_uuid(value, 'text') == str(value)
+    assert encode_uuid(value, 'blob') == value.bytes
+    assert decode_uuid(str(value)) == decode_uuid(value.bytes) == value
+    assert uuid_key(value) == uuid_key(str(value)) == uuid_key(value.bytes)
+
+
+def test_hydrate_and_row_params():
+    mapper = mapper_for(Link)
+    value = uuid.uuid1()
+    link = mapper.hydrate((7, str(value), 'PRD', 'PRD', '100', 'U', 'P', 'ZH'))
+    assert (link.id, link.uuid, link.client) == (7, value, '100')
+    assert not link.changed_fields()
+    assert mapper.row_params(link) == [str(value), 'PRD', 'PRD', '100', 'U', 'P', 'ZH']
+    node = mapper_for(Node).hydrate((1, 'F', '', '', 'F', 0, str(value), None, 1))
+    assert node.expanded is True
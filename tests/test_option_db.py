@@ -0,0 +1,217 @@
+import sqlite3
+import uuid as PUUID
+
+import pytest
+
+from libs.mapper import get_uuid_format
+from libs import migrations
+from libs.migrations import FTS_TABLE, MIGRATIONS, SCHEMA_VERSION, get_version, migrate, purge_orphans
+from libs.Model import Node
+from libs.OptionDB import sqliteDB
+
+
+def _count(db, table):
+    return db._get_connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_delete_subtree_returns_deleted_nodes(db, add):
+    folder = add('F', 'F')
+    sub = add('S', 'F', folder)
+    add('a', 'L', sub)
+    keep = add('b', 'L')
+    assert db.fts_enabled
+    assert db.deleteSubtree(folder) == 3
+    assert _count(db, 'node') == 1
+    assert _count(db, 'link') == 1
+    assert db.loadTree()[None][0].uuid == keep
+
+
+def test_purge_orphans_counts(db, add):
+    folder = add('F', 'F')
+    add('a', 'L', folder)
+    add('b', 'L', folder)
+    conn = db._get_connection()
+    with db.transaction():
+        conn.execute('DELETE FROM node WHERE type = ?', ('F',))
+        conn.execute("INSERT INTO link (uuid, node) VALUES ('dangling', 'x')")
+    with db.transaction():
+        assert purge_orphans(conn) == (2, 3)
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_search(db, add, fts):
+    folder = add('Production', 'F')
+    add('PRD 100', 'L', folder, system='PRD', user='ALICE')
+    add('DEV 200', 'L', folder, system='DEV', client='200')
+    add('Other', 'L')
+    db.fts_enabled = fts
+    tree, hits = db.searchTree('prd')
+    assert [n.node for n in tree[None]] == ['Production']
+    assert [n.node for n in tree[folder]] == ['PRD 100']
+    assert len(hits) == 1
+    _, hits = db.searchTree('alice prd')
+    assert len(hits) == 1
+    assert db.searchTree('dev alice') == ({}, set())
+    assert db.searchTree('  ') == ({}, set())
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_search_chinese_substring(db, add, fts):
+    folder = add('生产系统', 'F')
+    add('财务 PRD', 'L', folder, desc='总账系统', system='PRD')
+    add('测试', 'L', system='QAS')
+    db.fts_enabled = fts
+    tree, hits = db.searchTree('系统')
+    assert [n.node for n in tree[None]] == ['生产系统']
+    assert hits == {folder} | {n.uuid for n in tree[folder]}
+    # 中英文混合输入时每个词都须匹配
+    _, hits = db.searchTree('系统 prd')
+    assert {n.uuid for n in tree[folder]} == hits
+    assert db.searchTree('系统 qas') == ({}, set())
+
+
+def test_fts_created_on_startup_when_skipped(db, add):
+    # 模拟在不支持 FTS5 的 SQLite 上升级：版本已记为最新，但没有全文索引
+    add('PRD 100', 'L', system='PRD')
+    conn = db._get_connection()
+    with db.transaction():
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f'DROP TRIGGER {name}')
+        conn.execute(f'DROP TABLE {FTS_TABLE}')
+    db.close()
+    sqliteDB._instance = None
+    reopened = sqliteDB()
+    try:
+        assert reopened.fts_enabled
+        assert get_version(reopened._get_connection()) == SCHEMA_VERSION
+        assert len(reopened.searchTree('prd')[1]) == 1
+        add('DEV 200', 'L', system='DEV')
+        assert len(reopened.searchTree('dev')[1]) == 1
+    finally:
+        reopened.close()
+
+
+def _uuid_types(db, name):
+    return tuple(db._get_connection().execute('SELECT typeof(uuid), typeof(puuid) FROM node WHERE node = ?',
+                                              (name,)).fetchone())
+
+
+def test_uuid_storage_round_trip(db, add):
+    folder = add('F', 'F')
+    link = add('a', 'L', folder)
+    db.convertUuidStorage('blob')
+    assert get_uuid_format() == 'blob'
+    assert _uuid_types(db, 'a') == ('blob', 'blob')
+    # BLOB 格式下的写入与查询
+    add('b', 'L', folder)
+    assert _uuid_types(db, 'b') == ('blob', 'blob')
+    assert [n.node for n in db.loadTree()[folder]] == ['a', 'b']
+    assert db.session.query(Node).filter(Node.uuid == link).first().node == 'a'
+    assert len(db.searchTree('sys')[1]) == 2
+    db.convertUuidStorage('text')
+    assert get_uuid_format() == 'text'
+    assert _uuid_types(db, 'b') == ('text', 'text')
+    assert [n.node for n in db.loadTree()[folder]] == ['a', 'b']
+    assert db.deleteSubtree(folder) == 3
+
+
+def test_malformed_uuid_is_reported_without_blocking_startup(db, add, monkeypatch, capsys):
+    add('a')
+    with db.transaction() as conn:
+        bad = conn.execute("INSERT INTO node (node, type, uuid) VALUES ('bad', 'L', 'not-a-uuid')").lastrowid
+    with pytest.raises(ValueError, match=f'node.id={bad}'):
+        db.convertUuidStorage('blob')
+    assert get_uuid_format() == 'text'
+    assert _uuid_types(db, 'a') == ('text', 'null')
+    db.close()
+    sqliteDB._instance = None
+    monkeypatch.setenv('ZLOGON_UUID_FORMAT', 'blob')
+    reopened = sqliteDB()
+    try:
+        assert get_uuid_format() == 'text'
+        assert f'node.id={bad}' in capsys.readouterr().out
+        assert [n.node for n in reopened.loadTree()[None]] == ['a', 'bad']
+    finally:
+        reopened.close()
+
+
+def _legacy_db(path):
+    """旧版程序创建的数据库：只有三张表，user_version 为 0"""
+    conn = sqlite3.connect(path)
+    for sql in MIGRATIONS[0][2]:
+        conn.execute(sql)
+    conn.commit()
+    return conn
+
+
+def _insert(conn, name, type='L', puuid=None, uuid=None):
+    uuid = uuid or str(PUUID.uuid1())
+    conn.execute('INSERT INTO node (node, desc, "group", type, position, uuid, puuid) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                 (name, '', '', type, 0, uuid, puuid))
+    if type == 'L':
+        conn.execute('INSERT INTO link (uuid, node, system, client, user, password, language) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)', (uuid, name, 'PRD', '100', 'U', '', 'ZH'))
+    conn.commit()
+    return uuid
+
+
+def _schema(conn):
+    return sorted(tuple(r) for r in conn.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+
+def _migrate_to(conn, version, monkeypatch):
+    """只执行到 version 为止的迁移"""
+    with monkeypatch.context() as m:
+        m.setattr(migrations, 'MIGRATIONS', [step for step in MIGRATIONS if step[0] <= version])
+        assert migrate(conn) == version
+
+
+@pytest.mark.parametrize('start', [0] + [step[0] for step in MIGRATIONS[:-1]])
+def test_upgrade_from_each_version(tmp_path, monkeypatch, start):
+    fresh = sqlite3.connect(tmp_path / 'fresh.db')
+    assert migrate(fresh) == SCHEMA_VERSION
+
+    conn = _legacy_db(tmp_path / 'old.db')
+    _migrate_to(conn, start, monkeypatch)
+    folder = _insert(conn, 'Folder', 'F')
+    _insert(conn, 'PRD 100', 'L', folder)
+    assert migrate(conn) == SCHEMA_VERSION == get_version(conn)
+    assert _schema(conn) == _schema(fresh)
+    assert conn.execute('SELECT COUNT(*) FROM node').fetchone()[0] == 2
+    # 升级前写入的数据也进入全文索引
+    assert conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'prd'").fetchone()[0] == 1
+    # 重复执行不做任何修改
+    assert migrate(conn) == SCHEMA_VERSION
+    conn.close()
+    fresh.close()
+
+
+def test_failed_step_rolls_back_its_version(tmp_path, monkeypatch):
+    conn = _legacy_db(tmp_path / 'old.db')
+    broken = [MIGRATIONS[0], (2, '损坏的迁移', ['CREATE INDEX idx_broken ON node(node)', 'SELECT * FROM missing'])]
+    monkeypatch.setattr(migrations, 'MIGRATIONS', broken)
+    with pytest.raises(sqlite3.DatabaseError, match='版本 2'):
+        migrate(conn)
+    # 之前的版本已提交，失败的版本整体回滚
+    assert get_version(conn) == 1
+    assert not conn.in_transaction
+    assert ('index', 'idx_broken', 'node') not in _schema(conn)
+    conn.close()
+
+
+def test_orphan_purge_migration(tmp_path, monkeypatch):
+    conn = _legacy_db(tmp_path / 'old.db')
+    folder = _insert(conn, 'F', 'F')
+    sub = _insert(conn, 'S', 'F', folder)
+    _insert(conn, 'kept', 'L', sub)
+    # 旧版删除分组后残留的下级节点与连接
+    lost = _insert(conn, 'lost', 'F', str(PUUID.uuid1()))
+    _insert(conn, 'lost link', 'L', lost)
+    conn.execute("INSERT INTO link (uuid, node) VALUES (?, 'dangling')", (str(PUUID.uuid1()),))
+    conn.commit()
+    _migrate_to(conn, 2, monkeypatch)
+    assert migrate(conn) == SCHEMA_VERSION
+    assert sorted(r[0] for r in conn.execute('SELECT node FROM node')) == ['F', 'S', 'kept']
+    assert [r[0] for r in conn.execute('SELECT node FROM link')] == ['kept']
+    conn.close()
@@ -0,0 +1,45 @@
+import pytest
+
+from libs.provision import TemplateError, build_records, check_templates, provision, render
+
+ENTRIES = [
+    {'system': 'PRD', 'sid': 'PRD', 'desc': '生产', 'path': ('Local', 'ERP')},
+    {'system': 'QAS', 'sid': 'QAS', 'desc': '', 'path': ()},
+]
+TEMPLATES = {'client': '100', 'user': '{sid}_USER', 'language': 'ZH'}
+
+
+def test_render():
+    assert render('{sid}-{system}', {'system': 'S', 'sid': 'X'}) == 'X-S'
+    assert render('{other}', {}) == '{other}'
+    assert render(None, {}) == ''
+
+
+@pytest.mark.parametrize('template', ['{sid', 'sid}', '{0}', '{system:d}', '{system.x}'])
+def test_bad_template_names_the_template(template):
+    with pytest.raises(TemplateError) as info:
+        render(template, {'system': 'S'}, 'user')
+    assert info.value.key == 'user'
+    assert template in str(info.value)
+    errors = check_templates(dict(TEMPLATES, user=template))
+    assert [e.key for e in errors] == ['user']
+
+
+def test_build_records():
+    records = list(build_records(ENTRIES, TEMPLATES, root='SAP'))
+    assert [(r['path'], r['node'], r['user']) for r in records] == [
+        ('SAP/Local/ERP', 'PRD-100', 'PRD_USER'), ('SAP', 'QAS-100', 'QAS_USER')]
+
+
+def test_provision_skips_existing(db):
+    progress = provision(db, ENTRIES, TEMPLATES)
+    assert (progress.folders, progress.links) == (2, 2)
+    progress = provision(db, ENTRIES, TEMPLATES)
+    assert (progress.links, progress.existing) == (0, 2)
+    assert db.countNodes() == 4
+
+
+def test_provision_with_bad_template_writes_nothing(db):
+    with pytest.raises(TemplateError):
+        provision(db, ENTRIES, dict(TEMPLATES, client='{'))
+    assert db.countNodes() == 0
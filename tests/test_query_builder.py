@@ -0,0 +1,38 @@
+from libs.Model import Link, Node
+from libs.OptionDB import QueryBuilder, or_
+
+
+def _names(nodes):
+    return sorted(n.node for n in nodes)
+
+
+def test_operators(db, add):
+    folder = add('Folder', 'F')
+    for name in ('alpha', 'beta', 'gamma'):
+        add(name, 'L', folder)
+    query = db.session.query
+    assert _names(query(Node).filter(Node.puuid == folder).all()) == ['alpha', 'beta', 'gamma']
+    assert _names(query(Node).filter(Node.puuid == None).all()) == ['Folder']  # noqa: E711
+    assert _names(query(Node).filter(Node.node.like('%A%')).all()) == ['alpha', 'beta', 'gamma']
+    assert _names(query(Node).filter(or_(Node.node == 'beta', Node.type == 'F')).all()) == ['Folder', 'beta']
+    assert _names(query(Node).filter(Node.id >= 2, Node.id < 4).all()) == ['alpha', 'beta']
+    first = query(Node).filter(Node.type == 'L').order_by(Node.node).first()
+    assert first.node == 'alpha'
+
+
+def test_identity_map_returns_same_object(db, add):
+    uuid = add('alpha')
+    node = db.session.query(Node).filter(Node.uuid == uuid).first()
+    assert db.session.query(Node).filter(Node.node == 'alpha').first() is node
+    assert db.session.query(Node).filter(Node.uuid == str(uuid)).first() is node
+
+
+def test_bulk_delete_in_chunks(db, add, monkeypatch):
+    uuids = [add(f'l{i}') for i in range(7)]
+    monkeypatch.setattr(QueryBuilder, '_IN_CHUNK', 3)
+    with db.transaction():
+        db.session.query(Node).filter(Node.uuid.in_(uuids[:5])).delete()
+        db.session.query(Link).filter(Link.uuid.in_(uuids[:5])).delete()
+    assert _names(db.session.query(Node).all()) == ['l5', 'l6']
+    assert len(db.session.query(Link).all()) == 2
+    assert db.session.query(Node).filter(Node.uuid == uuids[0]).first() is None
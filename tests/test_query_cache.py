@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+
+from libs.Model import Config
+from libs.state_writer import StateWriter
+
+
+def _write_in_thread(db, value):
+    def task():
+        with db.transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)', ('probe', value))
+        db.release()
+    thread = threading.Thread(target=task)
+    thread.start()
+    thread.join()
+
+
+def test_local_commits_are_not_external_changes(db):
+    db.query_cache.check_interval = 0
+    seen = db.check_changes()
+    _write_in_thread(db, '1')
+    assert db.check_changes() == seen
+    # 本地提交后缓存仍然失效，读到新值
+    assert db.fetch('SELECT value FROM config WHERE key=?', ('probe',)) == [('1',)]
+
+
+def test_other_process_commit_is_external_change(db):
+    db.query_cache.check_interval = 0
+    reloaded = []
+    db.query_cache.on_external_change = lambda: reloaded.append(True)
+    seen = db.check_changes()
+    assert db.fetch('SELECT value FROM config WHERE key=?', ('probe',)) == []
+    other = sqlite3.connect(db.dbpath)
+    with other:
+        other.execute('INSERT INTO config (key, value) VALUES (?, ?)', ('probe', '2'))
+    other.close()
+    assert db.check_changes() == seen + 1
+    assert reloaded == [True]
+    assert db.fetch('SELECT value FROM config WHERE key=?', ('probe',)) == [('2',)]
+
+
+def _flush_expanded(db, uuid):
+    writer = StateWriter(db, delay=0.01)
+    writer.start()
+    writer.set_expanded(uuid, True)
+    assert writer.close()
+
+
+def test_external_write_right_after_local_flush(db, add):
+    folder = add('F', 'F')
+    db.query_cache.check_interval = 0
+    seen = db.check_changes()
+    _flush_expanded(db, folder)
+    assert db.check_changes() == seen
+    # 本地写入与外部写入落在同一检查间隔内
+    _flush_expanded(db, add('G', 'F'))
+    other = sqlite3.connect(db.dbpath)
+    with other:
+        other.execute('INSERT INTO config (key, value) VALUES (?, ?)', ('probe', '4'))
+    other.close()
+    assert db.check_changes() == seen + 1
+    assert db.fetch('SELECT value FROM config WHERE key=?', ('probe',)) == [('4',)]
+
+
+def test_query_results_are_cached_until_commit(db):
+    db.query_cache.check_interval = 60
+    sql = 'SELECT value FROM config WHERE key=?'
+    db.fetch(sql, ('probe',))
+    hits = db.query_cache.hits
+    db.fetch(sql, ('probe',))
+    assert db.query_cache.hits == hits + 1
+    db.session.add_all([Config(key='probe', value='3')])
+    db.session.commit()
+    assert db.fetch(sql, ('probe',)) == [('3',)]
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from libs.Model import Link, Node
+
+
+def _count(db, table):
+    return db._get_connection().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_commit_inserts_in_one_transaction(db, add):
+    nodes = [add(f'n{i}', commit=False)[0] for i in range(3)]
+    db.session.commit()
+    assert all(n.id is not None for n in nodes)
+    assert len({n.id for n in nodes}) == 3
+    assert db.session.query(Node).filter(Node.uuid == nodes[1].uuid).first() is nodes[1]
+    assert len(db.session.query(Link).all()) == 3
+
+
+def test_commit_updates_only_changed_columns(db, add):
+    node, _ = add('before', commit=False)
+    db.session.commit()
+    conn = db._get_connection()
+    # 其他途径修改的列不会被未修改的对象覆盖
+    with db.transaction():
+        conn.execute('UPDATE node SET desc = ? WHERE id = ?', ('external', node.id))
+    node.node = 'after'
+    db.session.mark_dirty(node)
+    db.session.commit()
+    assert tuple(conn.execute('SELECT node, desc FROM node WHERE id = ?', (node.id,)).fetchone()) == \
+        ('after', 'external')
+    assert not node.changed_fields()
+
+
+def test_failed_commit_rolls_back(db, add):
+    existing = add('existing')
+    fresh, _ = add('fresh', commit=False)
+    duplicate, _ = add('duplicate', uuid=existing, commit=False)
+    with pytest.raises(sqlite3.IntegrityError):
+        db.session.commit()
+    assert fresh.id is None and duplicate.id is None
+    assert _count(db, 'node') == 1
+    assert not db._get_connection().in_transaction
+
+
+def test_nested_transaction_joins_outer(db, add):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            add('inner')
+            raise RuntimeError
+    assert _count(db, 'node') == 0
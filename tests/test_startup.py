@@ -0,0 +1,37 @@
+import importlib
+import importlib.resources
+import sys
+
+from libs import startup
+
+
+def test_profiler_keeps_original_loader(tmp_path, monkeypatch):
+    package = tmp_path / 'startup_probe'
+    package.mkdir()
+    (package / '__init__.py').write_text("from importlib.resources import files\n"
+                                         "DATA = files(__name__).joinpath('data.txt').read_text()\n")
+    (package / 'data.txt').write_text('probe')
+    (tmp_path / 'startup_later.py').write_text('')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ('startup_probe', 'startup_later'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    report = tmp_path / 'report.txt'
+
+    assert startup.install(['run.py', f'{startup.ARG}={report}'])
+    try:
+        assert startup.enabled()
+        module = importlib.import_module('startup_probe')
+    finally:
+        path = startup.finish()
+    assert module.DATA == 'probe'
+    assert not isinstance(module.__loader__, startup._TimedLoader)
+    assert module.__spec__.loader is module.__loader__
+    assert module.__loader__.get_data(str(package / 'data.txt')) == b'probe'
+    assert importlib.resources.files(module).joinpath('data.txt').read_text() == 'probe'
+
+    # 关闭后不再计时
+    assert path == str(report) and not startup.enabled()
+    assert not any(isinstance(f, startup.ImportProfiler) for f in sys.meta_path)
+    importlib.import_module('startup_later')
+    text = report.read_text(encoding='utf-8')
+    assert 'startup_probe' in text and 'startup_later' not in text
@@ -0,0 +1,60 @@
+import sqlite3
+from contextlib import contextmanager
+
+from libs.state_writer import StateWriter
+
+
+def _expanded(db, uuid):
+    from libs.mapper import encode
+    return db._get_connection().execute('SELECT expanded FROM node WHERE uuid=?', (encode(uuid),)).fetchone()[0]
+
+
+def _failing(db, monkeypatch, count):
+    """让 db.transaction() 的前 count 次调用失败"""
+    original = db.transaction
+    calls = []
+
+    @contextmanager
+    def transaction():
+        calls.append(True)
+        if len(calls) <= count:
+            raise sqlite3.OperationalError('database is locked')
+        with original() as conn:
+            yield conn
+    monkeypatch.setattr(db, 'transaction', transaction)
+    return calls
+
+
+def test_writes_last_state(db, add):
+    folder = add('F', 'F')
+    writer = StateWriter(db, delay=0.01)
+    writer.start()
+    writer.set_expanded(folder, True)
+    writer.set_expanded(folder, False)
+    writer.set_expanded(folder, True)
+    assert writer.close()
+    assert _expanded(db, folder) == 1
+
+
+def test_failed_batch_is_retried_and_reported_once(db, add, monkeypatch):
+    folder = add('F', 'F')
+    calls = _failing(db, monkeypatch, 2)
+    writer = StateWriter(db, delay=0.01, retry_delay=0.01)
+    writer.start()
+    writer.set_expanded(folder, True)
+    assert writer.close()
+    assert len(calls) == 3
+    assert writer.poll_errors() == ['database is locked']
+    assert writer.last_error is None
+    assert _expanded(db, folder) == 1
+
+
+def test_close_reports_unsaved_state(db, add, monkeypatch):
+    folder = add('F', 'F')
+    _failing(db, monkeypatch, 100)
+    writer = StateWriter(db, delay=0.01, retry_delay=0.01, retries=2)
+    writer.start()
+    writer.set_expanded(folder, True)
+    assert not writer.close()
+    assert writer.last_error == 'database is locked'
+    assert _expanded(db, folder) == 0
@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+from libs.transfer import Exporter, Importer, Progress, read_records
+
+
+def _populate(add):
+    root = add('生产', 'F', desc='PRD 系统')
+    sub = add('ERP, "FI"', 'F', root)
+    add('空分组', 'F')
+    add('PRD-100', 'L', sub, desc='财务', system='PRD', client='100', user='ALICE', password='p,w"1')
+    add('PRD-200', 'L', root, system='PRD', client='200', language='EN')
+    add('Sandbox', 'L', system='SBX', client='001')
+
+
+def _export(db, path):
+    progress = Exporter(db).export(str(path))
+    with open(path, encoding='utf-8', newline='') as f:
+        fmt = {'.csv': 'csv', '.json': 'json', '.yaml': 'yaml'}[path.suffix]
+        records = [dict(r) for r in read_records(io.StringIO(f.read()), fmt)]
+    return progress, sorted(records, key=lambda r: (r['type'], r['path'], r['node']))
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.json', '.yaml'])
+def test_round_trip(db, add, tmp_path, suffix):
+    if suffix == '.yaml':
+        pytest.importorskip('yaml')
+    _populate(add)
+    path = tmp_path / ('export' + suffix)
+    progress, exported = _export(db, path)
+    assert (progress.folders, progress.links) == (3, 3)
+    assert {(r['type'], r['path'], r['node']) for r in exported} >= {
+        ('F', '生产', 'ERP, "FI"'), ('L', '生产/ERP, "FI"', 'PRD-100'), ('F', '', '空分组')}
+    assert [r['password'] for r in exported if r['node'] == 'PRD-100'] == ['p,w"1']
+
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM link')
+        conn.execute('DELETE FROM node')
+    db.session.expunge_all()
+    progress = Importer(db).import_file(str(path))
+    assert (progress.folders, progress.links) == (3, 3)
+    assert _export(db, tmp_path / ('again' + suffix))[1] == exported
+
+
+def test_import_skips_existing_and_invalid(db, add):
+    _populate(add)
+    records = [
+        {'type': 'L', 'path': '生产', 'node': 'dup', 'system': 'PRD', 'client': '200'},
+        {'type': 'L', 'path': '新分组/下级', 'node': 'new', 'system': 'DEV', 'client': '300'},
+        {'type': 'X', 'node': 'bad'},
+    ]
+    progress = Importer(db, batch_size=1, skip_existing=True).import_records(records, Progress())
+    assert (progress.links, progress.folders, progress.existing, progress.skipped) == (1, 2, 1, 1)
+    tree = db.loadTree()
+    folder = next(n for n in tree[None] if n.node == '新分组')
+    sub, = tree[folder.uuid]
+    assert [n.node for n in tree[sub.uuid]] == ['new']
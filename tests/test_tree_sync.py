@@ -0,0 +1,223 @@
+import random
+import uuid as PUUID
+from types import SimpleNamespace
+
+from libs.mapper import encode_uuid
+from libs.tree_sync import TreeReconciler
+from views.main import Main
+
+
+class FakeTreeview:
+    """按 Tk 规则实现的 Treeview：move 的位置按去掉被移动项目后的子项列表计算"""
+
+    def __init__(self):
+        self.children = {'': []}
+        self.parents = {}
+        self.data = {}
+        self.calls = []
+
+    def get_children(self, iid=''):
+        return tuple(self.children[iid])
+
+    def exists(self, iid):
+        return iid in self.parents
+
+    def insert(self, parent, index, iid, text='', values=(), tags=(), open=False):
+        assert iid not in self.parents
+        self.calls.append(('insert', iid))
+        siblings = self.children[parent]
+        siblings.insert(len(siblings) if index == 'end' else index, iid)
+        self.parents[iid] = parent
+        self.children[iid] = []
+        self.data[iid] = {'text': text, 'values': values, 'tags': tags, 'open': open}
+
+    def move(self, iid, parent, index):
+        self.calls.append(('move', iid))
+        self.children[self.parents[iid]].remove(iid)
+        self.children[parent].insert(index, iid)
+        self.parents[iid] = parent
+
+    def item(self, iid, option=None, **kw):
+        if option:
+            return self.data[iid][option]
+        self.calls.append(('item', iid))
+        self.data[iid].update(kw)
+
+    def delete(self, *iids):
+        for iid in iids:
+            if iid not in self.parents:
+                continue
+            self.calls.append(('delete', iid))
+            for child in list(self.children[iid]):
+                self.delete(child)
+            self.children[self.parents[iid]].remove(iid)
+            del self.parents[iid]
+            del self.children[iid]
+
+    def selection(self):
+        return ()
+
+    def snapshot(self, parent=''):
+        return [(iid, self.data[iid]['text'], self.snapshot(iid)) for iid in self.children[parent]]
+
+
+def node(name, type='L', uuid=None, expanded=1):
+    return SimpleNamespace(uuid=uuid or name, node=name, desc='', type=type, expanded=expanded)
+
+
+def test_rename_moves_forward_within_parent():
+    view = FakeTreeview()
+    reconciler = TreeReconciler(view)
+    nodes = [node(n) for n in 'ABCD']
+    reconciler.sync({None: nodes})
+    assert view.get_children() == ('A', 'B', 'C', 'D')
+
+    nodes[0].node = 'Bz'
+    reconciler.sync({None: [nodes[1], nodes[0], nodes[2], nodes[3]]})
+    assert view.get_children() == ('B', 'A', 'C', 'D')
+    assert reconciler.stats['move'] == 1
+
+
+def test_moves_backward_and_across_parents():
+    view = FakeTreeview()
+    reconciler = TreeReconciler(view)
+    folder = node('F', 'F')
+    links = [node(n) for n in 'abc']
+    reconciler.sync({None: [folder, links[0]], 'F': links[1:]})
+    reconciler.sync({None: [links[2], folder], 'F': [links[1], links[0]]})
+    assert view.snapshot() == [('c', 'c', []), ('F', 'F', [('b', 'b', []), ('a', 'a', [])])]
+
+
+def test_noop_sync_makes_no_calls():
+    view = FakeTreeview()
+    reconciler = TreeReconciler(view)
+    tree = {None: [node('F', 'F'), node('x')], 'F': [node('y')]}
+    reconciler.sync(tree)
+    view.calls.clear()
+    assert reconciler.sync(tree) == {'insert': 0, 'delete': 0, 'move': 0, 'update': 0}
+    assert view.calls == []
+
+
+def test_lazy_folder_placeholder():
+    view = FakeTreeview()
+    reconciler = TreeReconciler(view)
+    reconciler.sync({None: [node('F', 'F', expanded=0)]}, parents=set(), has_children={'F'})
+    assert not reconciler.is_loaded('F')
+    assert view.get_children('F') == (TreeReconciler.PLACEHOLDER + 'F',)
+    reconciler.sync({'F': [node('x')]}, 'F', 'F', parents={'F'})
+    assert reconciler.is_loaded('F')
+    assert view.get_children('F') == ('x',)
+
+
+def _random_tree(rng, names):
+    """随机的两层树：若干分组和连接"""
+    folders = [node(n, 'F') for n in rng.sample(names[:4], rng.randint(0, 4))]
+    rest = [n for n in names[4:]]
+    rng.shuffle(rest)
+    tree = {None: list(folders)}
+    parents = [None] + [f.uuid for f in folders]
+    for name in rest[:rng.randint(0, len(rest))]:
+        tree.setdefault(rng.choice(parents), []).append(node(name + rng.choice(('', '*'))))
+    for children in tree.values():
+        rng.shuffle(children)
+    for children in tree.values():
+        for n in children:
+            n.uuid = n.node.rstrip('*')
+    return tree
+
+
+def test_random_trees_match_fresh_build():
+    rng = random.Random(20)
+    names = ['F1', 'F2', 'F3', 'F4'] + [f'l{i}' for i in range(12)]
+    view = FakeTreeview()
+    reconciler = TreeReconciler(view)
+    for _ in range(300):
+        tree = _random_tree(rng, names)
+        reconciler.sync(tree)
+        fresh = FakeTreeview()
+        TreeReconciler(fresh).sync(tree)
+        assert view.snapshot() == fresh.snapshot()
+
+
+class FakeMain:
+    """只含树加载相关方法的主窗口，界面使用 FakeTreeview"""
+    TREE_MODE_KEY = Main.TREE_MODE_KEY
+    LAZY_THRESHOLD = Main.LAZY_THRESHOLD
+    set_tree = Main.set_tree
+    _lazy_tree = Main._lazy_tree
+    _load_children = Main._load_children
+
+    def __init__(self, db):
+        self.db = db
+        self.treeView = FakeTreeview()
+        self.reconciler = TreeReconciler(self.treeView)
+
+    def after(self, ms, func=None):
+        pass
+
+    def _select_first_item(self):
+        pass
+
+
+def _lazy_fixture(add):
+    """A（折叠）下有连接；B（展开）下有折叠的空分组 C、折叠的 D（有连接）和连接"""
+    a = add('A', 'F')
+    add('a1', 'L', a)
+    b = add('B', 'F', expanded=1)
+    c = add('C', 'F', b)
+    d = add('D', 'F', b)
+    add('d1', 'L', d)
+    add('b1', 'L', b)
+    return a, b, c, d
+
+
+def test_lazy_load_placeholders_and_saved_state(db, add):
+    a, b, c, d = (str(u) for u in _lazy_fixture(add))
+    main = FakeMain(db)
+    db.config.set(Main.TREE_MODE_KEY, 'lazy')
+    main.set_tree('saved')
+    view = main.treeView
+    names = {iid: data['text'] for iid, data in view.data.items()}
+    assert [names[i] for i in view.get_children()] == ['A', 'B']
+    # 折叠的分组只读取到自身，有子节点时放一个占位子项
+    assert view.get_children(a) == (TreeReconciler.PLACEHOLDER + a,)
+    assert not main.reconciler.is_loaded(a)
+    assert [names[i] for i in view.get_children(b)] == ['C', 'D', 'b1']
+    assert view.get_children(c) == ()
+    assert view.get_children(d) == (TreeReconciler.PLACEHOLDER + d,)
+    # 按保存的状态展开
+    assert (view.data[a]['open'], view.data[b]['open'], view.data[d]['open']) == (False, True, False)
+
+    main._load_children(a)
+    assert [view.data[i]['text'] for i in view.get_children(a)] == ['a1']
+    assert main.reconciler.is_loaded(a)
+    # 刷新时已加载的分组保持加载
+    main.set_tree()
+    assert [view.data[i]['text'] for i in view.get_children(a)] == ['a1']
+    assert view.get_children(d) == (TreeReconciler.PLACEHOLDER + d,)
+
+
+def test_tree_mode_auto_switches_at_threshold(db, add):
+    main = FakeMain(db)
+    count = Main.LAZY_THRESHOLD - 1
+    folder = add('F', 'F')
+    with db.transaction() as conn:
+        conn.executemany('INSERT INTO node (node, "group", type, position, uuid, puuid, expanded) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         [(f'n{i}', '', 'L', 0, encode_uuid(PUUID.uuid1()), encode_uuid(folder), 0)
+                          for i in range(count)])
+    assert db.countNodes() == Main.LAZY_THRESHOLD
+    assert not main._lazy_tree()
+    main.set_tree('saved')
+    assert len(main.treeView.get_children(str(folder))) == count
+
+    add('one more')
+    assert main._lazy_tree()
+    lazy = FakeMain(db)
+    lazy.set_tree('saved')
+    assert lazy.treeView.get_children(str(folder)) == (TreeReconciler.PLACEHOLDER + str(folder),)
+    # 显式设置优先于节点数
+    db.config.set(Main.TREE_MODE_KEY, 'eager')
+    assert not main._lazy_tree()
+    db.config.set(Main.TREE_MODE_KEY, 'lazy')
+    assert main._lazy_tree()
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk
-from libs.Model import Config
 from libs.guiCfg import GuiCfg
 from libs.gui_util import center_window, get_icon_path
 from libs.OptionDB import sqliteDB
@@ -64,9 +63,9 @@ class DialogCfg(tk.Toplevel):
         self.lineEditConfig.bind('<KeyRelease>', lambda e: self.on_changed())
 
     def init_data(self):
-        db_config = self.db.session.query(Config).filter(Config.key == 'path').first()
-        if db_config:
-            self.lineEditConfig.insert(0, db_config.value)
+        path = self.db.config.get('path')
+        if path:
+            self.lineEditConfig.insert(0, path)
 
     def on_changed(self):
         self.changed = True
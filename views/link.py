@@ -6,7 +6,7 @@ from libs.Model import Node
 from libs.guiCfg import GuiCfg
 from libs.gui_util import center_window, get_icon_path
 from libs.OptionDB import sqliteDB
-from libs.icon_drawing import draw_eye_icon
+from libs.icon_drawing import draw_eye_icon, icon_size, EYE_SIZE
 from libs import message
 
 
@@ -121,7 +121,8 @@ class DialogLink(tk.Toplevel):
         entry.pack(fill=tk.BOTH, expand=True)
         
         # 创建眼睛图标按钮 - 使用place放在输入框内部靠右
-        eye_canvas = tk.Canvas(container, width=20, height=20, highlightthickness=0, relief='flat', bg='SystemButtonFace', cursor='hand2')
+        size = icon_size(self, EYE_SIZE)
+        eye_canvas = tk.Canvas(container, width=size, height=size, highlightthickness=0, relief='flat', bg='SystemButtonFace', cursor='hand2')
         eye_canvas.place(in_=container, relx=1, rely=0.5, anchor='e', x=-4, y=0)
         
         # 绘制眼睛图标
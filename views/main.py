@@ -1,42 +1,92 @@
 import uuid as PUUID
-import subprocess
 import tkinter as tk
 from tkinter import ttk
 
-from views.config import DialogCfg
-from views.link import DialogLink
-from views.group import DialogGroup
-from libs.Model import Node, Link, Config
+# 对话框、导入/导出、subprocess 等只在使用时才导入（见各方法），主窗口与树先显示出来
+from libs import startup
+from libs.Model import Node, Link
 from libs.guiCfg import GuiCfg
 from libs.gui_util import center_window, get_icon_path
 from libs.OptionDB import sqliteDB
-from libs.icon_drawing import create_folder_closed_icon, create_folder_open_icon, create_link_icon
+from libs.state_writer import StateWriter
+from libs.tree_sync import TreeReconciler
+from libs.icon_drawing import get_icon, icon_size
 from libs import message
 
 
 class Main(tk.Tk):
-    def __init__(self):
+    # 搜索框输入停止多少毫秒后执行搜索
+    SEARCH_DELAY = 150
+    # 树的加载方式（config 表 tree_mode）：lazy 分组展开时才读取子节点，eager 启动时读取整棵树，
+    # auto 在节点数超过 LAZY_THRESHOLD 时使用 lazy
+    TREE_MODE_KEY = 'tree_mode'
+    LAZY_THRESHOLD = 2000
+    # 每隔多少毫秒检查一次数据库是否被其他进程/线程修改
+    CHANGE_POLL_INTERVAL = 2000
+    # 有登录进程运行时每隔多少毫秒取一次启动结果
+    LAUNCH_POLL_INTERVAL = 200
+    # 批量登录：同时运行的登录进程数、相邻两次启动的间隔秒数（config 表）
+    LAUNCH_CONCURRENCY_KEY = 'launch_concurrency'
+    LAUNCH_DELAY_KEY = 'launch_delay'
+    # 每隔多少毫秒取一次其他进程转发来的命令
+    INSTANCE_POLL_INTERVAL = 100
+
+    def __init__(self, instance=None, command=None):
+        """instance 为 libs.instance.InstanceServer，command 为启动时命令行中的命令（见 libs.instance）"""
         super().__init__()
+        startup.mark('Tk 初始化')
         try:
             self.db = sqliteDB()
         except Exception as e:
             message.error('错误', f'数据库初始化失败: {e}')
             self.destroy()
             raise SystemExit(1)
+        startup.mark('数据库')
         self.guiCfg = GuiCfg()
+        # 分组展开/折叠状态交给后台线程合并写入
+        self.stateWriter = StateWriter(self.db)
+        self.stateWriter.start()
         self.init = True
+        self._search_job = None
+        # 登录启动器与队列首次登录时创建
+        self.launcher = None
+        self.launchQueue = None
+        self._launch_job = None
+        self._launch_failures = []
         self._setup_ui()
-        self.set_tree()
+        startup.mark('窗口')
+        # 刷新时只对变化的项目执行插入/删除/移动/更新
+        self.reconciler = TreeReconciler(self.treeView)
+        # 启动时懒加载模式按保存的状态展开，否则全部展开
+        self.set_tree('saved' if self._lazy_tree() else 'all')
+        startup.mark('连接树')
         self.init = False
+        self._external_changes = self.db.check_changes()
+        self.after(self.CHANGE_POLL_INTERVAL, self._poll_changes)
+        # 再次启动程序时转发来的命令
+        self.instance = instance
+        if instance is not None:
+            self.after(self.INSTANCE_POLL_INTERVAL, self._poll_instance)
+        if command and command.get('cmd') != 'show':
+            self.after_idle(lambda: self._run_command(command))
         # 确保主窗口获得焦点
         self.focus_force()
         self.treeView.focus_set()
+        if startup.enabled():
+            # 窗口绘制完成（事件循环第一次空闲）后写出启动报告
+            self.after_idle(self._startup_done)
+
+    def _startup_done(self):
+        startup.mark('首次空闲')
+        startup.finish()
 
     def _setup_ui(self):
         self.withdraw()
         self.title("Z Logon")
         self.geometry("531x560")
         self.resizable(False, False)
+        # 关闭窗口与菜单退出走同一流程，确保后台写入完成
+        self.protocol('WM_DELETE_WINDOW', self.exit)
 
         try:
             self.iconbitmap(get_icon_path())
@@ -52,24 +102,39 @@ class Main(tk.Tk):
         menu_options = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="选项", menu=menu_options)
         menu_options.add_command(label="配置", command=self.config)
+        menu_options.add_command(label="刷新", accelerator='F5', command=self._refresh_tree)
+        menu_options.add_separator()
+        menu_options.add_command(label="导入连接...", command=self.import_links)
+        menu_options.add_command(label="导出连接...", command=self.export_links)
+        menu_options.add_command(label="从 SAP Logon 批量添加...", command=self.provision_links)
         menu_options.add_separator()
         menu_options.add_command(label="退出", command=self.exit)
 
         menu_help = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="帮助", menu=menu_help)
+        menu_help.add_command(label="登录记录", command=self.show_sessions)
         menu_help.add_command(label="关于", command=self.about)
 
         main_frame = ttk.Frame(self, padding=10)
         main_frame.grid(row=0, column=0, sticky=tk.NSEW)
         main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(0, weight=1)
+        main_frame.rowconfigure(1, weight=1)
+
+        # 搜索框：按名称、描述、系统、Client、用户过滤连接
+        self.searchVar = tk.StringVar()
+        self.searchEntry = ttk.Entry(main_frame, textvariable=self.searchVar)
+        self.searchEntry.grid(row=0, column=0, sticky=tk.EW, pady=(0, 5))
+        self.searchVar.trace_add('write', lambda *args: self._schedule_search())
+        self.searchEntry.bind('<Escape>', lambda e: self.searchVar.set(''))
+        self.searchEntry.bind('<Down>', lambda e: self._focus_tree())
+        self.searchEntry.bind('<Return>', lambda e: self._focus_tree())
 
         # 文件夹开合图标
         style = ttk.Style()
         style.configure('.', indicatorsize=0)
 
         columns = ('desc', 'id', 'type')
-        self.treeView = ttk.Treeview(main_frame, columns=columns, height=25, selectmode='browse', show='tree headings')
+        self.treeView = ttk.Treeview(main_frame, columns=columns, height=24, selectmode='extended', show='tree headings')
         self.treeView.heading('#0', text='连接')
         self.treeView.heading('desc', text='描述')
         self.treeView.heading('id', text='')
@@ -80,32 +145,148 @@ class Main(tk.Tk):
         self.treeView.column('id', width=0, minwidth=0, stretch=False)
         self.treeView.column('type', width=0, minwidth=0, stretch=False)
 
-        self.treeView.grid(row=0, column=0, sticky=tk.NSEW)
+        self.treeView.grid(row=1, column=0, sticky=tk.NSEW)
 
-        # 创建并配置树形图标 (透明背景，选中时与行背景融为一体)
-        self._tree_icons = []
-        # 即使没有PIL也创建图标
-        for img in (create_folder_closed_icon(), create_folder_open_icon(), create_link_icon()):
-            self._tree_icons.append(img)
-        self.treeView.tag_configure('folder-closed', image=self._tree_icons[0])
-        self.treeView.tag_configure('folder-open', image=self._tree_icons[1])
-        self.treeView.tag_configure('link', image=self._tree_icons[2])
+        # 配置树形图标 (透明背景，选中时与行背景融为一体)；图标按屏幕缩放比例选择尺寸，进程内共享
+        for tag in ('folder-closed', 'folder-open', 'link'):
+            self.treeView.tag_configure(tag, image=get_icon(tag, self))
+        # 登录状态：排队中、启动中、成功、失败
+        for state, color in (('queued', 'gray'), ('running', '#1565C0'), ('ok', '#2E7D32'), ('failed', '#C62828')):
+            self.treeView.tag_configure('launch-' + state, foreground=color)
+        size = icon_size(self)
+        if size > 16:
+            # 高分屏图标需要更高的行
+            style.configure('Treeview', rowheight=max(int(style.lookup('Treeview', 'rowheight') or 0), size + 4))
 
         self.treeView.bind('<Double-1>', lambda e: self.logon_on())
         self.treeView.bind('<Return>', lambda e: self.logon_on())
         self.treeView.bind('<Button-3>', self._context_menu)
         self.treeView.bind('<<TreeviewOpen>>', self._on_expand)
         self.treeView.bind('<<TreeviewClose>>', self._on_collapse)
+        self.bind('<F5>', lambda e: self._refresh_tree())
 
         self.update_idletasks()
         center_window(self, 531, 560)
         self.deiconify()
 
-    def set_tree(self):
-        self._clear_tree()
-        self.set_node('')
+    def set_tree(self, open_state='keep'):
+        """按数据库同步整棵树；open_state 见 TreeReconciler.OPEN_STATES"""
+        if self._lazy_tree():
+            # 界面中已加载的分组保持已加载，其子节点一并刷新
+            loaded = [PUUID.UUID(iid) for iid in self.reconciler.loaded_folders()]
+            tree, has_children, opened = self.db.loadOpenTree(loaded=loaded)
+            self.reconciler.sync(tree, parents=opened, has_children=has_children, open_state=open_state)
+        else:
+            self.reconciler.sync(self.db.loadTree(), open_state=open_state)
         # 默认选择第一个项目并设置焦点
-        self.after(50, self._select_first_item)
+        if not self.treeView.selection():
+            self.after(50, self._select_first_item)
+
+    def _lazy_tree(self):
+        mode = self.db.config.get(self.TREE_MODE_KEY, 'auto')
+        if mode in ('lazy', 'eager'):
+            return mode == 'lazy'
+        return self.db.countNodes() > self.LAZY_THRESHOLD
+
+    def _is_loaded(self, iid):
+        """分组的子节点是否已加载（懒加载模式下未展开过的分组只有占位子项）"""
+        return self.reconciler.is_loaded(iid)
+
+    def _load_children(self, iid):
+        """展开懒加载的分组：用实际子节点替换占位子项"""
+        puuid = PUUID.UUID(iid)
+        tree, has_children, opened = self.db.loadOpenTree(puuid)
+        self.reconciler.sync(tree, iid, puuid, parents=opened, has_children=has_children, open_state='saved')
+
+    def _refresh_tree(self):
+        """重新读取数据库刷新树，搜索中时刷新搜索结果"""
+        if self.searchVar.get().strip():
+            self._apply_search(select_first=False)
+        else:
+            self.set_tree()
+
+    def _poll_changes(self):
+        """其他进程修改了数据库时刷新树（本进程后台线程的写入由发起方刷新）"""
+        try:
+            changes = self.db.check_changes()
+            if changes != self._external_changes:
+                self._external_changes = changes
+                self._refresh_tree()
+            # 展开状态写入失败时提示一次，后台线程会稍后重试
+            for error in self.stateWriter.poll_errors():
+                message.error('错误', f'保存分组展开状态失败，稍后将重试：{error}')
+        finally:
+            self.after(self.CHANGE_POLL_INTERVAL, self._poll_changes)
+
+    def _poll_instance(self):
+        try:
+            for command in self.instance.poll():
+                self._run_command(command)
+        finally:
+            self.after(self.INSTANCE_POLL_INTERVAL, self._poll_instance)
+
+    def _run_command(self, command):
+        """执行命令行命令：show 显示窗口，logon 登录指定路径的连接或分组内全部连接"""
+        if command['cmd'] == 'show':
+            self.deiconify()
+            self.lift()
+            self.focus_force()
+            # 部分窗口管理器不允许后台进程抢占前台，短暂置顶使窗口可见
+            self.attributes('-topmost', True)
+            self.after(200, lambda: self.attributes('-topmost', False))
+        elif command['cmd'] == 'logon':
+            self._logon_path(command.get('target', ''))
+
+    def _logon_path(self, target):
+        from libs.transfer import split_path
+        node = self.db.findNodeByPath(split_path(target))
+        if node is None:
+            message.error('错误', f'未找到连接或分组：{target}')
+            return
+        if node.type == 'F':
+            links = self.db.loadSubtreeLinks(node.uuid)
+            if not links:
+                message.information('提示', '分组中没有连接。')
+                return
+        else:
+            links = self.db.session.query(Link).filter(Link.uuid == node.uuid).all()
+        self._logon_links(links)
+
+    def _schedule_search(self):
+        """输入防抖：最后一次输入 SEARCH_DELAY 毫秒后才查询"""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.SEARCH_DELAY, self._apply_search)
+
+    def _apply_search(self, select_first=True):
+        self._search_job = None
+        text = self.searchVar.get().strip()
+        if not text:
+            # 退出搜索：恢复保存的展开状态
+            self.set_tree('saved')
+            return
+        tree, hits = self.db.searchTree(text)
+        # 只显示命中的节点及其上级分组，上级分组全部展开
+        self.reconciler.sync(tree, open_state='all')
+        if not select_first and self.treeView.selection():
+            return
+        hits = {str(uuid) for uuid in hits}
+        first = next((iid for iid in self._iter_items() if iid in hits), None)
+        if first:
+            self.treeView.selection_set(first)
+            self.treeView.focus(first)
+            self.treeView.see(first)
+
+    def _iter_items(self, parent=''):
+        """按显示顺序遍历树中的全部项目"""
+        for iid in self.treeView.get_children(parent):
+            yield iid
+            yield from self._iter_items(iid)
+
+    def _focus_tree(self):
+        self.treeView.focus_set()
+        if not self.treeView.selection():
+            self._select_first_item()
 
     def _select_first_item(self):
         """延迟选择第一个项目，确保树形控件已完全初始化"""
@@ -116,56 +297,22 @@ class Main(tk.Tk):
             self.treeView.focus_set()
             self.treeView.focus(first_item)
 
-    def _clear_tree(self):
-        for item in self.treeView.get_children():
-            self.treeView.delete(item)
-
-    def set_node(self, parent_iid, info=None):
-        # 获取当前父节点下的文件夹和链接，然后合并排序再插入
-        if info is None:
-            parent_filter = None
-        else:
-            parent_filter = info.uuid
-
-        childs_f = self.db.session.query(Node).filter(
-            Node.type == 'F', Node.puuid == parent_filter).all()
-        childs_l = self.db.session.query(Node).filter(
-            Node.type == 'L', Node.puuid == parent_filter).all()
-
-        items = []
-        for f in childs_f:
-            items.append({'type': 'F', 'node': f.node, 'desc': f.desc, 'uuid': f.uuid, 'expanded': f.expanded})
-        for l in childs_l:
-            items.append({'type': 'L', 'node': l.node, 'desc': l.desc, 'uuid': l.uuid})
-
-        # 文件夹优先，随后按名称忽略大小写排序
-        items.sort(key=lambda x: (0 if x['type'] == 'F' else 1, x['node'].lower()))
-
-        for it in items:
-            iid = str(it['uuid'])
-            if it['type'] == 'F':
-                # 启动时（self.init 为 True）强制展开，避免默认折叠
-                expanded_flag = it.get('expanded') or getattr(self, 'init', False)
-                folder_tag = 'folder-open' if expanded_flag else 'folder-closed'
-                self.treeView.insert(parent_iid, 'end', iid=iid, text=it['node'],
-                                    values=(it.get('desc', ''), str(it['uuid']), 'F'),
-                                    tags=(folder_tag,))
-                if expanded_flag:
-                    self.treeView.item(iid, open=True)
-                # 递归渲染子节点
-                try:
-                    child_node = self.db.session.query(Node).filter(Node.uuid == it['uuid']).first()
-                except Exception:
-                    child_node = None
-                self.set_node(iid, child_node)
-            else:
-                self.treeView.insert(parent_iid, 'end', iid=iid, text=it['node'],
-                                    values=(it.get('desc', ''), str(it['uuid']), 'L'),
-                                    tags=('link',))
-
     def _context_menu(self, event):
         item = self.treeView.identify_row(event.y)
         
+        # 在多选的项目上右键时保留多选，可批量登录、删除
+        selected = self.treeView.selection()
+        if item and item in selected and len(selected) > 1:
+            links = [iid for iid in selected if self.treeView.set(iid, 'type') == 'L']
+            self.treeView.focus(item)
+            menu = tk.Menu(self, tearoff=0)
+            if links:
+                menu.add_command(label=f'登录选中的 {len(links)} 个连接', command=self.logon_on)
+                menu.add_separator()
+            menu.add_command(label=f'删除选中的 {len(selected)} 个项目', command=self.delete)
+            menu.tk_popup(event.x_root, event.y_root)
+            return
+
         # 清除当前选择，确保在空白处右键时不会影响之前的选中项
         self.treeView.selection_set('')
         self.treeView.focus('')
@@ -186,6 +333,9 @@ class Main(tk.Tk):
                 menu.add_separator()
                 menu.add_command(label='属性', command=self.attribute)
             else:
+                if nodetype == 'F':
+                    menu.add_command(label='登录分组内全部连接', command=self.logon_folder)
+                    menu.add_separator()
                 menu.add_command(label='添加新连接', command=self.add_link)
                 menu.add_separator()
                 menu.add_command(label='添加分组', command=self.add_group)
@@ -203,59 +353,188 @@ class Main(tk.Tk):
         menu.tk_popup(event.x_root, event.y_root)
 
     def logon_on(self):
+        """登录选中的连接（可多选，选中的分组忽略）"""
+        iids = [iid for iid in self.treeView.selection() if self.treeView.set(iid, 'type') == 'L']
+        if not iids:
+            return
+        uuids = [PUUID.UUID(iid) for iid in iids]
+        links = {link.uuid: link for link in self.db.session.query(Link).filter(Link.uuid.in_(uuids)).all()}
+        self._logon_links([links[uuid] for uuid in uuids if uuid in links])
+
+    def logon_folder(self):
+        """登录选中分组及其下级分组中的全部连接"""
         sel = self.treeView.selection()
-        if not sel:
+        if not sel or self.treeView.set(sel[0], 'type') != 'F':
             return
-        item = sel[0]
-        values = self.treeView.item(item, 'values')
-        if not values or values[2] == 'F':
+        links = self.db.loadSubtreeLinks(PUUID.UUID(sel[0]))
+        if not links:
+            message.information('提示', '分组中没有连接。')
             return
-
-        cur_uuid = values[1]
-        uuid = PUUID.UUID(cur_uuid)
-        db_link = self.db.session.query(Link).filter(Link.uuid == uuid).first()
-        if db_link:
-            db_cfg_path = self.db.session.query(Config).filter(Config.key == 'path').first()
-            if not db_cfg_path or db_cfg_path.value == '':
+        if len(links) > 1 and not message.warning('注意', f'确定登录分组内的 {len(links)} 个连接？'):
+            return
+        self._logon_links(links)
+
+    def _launch_queue(self):
+        """登录队列，首次登录时创建（导入 subprocess 较慢，不放在启动路径上）"""
+        if self.launchQueue is None:
+            from libs.launcher import Launcher, LaunchQueue
+            self.launcher = Launcher()
+            self.launchQueue = LaunchQueue(self.launcher, self._config_number(self.LAUNCH_CONCURRENCY_KEY, 3),
+                                           self._config_number(self.LAUNCH_DELAY_KEY, 1.0))
+        return self.launchQueue
+
+    def _config_number(self, key, default):
+        try:
+            return type(default)(self.db.config.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def _logon_links(self, links):
+        """连接加入登录队列，按并发数与间隔依次启动，不等待 sapshcut 结束"""
+        from libs.launcher import sapshcut_args
+        queue = self._launch_queue()
+        cfg_path = self.db.config.get('path')
+        # 使用 ZLOGON_LAUNCH_CMD 替换启动命令时不检查 SAP GUI 配置
+        if self.launcher.command is None:
+            if not cfg_path:
                 message.error('错误', '请维护菜单->选项->配置后登录！')
                 self.config()
                 return
-            if not self.guiCfg.checkSapGuiDir(db_cfg_path.value):
+            if not self.db.config.sapshcut_exists():
                 message.error('错误', 'saplogon.exe 路径错误，请修改配置！')
                 return
-            if db_link.system.find(' ') != -1:
-                msg = 'SAP系统连接<' + db_link.system + '>存在空格，请调整后重试。'
-                message.error('错误', msg)
-                return
-
-            user = '-user=' + db_link.user
-            pw = '-pw=' + db_link.password
-            language = '-language=' + db_link.language
-            SYSTEM = '-SYSTEM='
-            CLIENT = '-CLIENT=' + db_link.client
-            sysname = '-sysname=' + db_link.system
-            shcut_app = db_cfg_path.value + '/' + self.guiCfg.appName
-            maxgui = '-max'
 
-            try:
-                subprocess.run([shcut_app, user, pw, language, SYSTEM, CLIENT, sysname, maxgui])
-            except Exception:
-                message.error('错误', 'GUI配置异常，请调整后重试。')
+        shcut_app = (cfg_path or '') + '/' + self.guiCfg.appName
+        for link in links:
+            iid = str(link.uuid)
+            if link.system.find(' ') != -1:
+                self._set_launch_state(iid, 'failed')
+                self._launch_failures.append('SAP系统连接<' + link.system + '>存在空格，请调整后重试。')
+                continue
+            queue.submit(iid, shcut_app, sapshcut_args(link), name=link.node, system=link.system,
+                         client=link.client)
+        self._poll_launches()
+
+    def _set_launch_state(self, iid, state):
+        """在树中标记连接的登录状态：queued 排队中、running 启动中、ok 成功、failed 失败"""
+        if not self.treeView.exists(iid):
+            return
+        tags = [t for t in self.treeView.item(iid, 'tags') if not t.startswith('launch-')]
+        self.treeView.item(iid, tags=tags + ['launch-' + state])
+
+    def _poll_launches(self):
+        """推进登录队列并取回结果；队列空闲后汇总提示失败的登录"""
+        if self._launch_job is not None:
+            self.after_cancel(self._launch_job)
+            self._launch_job = None
+        queue = self.launchQueue
+        for iid, state, session in queue.pump():
+            self._set_launch_state(iid, state)
+            if state != 'failed':
+                continue
+            if session.status == 'failed':
+                self._launch_failures.append(f'<{session.name}> GUI配置异常，请调整后重试。（{session.error}）')
+            else:
+                self._launch_failures.append(f'<{session.name}> 登录失败，sapshcut 退出码 {session.returncode}。')
+        if queue.busy():
+            wait = queue.next_launch_in()
+            delay = self.LAUNCH_POLL_INTERVAL if not wait else min(self.LAUNCH_POLL_INTERVAL, int(wait * 1000) + 1)
+            self._launch_job = self.after(delay, self._poll_launches)
+        elif self._launch_failures:
+            failures, self._launch_failures = self._launch_failures, []
+            message.error('错误', '\n'.join(failures[:20]))
+
+    def show_sessions(self):
+        """本次运行中启动过的登录"""
+        from datetime import datetime
+        sessions = self.launcher.sessions() if self.launcher else []
+        if not sessions:
+            message.information('登录记录', '本次运行尚未登录。')
+            return
+        status = {'running': '运行中', 'exited': '已完成', 'failed': '启动失败'}
+        lines = []
+        for session in sessions[-20:]:
+            state = status[session.status]
+            if session.status == 'exited' and session.returncode != 0:
+                state = f'退出码 {session.returncode}'
+            started = datetime.fromtimestamp(session.started).strftime('%H:%M:%S')
+            lines.append(f'{started}  {session.name}（{session.system}/{session.client}）  {state}')
+        message.information('登录记录', '\n'.join(lines))
 
     def config(self):
+        from views.config import DialogCfg
         dialog = DialogCfg(self)
         code = dialog.result['code']
         data = dialog.result['data']
         if code == 'ok':
-            self.db.session.query(Config).filter(Config.key == 'path').delete()
-            self.db.session.add(Config(key='path', value=data['path']))
-            self.db.session.commit()
+            self.db.config.set('path', data['path'])
 
-    def add_link(self):
+    # 导入/导出支持的文件类型
+    TRANSFER_FILETYPES = [('CSV', '*.csv'), ('JSON', '*.json *.jsonl'), ('YAML', '*.yaml *.yml')]
+
+    def import_links(self):
+        from tkinter import filedialog
+        from views.transfer import DialogProgress
+        from libs.transfer import Importer
+        path = filedialog.askopenfilename(parent=self, title='导入连接', filetypes=self.TRANSFER_FILETYPES)
+        if not path:
+            return
+        dialog = DialogProgress(self, '导入连接', lambda progress: Importer(self.db).import_file(path, progress=progress))
+        self._transfer_done(dialog, '导入')
+        # 后台线程写入的数据在刷新时重新读取
+        self._refresh_tree()
+
+    def export_links(self):
+        from tkinter import filedialog
+        from views.transfer import DialogProgress
+        from libs.transfer import Exporter
+        path = filedialog.asksaveasfilename(parent=self, title='导出连接', defaultextension='.csv',
+                                            filetypes=self.TRANSFER_FILETYPES)
+        if not path:
+            return
+        dialog = DialogProgress(self, '导出连接', lambda progress: Exporter(self.db).export(path, progress=progress))
+        self._transfer_done(dialog, '导出')
+
+    def provision_links(self):
+        from views.provision import DialogProvision
+        from views.transfer import DialogProgress
+        from libs.provision import provision
+        dialog = DialogProvision(self)
+        if dialog.result['code'] != 'ok':
+            return
+        data = dialog.result['data']
+        dialog = DialogProgress(self, '批量添加连接', lambda progress: provision(
+            self.db, data['entries'], data['templates'], data['grouped'], data['root'], progress))
+        self._transfer_done(dialog, '添加')
+        self._refresh_tree()
+
+    def _transfer_done(self, dialog, action):
+        code = dialog.result['code']
+        progress = dialog.result['data']
+        if code == 'error':
+            message.error('错误', f'{action}失败: {progress.error}')
+        elif code in ('ok', 'cancel'):
+            msg = f'{action}分组 {progress.folders} 个，连接 {progress.links} 个'
+            if progress.existing:
+                msg += f'，跳过已存在的连接 {progress.existing} 个'
+            if progress.skipped:
+                msg += f'，跳过无效记录 {progress.skipped} 条'
+            if code == 'cancel':
+                msg = f'{action}已取消。' + msg
+            message.information('完成', msg)
+
+    def _single_selection(self):
+        """只作用于一个项目的操作（属性、添加连接）：多选时提示并返回 None"""
         sel = self.treeView.selection()
-        if not sel:
+        if len(sel) > 1:
+            message.information('提示', '请只选择一个项目。')
+            return None
+        return sel[0] if sel else None
+
+    def add_link(self):
+        item = self._single_selection()
+        if not item:
             return
-        item = sel[0]
         values = self.treeView.item(item, 'values')
         text = self.treeView.item(item, 'text')
         group = {
@@ -265,6 +544,7 @@ class Main(tk.Tk):
             'type': values[2] if values else '',
         }
         param = {'type': 'add', 'curGroup': group}
+        from views.link import DialogLink
         dialog = DialogLink(self, param)
         code = dialog.result['code']
         data = dialog.result['data']
@@ -281,17 +561,13 @@ class Main(tk.Tk):
             self.db.session.add_all(nodes)
             self.db.session.add_all(links)
             self.db.session.commit()
-
-            parent_iid = '' if data['group'] == '' else str(data.get('puuid', ''))
-            new_iid = str(uuid)
-            self.treeView.insert(parent_iid, 'end', iid=new_iid, text=data['node'],
-                                values=(data['desc'], str(uuid), 'L'), tags=('link',))
+            # 按排序插入到所在分组；显示搜索结果或分组尚未加载时由刷新决定是否显示
+            self._refresh_tree()
 
     def attribute(self):
-        sel = self.treeView.selection()
-        if not sel:
+        item = self._single_selection()
+        if not item:
             return
-        item = sel[0]
         values = self.treeView.item(item, 'values')
         text = self.treeView.item(item, 'text')
         nodetype = values[2] if values else ''
@@ -299,6 +575,7 @@ class Main(tk.Tk):
         if nodetype == 'F':
             group = {'node': text, 'desc': values[0], 'uuid': values[1], 'type': nodetype}
             param = {'type': 'attribute', 'group': group}
+            from views.group import DialogGroup
             dialog = DialogGroup(self, param)
             code = dialog.result['code']
             data = dialog.result['data']
@@ -310,7 +587,7 @@ class Main(tk.Tk):
                 # 标记对象为脏数据，确保提交时会被保存
                 self.db.session.mark_dirty(db_group)
                 self.db.session.commit()
-                self.treeView.item(item, text=data['node'], values=(data['desc'], data['uuid'], 'F'))
+                self._refresh_tree()
         else:
             cur_uuid = values[1]
             db_node = self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).first()
@@ -322,21 +599,11 @@ class Main(tk.Tk):
                 'group': db_node.group
             }
             param = {'type': 'attribute', 'link': link}
+            from views.link import DialogLink
             dialog = DialogLink(self, param)
             code = dialog.result['code']
             data = dialog.result['data']
             if code == 'ok':
-                db_node = self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).first()
-                if db_node.group == data['group']:
-                    self.treeView.item(item, text=data['node'],
-                                       values=(data['desc'], cur_uuid, 'L'))
-                else:
-                    self.treeView.delete(item)
-                    parent_iid = str(data['puuid'])
-                    new_iid = str(cur_uuid)
-                    self.treeView.insert(parent_iid, 'end', iid=new_iid, text=data['node'],
-                                        values=(data['desc'], cur_uuid, 'L'), tags=('link',))
-
                 db_node.node = data['node']
                 db_node.desc = data['desc']
                 db_node.group = data['group']
@@ -356,8 +623,11 @@ class Main(tk.Tk):
                 self.db.session.mark_dirty(db_node)
                 self.db.session.mark_dirty(db_link)
                 self.db.session.commit()
+                # 名称变化后按新的排序移动，分组变化时移动到新分组下
+                self._refresh_tree()
 
     def add_group(self):
+        from views.group import DialogGroup
         param = {'type': 'add'}
         dialog = DialogGroup(self, param)
         code = dialog.result['code']
@@ -368,40 +638,54 @@ class Main(tk.Tk):
                          type='F', position=0, uuid=uuid)]
             self.db.session.add_all(nodes)
             self.db.session.commit()
-
-            iid = str(uuid)
-            self.treeView.insert('', 'end', iid=iid, text=data['node'],
-                                values=(data['desc'], str(uuid), 'F'), tags=('folder-closed',))
+            self._refresh_tree()
 
     def delete(self):
-        sel = self.treeView.selection()
+        """删除选中的分组和连接（可多选），分组连同下级分组、连接整棵子树一起删除"""
+        sel = [iid for iid in self.treeView.selection() if self.treeView.set(iid, 'type') in ('F', 'L')]
         if not sel:
             return
-        item = sel[0]
-        values = self.treeView.item(item, 'values')
-        nodetype = values[2]
-        cur_uuid = values[1]
-
-        if nodetype == 'F':
-            result = message.warning('注意', '确定删除选中的分组？')
-            if not result:
-                return
-            db_links = self.db.session.query(Node).filter(Node.puuid == PUUID.UUID(cur_uuid)).all()
-            for link in db_links:
-                self.db.session.query(Link).filter(Link.uuid == link.uuid).delete()
-            self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).delete()
-            self.db.session.commit()
+        if len(sel) > 1:
+            prompt = f'确定删除选中的 {len(sel)} 个项目？分组将连同其下级一起删除。'
+        elif self.treeView.set(sel[0], 'type') == 'F':
+            prompt = '确定删除选中的分组？'
         else:
-            result = message.warning('注意', '确定删除选中的连接？')
-            if not result:
-                return
-            self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).delete()
-            self.db.session.query(Link).filter(Link.uuid == PUUID.UUID(cur_uuid)).delete()
-            self.db.session.commit()
+            prompt = '确定删除选中的连接？'
+        if not message.warning('注意', prompt):
+            return
 
-        self.treeView.delete(item)
+        # 上级分组也被选中的项目随上级一起删除
+        chosen, folders, links = set(sel), [], []
+        for iid in sel:
+            parent = self.treeView.parent(iid)
+            while parent and parent not in chosen:
+                parent = self.treeView.parent(parent)
+            if parent:
+                continue
+            (folders if self.treeView.set(iid, 'type') == 'F' else links).append(PUUID.UUID(iid))
+        with self.db.transaction():
+            for uuid in folders:
+                self.db.deleteSubtree(uuid)
+            if links:
+                self.db.session.query(Node).filter(Node.uuid.in_(links)).delete()
+                self.db.session.query(Link).filter(Link.uuid.in_(links)).delete()
+        self.db.session.commit()
+
+        self._refresh_tree()
 
     def exit(self):
+        if self.launchQueue is not None and self.launchQueue.pending():
+            # 排队中的登录尚未启动，退出前确认并取消；已启动的登录不受影响
+            if not message.warning('注意', f'还有 {self.launchQueue.pending()} 个连接等待登录，退出将取消这些登录。确定退出？'):
+                return
+            self.launchQueue.cancel()
+        if self.instance is not None:
+            self.instance.close()
+        if self.launcher is not None:
+            self.launcher.close()
+        if not self.stateWriter.close():
+            message.error('错误', f'分组展开状态未能保存：{self.stateWriter.last_error}')
+        self.db.close()
         self.quit()
         self.destroy()
 
@@ -420,14 +704,10 @@ class Main(tk.Tk):
         values = self.treeView.item(item, 'values')
         if not values or values[2] != 'F':
             return
+        if not self._is_loaded(item):
+            self._load_children(item)
         self.treeView.item(item, tags=('folder-open',))
-        cur_uuid = values[1]
-        db_group = self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).first()
-        if db_group:
-            db_group.expanded = True
-            # 标记对象为脏数据，确保提交时会被保存
-            self.db.session.mark_dirty(db_group)
-            self.db.session.commit()
+        self.stateWriter.set_expanded(PUUID.UUID(values[1]), True)
 
     def _on_collapse(self, event):
         if self.init:
@@ -439,11 +719,5 @@ class Main(tk.Tk):
         if not values or values[2] != 'F':
             return
         self.treeView.item(item, tags=('folder-closed',))
-        cur_uuid = values[1]
-        db_group = self.db.session.query(Node).filter(Node.uuid == PUUID.UUID(cur_uuid)).first()
-        if db_group:
-            db_group.expanded = False
-            # 标记对象为脏数据，确保提交时会被保存
-            self.db.session.mark_dirty(db_group)
-            self.db.session.commit()
+        self.stateWriter.set_expanded(PUUID.UUID(values[1]), False)
 
@@ -0,0 +1,127 @@
+import tkinter as tk
+from tkinter import ttk
+from libs.guiCfg import GuiCfg
+from libs.gui_util import center_window, get_icon_path
+from libs.OptionDB import sqliteDB
+from libs.provision import check_templates, load_templates, save_templates
+from libs import message
+
+
+class DialogProvision(tk.Toplevel):
+    """按 SAP Logon 中的系统批量添加连接"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.withdraw()
+        self.db = sqliteDB()
+        self.guiCfg = GuiCfg()
+        self.entries = self.guiCfg.getSapGuiLandscape()
+        self.result = {
+            'code': None,
+            'data': None
+        }
+
+        self._setup_ui()
+        self.init_data()
+        self.update_idletasks()
+        center_window(self, 429, 300)
+        self.deiconify()
+        if parent:
+            self.transient(parent)
+        self.grab_set()
+        if parent:
+            parent.wait_window(self)
+
+    def _setup_ui(self):
+        self.title('批量添加连接')
+        self.geometry('429x300')
+        self.resizable(False, False)
+
+        try:
+            self.iconbitmap(get_icon_path())
+        except tk.TclError:
+            pass
+
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        row = 0
+        self.labelCount = ttk.Label(main_frame)
+        self.labelCount.grid(row=row, column=0, columnspan=2, sticky=tk.W, pady=(0, 8))
+        row += 1
+
+        ttk.Label(main_frame, text='上级分组：').grid(row=row, column=0, sticky=tk.W, pady=3)
+        self.LineEditRoot = ttk.Entry(main_frame, width=40)
+        self.LineEditRoot.grid(row=row, column=1, sticky=tk.EW, padx=5, pady=3)
+        row += 1
+
+        self.groupedVar = tk.BooleanVar(value=True)
+        ttk.Checkbutton(main_frame, text='按 SAP Logon 的工作区/文件夹分组',
+                        variable=self.groupedVar).grid(row=row, column=1, sticky=tk.W, padx=5, pady=3)
+        row += 1
+
+        ttk.Label(main_frame, text='Client：').grid(row=row, column=0, sticky=tk.W, pady=3)
+        self.LineEditClient = ttk.Entry(main_frame, width=40)
+        self.LineEditClient.grid(row=row, column=1, sticky=tk.EW, padx=5, pady=3)
+        row += 1
+
+        ttk.Label(main_frame, text='用户：').grid(row=row, column=0, sticky=tk.W, pady=3)
+        self.LineEditUser = ttk.Entry(main_frame, width=40)
+        self.LineEditUser.grid(row=row, column=1, sticky=tk.EW, padx=5, pady=3)
+        row += 1
+
+        ttk.Label(main_frame, text='语言：').grid(row=row, column=0, sticky=tk.W, pady=3)
+        self.comboBoxLanguage = ttk.Combobox(main_frame, width=37, values=['ZH', 'EN'])
+        self.comboBoxLanguage.grid(row=row, column=1, sticky=tk.EW, padx=5, pady=3)
+        row += 1
+
+        ttk.Label(main_frame, text='可使用 {sid}（系统 ID）、{system}（SAP连接）占位符',
+                  foreground='gray').grid(row=row, column=0, columnspan=2, sticky=tk.W, pady=3)
+        row += 1
+
+        main_frame.columnconfigure(1, weight=1)
+
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.grid(row=row, column=0, columnspan=2, pady=15)
+
+        ttk.Button(btn_frame, text='确定', command=self.accept).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text='取消', command=self.reject).pack(side=tk.LEFT)
+
+    def init_data(self):
+        self.labelCount['text'] = f'SAP Logon 中共有 {len(self.entries)} 个系统连接'
+        templates = load_templates(self.db.config)
+        self.LineEditClient.insert(0, templates['client'])
+        self.LineEditUser.insert(0, templates['user'])
+        self.comboBoxLanguage.set(templates['language'])
+
+    def accept(self):
+        if not self.entries:
+            message.warning('注意', '未找到 SAP Logon 系统连接！')
+            return
+        templates = {
+            'client': self.LineEditClient.get().strip(),
+            'user': self.LineEditUser.get().strip(),
+            'language': self.comboBoxLanguage.get().strip(),
+        }
+        if not templates['client']:
+            message.warning('注意', '请输入Client！')
+            return
+        errors = check_templates(templates)
+        if errors:
+            message.warning('注意', '\n'.join(str(e) for e in errors))
+            return
+        save_templates(self.db.config, templates)
+        self.result = {
+            'code': 'ok',
+            'data': {
+                'entries': self.entries,
+                'templates': templates,
+                'grouped': self.groupedVar.get(),
+                'root': self.LineEditRoot.get().strip(),
+            }
+        }
+        self.reject()
+
+    def reject(self):
+        self.grab_release()
+        self.destroy()
@@ -0,0 +1,75 @@
+import tkinter as tk
+from tkinter import ttk
+from libs.gui_util import center_window, get_icon_path
+from libs.OptionDB import sqliteDB
+from libs.transfer import Progress, run_in_background
+
+
+class DialogProgress(tk.Toplevel):
+    """导入/导出进度对话框：任务在后台线程执行，对话框定时轮询进度，不阻塞 Tk 事件循环"""
+
+    POLL_INTERVAL = 100
+
+    def __init__(self, parent, title, task):
+        super().__init__(parent)
+        self.withdraw()
+        self.db = sqliteDB()
+        self.progress = Progress()
+        self.result = {
+            'code': None,
+            'data': None
+        }
+
+        self._setup_ui(title)
+        self.update_idletasks()
+        center_window(self, 360, 130)
+        self.deiconify()
+        if parent:
+            self.transient(parent)
+        self.grab_set()
+        run_in_background(self.db, task, self.progress)
+        self.after(self.POLL_INTERVAL, self._poll)
+        if parent:
+            parent.wait_window(self)
+
+    def _setup_ui(self, title):
+        self.title(title)
+        self.geometry('360x130')
+        self.resizable(False, False)
+        self.protocol('WM_DELETE_WINDOW', self.cancel)
+
+        try:
+            self.iconbitmap(get_icon_path())
+        except tk.TclError:
+            pass
+
+        main_frame = ttk.Frame(self, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(0, weight=1)
+
+        self.labelStatus = ttk.Label(main_frame, text='处理中...')
+        self.labelStatus.grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        self.progressBar = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
+        self.progressBar.grid(row=1, column=0, sticky=tk.EW, pady=(0, 10))
+        self.buttonCancel = ttk.Button(main_frame, text='取消', command=self.cancel)
+        self.buttonCancel.grid(row=2, column=0, sticky=tk.E)
+
+    def _poll(self):
+        progress = self.progress
+        self.progressBar['value'] = progress.fraction * 100
+        self.labelStatus['text'] = f'分组 {progress.folders} 个，连接 {progress.links} 个'
+        if not progress.finished:
+            self.after(self.POLL_INTERVAL, self._poll)
+            return
+        if progress.error is not None:
+            self.result = {'code': 'error', 'data': progress}
+        else:
+            self.result = {'code': 'cancel' if progress.cancelled else 'ok', 'data': progress}
+        self.grab_release()
+        self.destroy()
+
+    def cancel(self):
+        # 当前批次写完后停止，已提交的批次保留
+        self.progress.cancelled = True
+        self.buttonCancel['state'] = tk.DISABLED
+        self.labelStatus['text'] = '正在取消...'